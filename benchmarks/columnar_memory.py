@@ -0,0 +1,70 @@
+"""
+Compares the memory held by the scan results when kept as model objects and when kept in the columnar store.
+Run from the repository root with: python -m benchmarks.columnar_memory --cache-dir <recorded scan>
+Without --cache-dir, synthetic results are measured instead.
+"""
+import argparse
+import gc
+import tracemalloc
+import typing
+
+from benchmarks import recorded
+from benchmarks import synthetic
+from syllabus_scanner import columnar_results as syllabus_scanner_columnar_results
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+from syllabus_scanner import page_parser as syllabus_scanner_page_parser
+
+
+def get_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        help="The cache directory of a scan recorded with --cache-mode record",
+    )
+    parser.add_argument(
+        "--num-courses",
+        type=int,
+        default=20000,
+        help="The number of synthetic courses to measure when no recorded scan is provided",
+    )
+    return parser.parse_args()
+
+
+def load_courses(args: argparse.Namespace) -> typing.List[syllabus_scanner_non_persistent_models.CourseInfo]:
+    if args.cache_dir is None:
+        return list(synthetic.create_scan_results(num_courses=args.num_courses).courses)
+    courses: typing.List[syllabus_scanner_non_persistent_models.CourseInfo] = []
+    for page_entry in recorded.load_page_entries(cache_dir=args.cache_dir):
+        page_courses, _ = syllabus_scanner_page_parser.parse_page(page_entry=page_entry)
+        courses.extend(page_courses)
+    return courses
+
+
+def get_traced_memory() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def main() -> None:
+    args = get_arguments()
+    tracemalloc.start()
+
+    start_memory = get_traced_memory()
+    courses = load_courses(args)
+    models_memory = get_traced_memory() - start_memory
+
+    columnar_courses = syllabus_scanner_columnar_results.ColumnarCourses()
+    columnar_courses.extend(courses)
+    del courses
+    columnar_memory = get_traced_memory() - start_memory
+
+    num_course_groups = sum(len(course.course_groups) for course in columnar_courses)
+    print(F"Courses: {len(columnar_courses)}, course groups: {num_course_groups}")
+    print(F"Model objects: {models_memory / 2 ** 20:.2f} MiB")
+    print(F"Columnar store: {columnar_memory / 2 ** 20:.2f} MiB")
+    print(F"Saving: {(1 - columnar_memory / models_memory) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
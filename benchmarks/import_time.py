@@ -0,0 +1,159 @@
+"""
+Measures the startup of the CLI and the import time of the scanner modules with python -X importtime, and compares
+the measurements with the stored budgets, like benchmarks.page_parser does.
+Also fails when cli.py --help imports one of the heavy modules, which only the scan itself should import.
+The scanner runs as many short cron jobs, so the startup time is paid on every run.
+Run from the repository root with: python -m benchmarks.import_time
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import typing
+
+from benchmarks import page_parser
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGETS_PATH = os.path.join(os.path.dirname(__file__), "import_time_budgets.json")
+# The modules that take most of the import time, which --help and argument errors should not wait for.
+HEAVY_MODULES = ("aiohttp", "bs4", "asyncio")
+COMMANDS = {
+    "cli --help": ("cli.py", "--help"),
+    "syllabus_scanner.non_persistent_models": ("-c", "import syllabus_scanner.non_persistent_models"),
+    "syllabus_scanner.scanner": ("-c", "import syllabus_scanner.scanner"),
+}
+
+
+class ImportTimes(typing.NamedTuple):
+    wall_seconds: float
+    # The cumulative microseconds of every top level import, as reported by -X importtime.
+    imports: typing.Dict[str, int]
+    # All the imported modules, including the ones imported by other modules.
+    modules: typing.FrozenSet[str]
+
+    @property
+    def total_import_seconds(self) -> float:
+        return sum(self.imports.values()) / 1e6
+
+
+def run_command(arguments: typing.Sequence[str]) -> typing.Tuple[float, str]:
+    start_time = time.perf_counter()
+    completed_process = subprocess.run(
+        (sys.executable, "-X", "importtime", *arguments),
+        cwd=REPOSITORY_DIRECTORY,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        check=True,
+        text=True,
+    )
+    return time.perf_counter() - start_time, completed_process.stderr
+
+
+def get_import_times(arguments: typing.Sequence[str]) -> ImportTimes:
+    wall_seconds, importtime_output = run_command(arguments=arguments)
+    imports: typing.Dict[str, int] = {}
+    modules: typing.Set[str] = set()
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_text, module_text = line[len("import time:"):].split("|")
+        module_name = module_text.strip()
+        modules.add(module_name)
+        # Top level imports are not indented, and their cumulative times include the imports under them.
+        if not module_text[1:].startswith(" "):
+            imports[module_name] = int(cumulative_text)
+    return ImportTimes(wall_seconds=wall_seconds, imports=imports, modules=frozenset(modules))
+
+
+def measure_commands(repeat: int) -> typing.Tuple[typing.List[page_parser.Measurement], typing.List[str]]:
+    measurements: typing.List[page_parser.Measurement] = []
+    heavy_imports: typing.List[str] = []
+    print(F"{'command':>40} {'wall ms':>10} {'import ms':>10}")
+    for command_name, arguments in COMMANDS.items():
+        # The first run compiles the modules whose bytecode is stale, which is not what a cron job pays.
+        run_command(arguments=arguments)
+        all_import_times = [get_import_times(arguments=arguments) for _ in range(repeat)]
+        wall_times = [import_times.wall_seconds * 1e3 for import_times in all_import_times]
+        import_times = [import_times.total_import_seconds * 1e3 for import_times in all_import_times]
+        print(F"{command_name:>40} {min(wall_times):>10.1f} {min(import_times):>10.1f}")
+        measurements.append(page_parser.Measurement(
+            name=F"wall:{command_name}",
+            value=min(wall_times),
+            typical_value=statistics.median(wall_times),
+            unit="ms",
+        ))
+        measurements.append(page_parser.Measurement(
+            name=F"import:{command_name}",
+            value=min(import_times),
+            typical_value=statistics.median(import_times),
+            unit="ms",
+        ))
+        if command_name == "cli --help":
+            imported_modules = {module_name.split(".")[0] for module_name in all_import_times[0].modules}
+            heavy_imports.extend(
+                F"cli --help imports {module_name}" for module_name in HEAVY_MODULES if module_name in imported_modules
+            )
+    return measurements, heavy_imports
+
+
+def get_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--budgets",
+        type=str,
+        default=DEFAULT_BUDGETS_PATH,
+        help="The JSON file of the budget of every measurement",
+    )
+    parser.add_argument(
+        "--margin",
+        type=float,
+        default=0.5,
+        help="The fraction a measurement may exceed its budget by before the benchmark fails",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=7,
+        help="The number of times to run every command (the best run is checked, and the median run is stored)",
+    )
+    parser.add_argument(
+        "--update-budgets",
+        action="store_true",
+        help="Store the measurements as the new budgets instead of checking them",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = get_arguments()
+    measurements, heavy_imports = measure_commands(repeat=args.repeat)
+
+    if args.update_budgets:
+        with open(args.budgets, "w", encoding="utf-8") as budgets_file:
+            json.dump(
+                obj={measurement.name: round(measurement.typical_value, 3) for measurement in measurements},
+                fp=budgets_file,
+                indent=4,
+            )
+            budgets_file.write("\n")
+        print(F"Stored {len(measurements)} budgets in {args.budgets}.")
+        return
+
+    with open(args.budgets, "r", encoding="utf-8") as budgets_file:
+        budgets = json.load(budgets_file)
+    exceeded = [
+        *heavy_imports,
+        *page_parser.check_budgets(measurements=measurements, budgets=budgets, margin=args.margin),
+    ]
+    for message in exceeded:
+        print(message)
+    if exceeded:
+        sys.exit(1)
+    print(F"All {len(measurements)} measurements are within {args.margin:.0%} of their budgets.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Measures the end-to-end throughput of scanner.scan against the stand-in site, as the number of departments,
+the number of pages, the latency and the error rate of the site grow.
+The site runs in a process of its own, and every combination of the settings is scanned once.
+Failed requests are retried with the backoff of the scanner, so set SYLLABUS_RETRY_BASE_DELAY to shorten the runs with
+errors.
+Run from the repository root with: python -m benchmarks.load_test
+"""
+import argparse
+import itertools
+import logging
+import time
+
+from benchmarks import stand_in_site
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+from syllabus_scanner import scan_metrics as syllabus_scanner_scan_metrics
+from syllabus_scanner import scanner
+
+
+def get_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--departments", type=int, nargs="+", default=(4, 16), help="The numbers of departments")
+    parser.add_argument("--pages", type=int, nargs="+", default=(5, 20), help="The numbers of pages per department")
+    parser.add_argument("--latency", type=float, nargs="+", default=(0.05, 0.2), help="The latencies in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="The jitter of the latency in seconds")
+    parser.add_argument("--error-rate", type=float, nargs="+", default=(0.0, 0.05), help="The rates of 503 errors")
+    parser.add_argument("--course-groups", type=int, default=40, help="The number of course groups per page")
+    parser.add_argument("--parse-workers", type=int, help="The number of parse processes (defaults to the CPUs)")
+    parser.add_argument(
+        "--max-concurrent-requests",
+        type=int,
+        help="The maximal number of requests in flight (defaults to SYLLABUS_MAX_CONCURRENCY)",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=0,
+        help="The maximal number of requests per second, zero for no limit",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = get_arguments()
+    # Retries are logged as warnings, which would drown the results.
+    logging.basicConfig(level=logging.ERROR)
+    all_departments = syllabus_scanner_non_persistent_models.Department.all()
+
+    print(
+        F"{'departments':>11} {'pages':>6} {'latency':>8} {'errors':>7} "
+        F"{'seconds':>8} {'pages/s':>8} {'courses/s':>10} {'requests':>9}",
+    )
+    for num_departments, num_pages, latency, error_rate in itertools.product(
+            args.departments,
+            args.pages,
+            args.latency,
+            args.error_rate,
+    ):
+        if num_departments > len(all_departments):
+            print(F"Skipping {num_departments} departments, there are only {len(all_departments)}.")
+            continue
+        settings = stand_in_site.SiteSettings(
+            num_pages=num_pages,
+            num_course_groups=args.course_groups,
+            latency=latency,
+            jitter=min(args.jitter, latency),
+            error_rate=error_rate,
+        )
+        language = syllabus_scanner_non_persistent_models.Language.hebrew
+        metrics = syllabus_scanner_scan_metrics.ScanMetrics(language=language, year=2021)
+        with stand_in_site.run_site_process(settings=settings) as url:
+            start_time = time.perf_counter()
+            results = scanner.scan(
+                language=language,
+                year=2021,
+                departments=all_departments[:num_departments],
+                parse_workers=args.parse_workers,
+                max_concurrent_requests=args.max_concurrent_requests,
+                rate_limit=args.rate_limit,
+                url=url,
+                metrics=metrics,
+            )
+            scan_time = time.perf_counter() - start_time
+
+        num_scanned_pages = num_departments * num_pages
+        num_courses = len(results.courses)
+        # Includes the retries of the failed requests.
+        num_requests = sum(department_metrics.num_requests for department_metrics in metrics.departments.values())
+        print(
+            F"{num_departments:>11} {num_pages:>6} {latency:>8.2f} {error_rate:>7.2f} {scan_time:>8.2f} "
+            F"{num_scanned_pages / scan_time:>8.1f} {num_courses / scan_time:>10.1f} {num_requests:>9}",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Measures the page parser on the checked-in sample pages, and the helpers it calls for every row and cell,
+and compares the measurements with the stored budgets.
+Exits with a non-zero status when a measurement exceeds its budget by more than the allowed margin.
+The budgets are machine dependent, so record them again with --update-budgets after moving to another machine.
+Run from the repository root with: python -m benchmarks.page_parser
+The sample pages were created by stand_in_site.create_page, and are stripped of their form state as the loader
+strips them. failures.html has a failure row in about half of its course groups.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import typing
+
+from bs4.element import Tag
+
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+from syllabus_scanner import page_parser as syllabus_scanner_page_parser
+from syllabus_scanner import utils as syllabus_scanner_utils
+
+SAMPLE_PAGES_DIRECTORY = os.path.join(os.path.dirname(__file__), "sample_pages")
+DEFAULT_BUDGETS_PATH = os.path.join(os.path.dirname(__file__), "page_parser_budgets.json")
+
+
+class Measurement(typing.NamedTuple):
+    name: str
+    # The best of the runs is checked against the budget, and the median of the runs is stored as the budget,
+    # so a noisy machine does not fail the benchmark while a real regression still does.
+    value: float
+    typical_value: float
+    unit: str
+
+
+def load_sample_pages() -> typing.Dict[str, syllabus_scanner_non_persistent_models.PageEntry]:
+    sample_pages: typing.Dict[str, syllabus_scanner_non_persistent_models.PageEntry] = {}
+    for file_name in sorted(os.listdir(SAMPLE_PAGES_DIRECTORY)):
+        with open(os.path.join(SAMPLE_PAGES_DIRECTORY, file_name), "rb") as page_file:
+            sample_pages[file_name] = syllabus_scanner_non_persistent_models.PageEntry(
+                department=syllabus_scanner_non_persistent_models.Department.all()[0],
+                page_number=1,
+                content=page_file.read(),
+            )
+    return sample_pages
+
+
+def get_times(function: typing.Callable[[], typing.Any], repeat: int) -> typing.List[float]:
+    times: typing.List[float] = []
+    for _ in range(repeat):
+        # As in timeit, garbage collection is disabled so it does not add noise to the measurements.
+        # The trees of the previous runs are collected first, since they are full of reference cycles.
+        gc.collect()
+        gc.disable()
+        try:
+            start_time = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start_time)
+        finally:
+            gc.enable()
+    return times
+
+
+def get_peak_allocation(function: typing.Callable[[], typing.Any]) -> int:
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure_pages(
+        sample_pages: typing.Mapping[str, syllabus_scanner_non_persistent_models.PageEntry],
+        repeat: int,
+) -> typing.Iterator[Measurement]:
+    print(F"{'page':>16} {'rows':>6} {'ms/page':>10} {'us/row':>10} {'peak KiB':>10} {'courses':>8} {'failures':>9}")
+    for file_name, page_entry in sample_pages.items():
+        courses, failures = syllabus_scanner_page_parser.parse_page(page_entry=page_entry)
+        num_rows = page_entry.content.count(b"<tr")
+        parse_times = get_times(lambda: syllabus_scanner_page_parser.parse_page(page_entry=page_entry), repeat)
+        parse_time = min(parse_times)
+        typical_parse_time = statistics.median(parse_times)
+        peak_allocation = get_peak_allocation(lambda: syllabus_scanner_page_parser.parse_page(page_entry=page_entry))
+        num_course_groups = sum(len(course.course_groups) for course in courses)
+        print(
+            F"{file_name:>16} {num_rows:>6} {parse_time * 1e3:>10.2f} {parse_time / num_rows * 1e6:>10.1f} "
+            F"{peak_allocation / 1024:>10.0f} {num_course_groups:>8} {len(failures):>9}",
+        )
+        yield Measurement(
+            name=F"parse:{file_name}",
+            value=parse_time * 1e3,
+            typical_value=typical_parse_time * 1e3,
+            unit="ms",
+        )
+        yield Measurement(
+            name=F"parse_per_row:{file_name}",
+            value=parse_time / num_rows * 1e6,
+            typical_value=typical_parse_time / num_rows * 1e6,
+            unit="us",
+        )
+        yield Measurement(
+            name=F"peak_allocation:{file_name}",
+            value=peak_allocation / 1024,
+            typical_value=peak_allocation / 1024,
+            unit="KiB",
+        )
+
+
+def measure_helpers(
+        sample_pages: typing.Mapping[str, syllabus_scanner_non_persistent_models.PageEntry],
+        repeat: int,
+) -> typing.Iterator[Measurement]:
+    parser = syllabus_scanner_page_parser.SyllabusPageParser(page_entry=sample_pages["hebrew.html"])
+    rows: typing.List[Tag] = parser.body.find_all("tr")
+    cell_texts = [cell.text for row in rows for cell in syllabus_scanner_utils.get_cells(row=row)]
+    lookups: typing.Dict[str, typing.Tuple[typing.Callable[[str], typing.Any], typing.Sequence[str]]] = {
+        "Semester.from_text": (syllabus_scanner_non_persistent_models.Semester.from_text, ("א'", "ב'", "First")),
+        "MeetingType.from_text": (
+            syllabus_scanner_non_persistent_models.MeetingType.from_text,
+            ("שיעור", "תרגיל", "Lecture"),
+        ),
+        "Day.from_text": (syllabus_scanner_non_persistent_models.Day.from_text, ("א", "ה", "Mon")),
+        "Teacher.from_text": (syllabus_scanner_non_persistent_models.Teacher.from_text, ("Dr. Lecturer 1",)),
+    }
+
+    helper_calls: typing.Dict[str, typing.Tuple[typing.Callable[[], typing.Any], int]] = {
+        "utils.get_cells": (lambda: [syllabus_scanner_utils.get_cells(row=row) for row in rows], len(rows)),
+        "utils.normalize": (
+            lambda: [syllabus_scanner_utils.normalize(cell_text) for cell_text in cell_texts],
+            len(cell_texts),
+        ),
+    }
+    for lookup_name, (lookup, texts) in lookups.items():
+        helper_calls[lookup_name] = (
+            lambda lookup=lookup, texts=texts: [lookup(text) for _ in range(1000) for text in texts],
+            1000 * len(texts),
+        )
+
+    print(F"{'helper':>22} {'us/call':>10}")
+    for helper_name, (function, num_calls) in helper_calls.items():
+        call_times = [call_time / num_calls for call_time in get_times(function, repeat)]
+        print(F"{helper_name:>22} {min(call_times) * 1e6:>10.2f}")
+        yield Measurement(
+            name=F"call:{helper_name}",
+            value=min(call_times) * 1e6,
+            typical_value=statistics.median(call_times) * 1e6,
+            unit="us",
+        )
+
+
+def check_budgets(
+        measurements: typing.Sequence[Measurement],
+        budgets: typing.Mapping[str, float],
+        margin: float,
+) -> typing.List[str]:
+    exceeded: typing.List[str] = []
+    for measurement in measurements:
+        budget = budgets.get(measurement.name)
+        if budget is not None and measurement.value > budget * (1 + margin):
+            exceeded.append(
+                F"{measurement.name}: {measurement.value:.2f} {measurement.unit} "
+                F"exceeds the budget of {budget:.2f} {measurement.unit} by more than {margin:.0%}",
+            )
+    return exceeded
+
+
+def get_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--budgets",
+        type=str,
+        default=DEFAULT_BUDGETS_PATH,
+        help="The JSON file of the budget of every measurement",
+    )
+    parser.add_argument(
+        "--margin",
+        type=float,
+        default=0.5,
+        help="The fraction a measurement may exceed its budget by before the benchmark fails",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="The number of times to run every measurement (the best run is checked, and the median run is stored)",
+    )
+    parser.add_argument(
+        "--update-budgets",
+        action="store_true",
+        help="Store the measurements as the new budgets instead of checking them",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = get_arguments()
+    # Failure rows are logged by the parser, which is part of what is measured but not of what is reported.
+    logging.getLogger().addHandler(logging.NullHandler())
+
+    sample_pages = load_sample_pages()
+    measurements = (
+        *measure_pages(sample_pages=sample_pages, repeat=args.repeat),
+        *measure_helpers(sample_pages=sample_pages, repeat=args.repeat),
+    )
+
+    if args.update_budgets:
+        with open(args.budgets, "w", encoding="utf-8") as budgets_file:
+            json.dump(
+                obj={measurement.name: round(measurement.typical_value, 3) for measurement in measurements},
+                fp=budgets_file,
+                indent=4,
+            )
+            budgets_file.write("\n")
+        print(F"Stored {len(measurements)} budgets in {args.budgets}.")
+        return
+
+    with open(args.budgets, "r", encoding="utf-8") as budgets_file:
+        budgets = json.load(budgets_file)
+    exceeded = check_budgets(measurements=measurements, budgets=budgets, margin=args.margin)
+    for message in exceeded:
+        print(message)
+    if exceeded:
+        sys.exit(1)
+    print(F"All {len(measurements)} measurements are within {args.margin:.0%} of their budgets.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Measures how long it takes to load the pagination chains of several departments from a local stand-in site,
+with the loader that extracts the navigation from the raw bytes and requests the next page at once, against a loader
+that requests the next page only after the current page was parsed with BeautifulSoup and queued.
+With pipelining the time per page should be close to the latency of the site.
+Run from the repository root with: python -m benchmarks.pagination
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import time
+import typing
+
+from aiohttp import ClientSession
+from bs4 import BeautifulSoup
+
+from benchmarks import stand_in_site
+from syllabus_scanner import consumer as syllabus_scanner_consumer
+from syllabus_scanner import loader as syllabus_scanner_loader
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+from syllabus_scanner import page_navigation as syllabus_scanner_page_navigation
+from syllabus_scanner import request_scheduler as syllabus_scanner_request_scheduler
+
+
+def get_soup_page_navigation(page: bytes) -> syllabus_scanner_non_persistent_models.PageNavigation:
+    body = BeautifulSoup(page, "html.parser").body
+    form = body.find("form", attrs={"id": syllabus_scanner_page_navigation.GRID_FORM_ID})
+    return syllabus_scanner_non_persistent_models.PageNavigation(
+        has_body=True,
+        has_next=body.find("input", attrs={"id": syllabus_scanner_page_navigation.NEXT_INPUT_ID}) is not None,
+        method=form.attrs["method"].upper(),
+        view_state=form.find("input", attrs={"id": syllabus_scanner_page_navigation.VIEW_STATE_INPUT_ID})["value"],
+        event_validation=form.find(
+            "input",
+            attrs={"id": syllabus_scanner_page_navigation.EVENT_VALIDATION_INPUT_ID},
+        )["value"],
+    )
+
+
+class SequentialLoader(syllabus_scanner_loader.SyllabusLoader):
+    """
+    Loads every chain without pipelining: the next page is requested only after the current page was parsed with
+    BeautifulSoup in the parse workers, and put in the queue.
+    """
+
+    def __init__(self, *args, parse_executor: concurrent.futures.Executor, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._parse_executor = parse_executor
+
+    async def _load_syllabus_pages(
+            self,
+            session: ClientSession,
+            department_query: syllabus_scanner_non_persistent_models.DepartmentQuery,
+    ) -> None:
+        loop = asyncio.get_event_loop()
+        page_number = 1
+        page = await self._get_first_page(session=session, department_query=department_query)
+        while page is not None:
+            page_navigation = await loop.run_in_executor(self._parse_executor, get_soup_page_navigation, page)
+            await self.queue.put(syllabus_scanner_non_persistent_models.PageEntry(
+                department=department_query.department,
+                page_number=page_number,
+                content=page,
+            ))
+            page_number += 1
+            page = await self._get_next_page(
+                session=session,
+                department_query=department_query,
+                page_number=page_number,
+                page_navigation=page_navigation,
+            )
+
+
+def get_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--departments", type=int, default=4, help="The number of departments to load")
+    parser.add_argument("--pages", type=int, default=10, help="The number of pages of every department")
+    parser.add_argument("--latency", type=float, default=0.2, help="The latency of the stand-in site in seconds")
+    parser.add_argument("--view-state-kb", type=int, default=64, help="The size of the form state of every page")
+    parser.add_argument("--parse-workers", type=int, help="The number of parse processes (defaults to the CPUs)")
+    return parser.parse_args()
+
+
+async def load_departments(
+        loader_class: typing.Type[syllabus_scanner_loader.SyllabusLoader],
+        departments: typing.Sequence[syllabus_scanner_non_persistent_models.Department],
+        site: stand_in_site.StandInSite,
+        parse_executor: concurrent.futures.Executor,
+) -> float:
+    loader_arguments = {"parse_executor": parse_executor} if loader_class is SequentialLoader else {}
+    loader = loader_class(
+        language=syllabus_scanner_non_persistent_models.Language.hebrew,
+        year=2021,
+        departments=departments,
+        request_scheduler=syllabus_scanner_request_scheduler.RequestScheduler(
+            rate_limit=0,
+            initial_concurrency=len(departments),
+            max_concurrency=len(departments),
+        ),
+        url=site.url,
+        **loader_arguments,
+    )
+    consumer = syllabus_scanner_consumer.SyllabusConsumer(departments=departments, parse_executor=parse_executor)
+    loader.set_consumer(consumer.consumer)
+    async with syllabus_scanner_loader.create_session(
+        connection_settings=syllabus_scanner_loader.ConnectionSettings(),
+        connection_statistics=syllabus_scanner_loader.ConnectionStatistics(),
+    ) as session:
+        start_time = time.perf_counter()
+        await loader.load(session=session)
+        return time.perf_counter() - start_time
+
+
+async def run_benchmark(args: argparse.Namespace) -> None:
+    departments = syllabus_scanner_non_persistent_models.Department.all()[:args.departments]
+    network_time = args.pages * args.latency
+    page = stand_in_site.create_page(
+        department_code=departments[0].value,
+        year=2021,
+        page_number=1,
+        num_pages=args.pages,
+        view_state_size=args.view_state_kb * 1024,
+    )
+    for name, get_page_navigation in (
+            ("BeautifulSoup", get_soup_page_navigation),
+            ("raw bytes", syllabus_scanner_page_navigation.extract_page_navigation),
+    ):
+        start_time = time.perf_counter()
+        for _ in range(20):
+            get_page_navigation(page)
+        print(F"Navigation with {name}: {(time.perf_counter() - start_time) / 20 * 1000:.2f} ms per page")
+
+    print(F"{'loader':>12} {'seconds':>10} {'ms/page':>10} {'network ms/page':>16}")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.parse_workers or os.cpu_count()) as parse_executor:
+        async with stand_in_site.StandInSite(settings=stand_in_site.SiteSettings(
+                num_pages=args.pages,
+                view_state_size=args.view_state_kb * 1024,
+                latency=args.latency,
+        )) as site:
+            for name, loader_class in (
+                    ("sequential", SequentialLoader),
+                    ("pipelined", syllabus_scanner_loader.SyllabusLoader),
+            ):
+                load_time = await load_departments(
+                    loader_class=loader_class,
+                    departments=departments,
+                    site=site,
+                    parse_executor=parse_executor,
+                )
+                print(
+                    F"{name:>12} {load_time:>10.2f} {load_time / args.pages * 1000:>10.1f} "
+                    F"{network_time / args.pages * 1000:>16.1f}",
+                )
+
+
+def main() -> None:
+    asyncio.get_event_loop().run_until_complete(run_benchmark(args=get_arguments()))
+
+
+if __name__ == "__main__":
+    main()
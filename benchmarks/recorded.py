@@ -0,0 +1,31 @@
+import os
+import typing
+
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+
+
+def load_page_entries(cache_dir: str) -> typing.Iterator[syllabus_scanner_non_persistent_models.PageEntry]:
+    """
+    Loads the pages recorded by a scan with --cache-mode record.
+    The cache layout is <cache dir>/<language>/<year>/<department>/<page number>-<request hash>.html.
+    :param cache_dir: The cache directory the scan recorded to.
+    :returns: The recorded pages, ordered by language, year, department and page number.
+    """
+    for language_name in sorted(os.listdir(cache_dir)):
+        language_dir = os.path.join(cache_dir, language_name)
+        for year in sorted(os.listdir(language_dir)):
+            year_dir = os.path.join(language_dir, year)
+            for department_name in sorted(os.listdir(year_dir)):
+                department_dir = os.path.join(year_dir, department_name)
+                page_file_names = sorted(
+                    (file_name for file_name in os.listdir(department_dir) if file_name.endswith(".html")),
+                    key=lambda file_name: int(file_name.split("-", 1)[0]),
+                )
+                for page_file_name in page_file_names:
+                    with open(os.path.join(department_dir, page_file_name), "rb") as page_file:
+                        content = page_file.read()
+                    yield syllabus_scanner_non_persistent_models.PageEntry(
+                        department=getattr(syllabus_scanner_non_persistent_models.Department, department_name),
+                        page_number=int(page_file_name.split("-", 1)[0]),
+                        content=content,
+                    )
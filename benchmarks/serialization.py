@@ -0,0 +1,89 @@
+"""
+Measures the time it takes to serialize the results of a full scan: as JSON through serialize and json.dump,
+as JSON through the direct encoder the CLI uses, and as the text report.
+Run from the repository root with: python -m benchmarks.serialization --cache-dir <recorded scan>
+Without --cache-dir, synthetic results are measured instead.
+"""
+import argparse
+import json
+import os
+import time
+import typing
+
+from benchmarks import recorded
+from benchmarks import synthetic
+from syllabus_scanner import json_encoder as syllabus_scanner_json_encoder
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+from syllabus_scanner import page_parser as syllabus_scanner_page_parser
+
+
+def get_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        help="The cache directory of a scan recorded with --cache-mode record",
+    )
+    parser.add_argument(
+        "--num-courses",
+        type=int,
+        default=20000,
+        help="The number of synthetic courses to measure when no recorded scan is provided",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="The number of times to serialize the results (the best time is reported)",
+    )
+    return parser.parse_args()
+
+
+def load_results(args: argparse.Namespace) -> syllabus_scanner_non_persistent_models.ScanResults:
+    if args.cache_dir is None:
+        return synthetic.create_scan_results(num_courses=args.num_courses)
+    courses: typing.List[syllabus_scanner_non_persistent_models.CourseInfo] = []
+    failures: typing.List[syllabus_scanner_non_persistent_models.CourseGroupParsingFailure] = []
+    for page_entry in recorded.load_page_entries(cache_dir=args.cache_dir):
+        page_courses, page_failures = syllabus_scanner_page_parser.parse_page(page_entry=page_entry)
+        courses.extend(page_courses)
+        failures.extend(page_failures)
+    return syllabus_scanner_non_persistent_models.ScanResults(courses=tuple(courses), failures=tuple(failures))
+
+
+def measure(function: typing.Callable[[], typing.Any], repeat: int) -> float:
+    best_time = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        best_time = min(best_time, time.perf_counter() - start_time)
+    return best_time
+
+
+def main() -> None:
+    args = get_arguments()
+    results = load_results(args)
+    num_course_groups = sum(len(course.course_groups) for course in results.courses)
+    print(F"Courses: {len(results.courses)}, course groups: {num_course_groups}")
+
+    with open(os.devnull, "w", encoding="utf-8") as null_file:
+        stages = (
+            ("serialize", results.serialize),
+            ("json", lambda: json.dump(obj=results.serialize(), fp=null_file, ensure_ascii=False)),
+            (
+                "json encoder",
+                lambda: syllabus_scanner_json_encoder.ScanResultsJsonEncoder().write_scan_results(
+                    results=results,
+                    text_file=null_file,
+                ),
+            ),
+            ("text report", lambda: results.write_text(text_file=null_file)),
+        )
+        print(F"{'stage':>14} {'seconds':>10} {'us/group':>10}")
+        for stage_name, function in stages:
+            seconds = measure(function=function, repeat=args.repeat)
+            print(F"{stage_name:>14} {seconds:>10.4f} {seconds / num_course_groups * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
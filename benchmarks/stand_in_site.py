@@ -0,0 +1,269 @@
+"""
+A local stand-in for the syllabus site, serving generated pages with the same structure as the real ones.
+Every department has the same number of pages, and the form state of a page encodes the page it belongs to.
+Serve it on its own with: python -m benchmarks.stand_in_site --port 8765 --latency 0.1
+"""
+import argparse
+import asyncio
+import base64
+import contextlib
+import hashlib
+import multiprocessing
+import random
+import typing
+
+from aiohttp import web
+
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+
+SEARCH_PATH = "/tal/kr/Search_L.aspx"
+HEBREW = syllabus_scanner_non_persistent_models.Language.hebrew
+ENGLISH = syllabus_scanner_non_persistent_models.Language.english
+
+
+class _LanguageTexts(typing.NamedTuple):
+    course_group_marker: str
+    days: typing.Tuple[str, ...]
+    semesters: typing.Tuple[str, ...]
+    meeting_types: typing.Tuple[str, ...]
+
+
+LANGUAGE_TEXTS = {
+    HEBREW: _LanguageTexts(
+        course_group_marker="קב'",
+        days=("א", "ב", "ג", "ד", "ה", "ו"),
+        semesters=("א'", "ב'", "קיץ"),
+        meeting_types=("שיעור", "תרגיל", "שיעור ותרגיל", "סמינר", "מעבדה", "סדנה"),
+    ),
+    ENGLISH: _LanguageTexts(
+        course_group_marker="Gr",
+        days=("Sun", "Mon", "Tue", "Wed", "Thu", "Fri"),
+        semesters=("First", "Second", "Summer"),
+        meeting_types=("Lecture", "Exercise", "Lecture and Exercise", "Seminar", "Laboratory", "Workshop"),
+    ),
+}
+# Rows the parser rejects, one of which replaces a course group with the failure rate.
+FAILURE_KINDS = ("faculty_and_school", "meeting_cells", "semester", "partial_row_first")
+
+
+def _create_course_group_rows(
+        random_generator: random.Random,
+        language_texts: _LanguageTexts,
+        course_group_index: int,
+        multi_teacher_rate: float,
+        failure_kind: typing.Optional[str],
+) -> typing.List[str]:
+    course_code = F"{random_generator.randint(1000, 1999):04d}-{random_generator.randint(1000, 9999):04d}"
+    course_group_name = F"{course_group_index % 9 + 1:02d}"
+    faculty_and_school = "Faculty" if failure_kind == "faculty_and_school" else "Faculty/School"
+    rows = [
+        '<tr class="listtds"><td></td></tr>',
+        F"<tr><td>{course_code} {language_texts.course_group_marker}: {course_group_name}</td>"
+        F"<td>Course&nbsp;{course_code}</td></tr>",
+        F"<tr><td></td><td>{faculty_and_school}</td></tr>",
+        "<tr><td>Lecturer</td><td>Type</td></tr>",
+    ]
+    if failure_kind == "partial_row_first":
+        rows.append("<tr><td>Dr. Lecturer 0</td><td></td></tr>")
+    for meeting_index in range(random_generator.randint(1, 3)):
+        semester = random_generator.choice(language_texts.semesters)
+        if failure_kind == "semester" and meeting_index == 0:
+            semester = "?"
+        rows.append(
+            F"<tr><td>Dr. Lecturer {random_generator.randint(1, 50)}</td>"
+            F"<td>{random_generator.choice(language_texts.meeting_types)}</td>"
+            F"<td>Building {random_generator.randint(1, 9)}</td><td>{random_generator.randint(1, 400)}</td>"
+            F"<td>{random_generator.choice(language_texts.days)}</td><td>10:00-12:00</td>"
+            F"<td>{semester}</td></tr>",
+        )
+        if failure_kind == "meeting_cells" and meeting_index == 0:
+            rows.append("<tr><td></td><td></td><td></td><td></td></tr>")
+        # Every additional teacher of a meeting gets a row of its own, with only the teacher name.
+        while random_generator.random() < multi_teacher_rate:
+            rows.append(F"<tr><td>Prof. Lecturer {random_generator.randint(1, 50)}</td><td></td></tr>")
+    rows.append('<tr style="border-bottom: 1px solid"><td></td></tr>')
+    return rows
+
+
+def create_page(
+        department_code: str,
+        year: int,
+        page_number: int,
+        num_pages: int,
+        num_course_groups: int = 40,
+        view_state_size: int = 64 * 1024,
+        language: syllabus_scanner_non_persistent_models.Language = HEBREW,
+        multi_teacher_rate: float = 0.3,
+        failure_rate: float = 0.0,
+) -> bytes:
+    """
+    Creates a page of course groups.
+    :param department_code: The department code the page was requested for.
+    :param year: The Gregorian year the academic year starts at.
+    :param page_number: The number of the page, starting at 1.
+    :param num_pages: The number of pages of the department.
+    :param num_course_groups: The number of course groups in the page.
+    :param view_state_size: The size of the __VIEWSTATE input, which is usually the bulk of a real page.
+    :param language: The language of the page.
+    :param multi_teacher_rate: The chance of a meeting to have another teacher, in a partial row of its own.
+    :param failure_rate: The chance of a course group to have a row the parser rejects.
+    :returns: The page content.
+    """
+    random_generator = random.Random(F"{department_code}-{year}-{page_number}-{language.name}")
+    rows: typing.List[str] = []
+    for course_group_index in range(num_course_groups):
+        failure_kind = random_generator.choice(FAILURE_KINDS) if random_generator.random() < failure_rate else None
+        rows.extend(_create_course_group_rows(
+            random_generator=random_generator,
+            language_texts=LANGUAGE_TEXTS[language],
+            course_group_index=course_group_index,
+            multi_teacher_rate=multi_teacher_rate,
+            failure_kind=failure_kind,
+        ))
+
+    # The page state travels at the start of __VIEWSTATE, base64 encoded as in the real site,
+    # and the rest of it is padding that stands in for the rest of the real form state.
+    state = base64.b64encode(F"{department_code}|{year}|{page_number}|{language.name}".encode("utf-8"))
+    view_state = F"{state.decode('ascii')}.{'A' * view_state_size}"
+    next_input = '<input type="submit" id="next" value="next">' if page_number < num_pages else ""
+    return (
+        F'<html><head></head><body><form id="frmgrid" method="post" action="Search_L.aspx">'
+        F'<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{view_state}">'
+        F'<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="{_get_event_validation(state)}">'
+        F'<table><tr><td class="listtdbbld">{year}/{year + 1}</td></tr>{"".join(rows)}</table>'
+        F"{next_input}</form></body></html>"
+    ).encode("utf-8")
+
+
+def _get_event_validation(state: bytes) -> str:
+    return hashlib.sha256(state).hexdigest()[:16]
+
+
+class SiteSettings(typing.NamedTuple):
+    num_pages: int = 10
+    num_course_groups: int = 40
+    view_state_size: int = 64 * 1024
+    # The latency of every response in seconds, give or take the jitter.
+    latency: float = 0.0
+    jitter: float = 0.0
+    # The fraction of the requests that fail with 503, as an overloaded server does.
+    error_rate: float = 0.0
+    # The fraction of the course groups with a row the parser rejects.
+    failure_rate: float = 0.0
+    seed: int = 0
+
+
+class StandInSite:
+    """
+    Serves the stand-in site on a local port for the duration of an async with block.
+    It follows the POST flow of Search_L.aspx: the first page of a department is requested with lstYear1 and lstDep1,
+    and every following page with the __VIEWSTATE and __EVENTVALIDATION of the page before it.
+    Requests with form state the site did not send are rejected, as the real site rejects them.
+    """
+
+    def __init__(self, settings: SiteSettings = SiteSettings(), port: int = 0):
+        self.settings = settings
+        self.port = port
+        self.num_requests = 0
+        self.num_errors = 0
+        self.url: typing.Optional[str] = None
+        self._random_generator = random.Random(settings.seed)
+        self._runner: typing.Optional[web.AppRunner] = None
+
+    async def _handle_search(self, request: web.Request) -> web.Response:
+        self.num_requests += 1
+        form = await request.post()
+        delay = self.settings.latency + self._random_generator.uniform(-self.settings.jitter, self.settings.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self._random_generator.random() < self.settings.error_rate:
+            self.num_errors += 1
+            return web.Response(status=503, text="Service Unavailable")
+
+        if "__VIEWSTATE" in form:
+            state = form["__VIEWSTATE"].split(".", 1)[0].encode("ascii")
+            if form.get("__EVENTVALIDATION") != _get_event_validation(state):
+                return web.Response(status=500, text="Invalid postback or callback argument.")
+            department_code, year, page_number, language_name = base64.b64decode(state).decode("utf-8").split("|")
+            year, page_number = int(year), int(page_number) + 1
+            language = getattr(syllabus_scanner_non_persistent_models.Language, language_name)
+        elif "lstYear1" in form and "lstDep1" in form:
+            department_code, year, page_number = form["lstDep1"], int(form["lstYear1"]), 1
+            is_english = form.get("taulang") == "eng" or request.query.get("lang") == "EN"
+            language = ENGLISH if is_english else HEBREW
+        else:
+            return web.Response(status=400, text="Expected lstYear1 and lstDep1, or the form state of a page.")
+
+        page = create_page(
+            department_code=department_code,
+            year=year,
+            page_number=page_number,
+            num_pages=self.settings.num_pages,
+            num_course_groups=self.settings.num_course_groups,
+            view_state_size=self.settings.view_state_size,
+            language=language,
+            failure_rate=self.settings.failure_rate,
+        )
+        return web.Response(body=page, content_type="text/html", charset="utf-8")
+
+    async def __aenter__(self) -> "StandInSite":
+        application = web.Application()
+        application.router.add_route("*", SEARCH_PATH, self._handle_search)
+        self._runner = web.AppRunner(application)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host="127.0.0.1", port=self.port)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = F"http://{host}:{port}{SEARCH_PATH}"
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self._runner.cleanup()
+
+
+async def _serve(settings: SiteSettings, port: int, urls: multiprocessing.Queue) -> None:
+    async with StandInSite(settings=settings, port=port) as site:
+        urls.put(site.url)
+        await asyncio.Event().wait()
+
+
+def _run_site(settings: SiteSettings, port: int, urls: multiprocessing.Queue) -> None:
+    # The forked process inherits the event loop of its parent, which a loop of its own keeps the site off.
+    asyncio.run(_serve(settings=settings, port=port, urls=urls))
+
+
+@contextlib.contextmanager
+def run_site_process(settings: SiteSettings, port: int = 0) -> typing.Iterator[str]:
+    """
+    Serves the stand-in site from a process of its own, so it does not share the CPU time of the scan it serves.
+    :param settings: The settings of the site.
+    :param port: The port to serve on, or zero for any free port.
+    :returns: A context manager of the URL of the search page, which stops the site on exit.
+    """
+    urls = multiprocessing.Queue()
+    site_process = multiprocessing.Process(target=_run_site, args=(settings, port, urls), daemon=True)
+    site_process.start()
+    try:
+        yield urls.get(timeout=30)
+    finally:
+        site_process.terminate()
+        site_process.join()
+
+
+def get_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765, help="The port to serve on")
+    for field_name, default in SiteSettings._field_defaults.items():
+        parser.add_argument(F"--{field_name.replace('_', '-')}", type=type(default), default=default)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = get_arguments()
+    settings = SiteSettings(**{field_name: getattr(args, field_name) for field_name in SiteSettings._fields})
+    print(F"Serving on http://127.0.0.1:{args.port}{SEARCH_PATH}, set SYLLABUS_URL to scan it.")
+    asyncio.get_event_loop().run_until_complete(_serve(settings=settings, port=args.port, urls=multiprocessing.Queue()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import random
+import typing
+
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+
+
+def create_scan_results(num_courses: int, seed: int = 0) -> syllabus_scanner_non_persistent_models.ScanResults:
+    """
+    Creates scan results shaped like a real scan: a few groups per course, a few meetings per group,
+    and a small pool of teachers, buildings and rooms shared by all the meetings.
+    :param num_courses: The number of courses to create.
+    :param seed: The seed of the random generator, so runs are comparable.
+    :returns: The created scan results.
+    """
+    rng = random.Random(seed)
+    teachers = tuple(
+        syllabus_scanner_non_persistent_models.Teacher(honorific="Dr.", full_name=F"Teacher {idx}")
+        for idx in range(max(num_courses // 4, 1))
+    )
+    meeting_types = syllabus_scanner_non_persistent_models.MeetingType.all()
+    days = tuple(syllabus_scanner_non_persistent_models.Day)
+    semesters = (syllabus_scanner_non_persistent_models.Semester.a, syllabus_scanner_non_persistent_models.Semester.b)
+
+    courses: typing.List[syllabus_scanner_non_persistent_models.CourseInfo] = []
+    for course_idx in range(num_courses):
+        course_code = F"{course_idx // 10000:04d}-{course_idx % 10000:04d}"
+        semester = rng.choice(semesters)
+        course_groups = []
+        for group_idx in range(rng.randint(1, 3)):
+            meetings = []
+            for _ in range(rng.randint(1, 3)):
+                starting_hour = rng.randint(8, 18)
+                meetings.append(syllabus_scanner_non_persistent_models.CourseGroupMeetingInfo(
+                    meeting_type=rng.choice(meeting_types),
+                    teachers=set(rng.sample(teachers, k=min(rng.randint(1, 2), len(teachers)))),
+                    building=F"Building {rng.randint(1, 40)}",
+                    room=str(rng.randint(1, 400)),
+                    semester=semester,
+                    day=rng.choice(days),
+                    starting_time=F"{starting_hour:02d}:00",
+                    ending_time=F"{starting_hour + 2:02d}:00",
+                ))
+            course_groups.append(syllabus_scanner_non_persistent_models.CourseGroupInfo(
+                course_code=course_code,
+                course_name=F"Course {course_idx}",
+                course_group_name=F"{group_idx + 1:02d}",
+                faculty=F"Faculty {course_idx % 9}",
+                school=F"School {course_idx % 31}",
+                meetings=tuple(meetings),
+            ))
+        courses.append(syllabus_scanner_non_persistent_models.CourseInfo(
+            course_code=course_code,
+            year=2021,
+            course_groups=course_groups,
+        ))
+
+    failures = tuple(
+        syllabus_scanner_non_persistent_models.CourseGroupParsingFailure(
+            department=syllabus_scanner_non_persistent_models.Department.law,
+            page_number=idx,
+            index_in_page=0,
+            exception_message="Synthetic failure.",
+        )
+        for idx in range(num_courses // 100)
+    )
+    return syllabus_scanner_non_persistent_models.ScanResults(courses=tuple(courses), failures=failures)
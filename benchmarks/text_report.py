@@ -0,0 +1,46 @@
+"""
+Measures the time it takes to write the text report, for a growing number of courses.
+The time per course should stay flat as the number of courses grows.
+Run from the repository root with: python -m benchmarks.text_report
+"""
+import argparse
+import os
+import time
+
+from benchmarks import synthetic
+
+
+def get_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--num-courses",
+        type=int,
+        nargs="+",
+        default=(1000, 2000, 4000, 8000, 16000, 32000),
+        help="The numbers of courses to measure",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="The number of times to write every report (the best time is reported)",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = get_arguments()
+    print(F"{'courses':>10} {'seconds':>10} {'us/course':>10}")
+    with open(os.devnull, "w", encoding="utf-8") as null_file:
+        for num_courses in args.num_courses:
+            results = synthetic.create_scan_results(num_courses=num_courses)
+            best_time = float("inf")
+            for _ in range(args.repeat):
+                start_time = time.perf_counter()
+                results.write_text(text_file=null_file)
+                best_time = min(best_time, time.perf_counter() - start_time)
+            print(F"{num_courses:>10} {best_time:>10.3f} {best_time / num_courses * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,26 @@
 #!/usr/bin/env python3
 import argparse
+import contextlib
+import hashlib
 import json
 import logging
+import os
+import sys
+import time
 import typing
 from datetime import datetime
 
+from syllabus_scanner import checkpoint as syllabus_scanner_checkpoint
+from syllabus_scanner import fingerprint_store as syllabus_scanner_fingerprint_store
+from syllabus_scanner import json_encoder as syllabus_scanner_json_encoder
 from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
-from syllabus_scanner import scanner
+from syllabus_scanner import page_cache as syllabus_scanner_page_cache
+from syllabus_scanner import results_writer as syllabus_scanner_results_writer
+from syllabus_scanner import scan_metrics as syllabus_scanner_scan_metrics
+from syllabus_scanner import sharding as syllabus_scanner_sharding
+from syllabus_scanner import sqlite_store as syllabus_scanner_sqlite_store
+# The scanner is imported only by the functions that scan, since it imports aiohttp and BeautifulSoup, which take
+# most of the startup time, and --help or an argument error should not wait for them.
 
 
 def setup_logger():
@@ -29,6 +43,67 @@ def get_departments(
     )
 
 
+def get_page_cache(cache_mode_name: str, cache_dir: str) -> typing.Optional[syllabus_scanner_page_cache.PageCache]:
+    cache_mode = syllabus_scanner_page_cache.CacheMode(cache_mode_name)
+    if cache_mode == syllabus_scanner_page_cache.CacheMode.off:
+        return None
+    return syllabus_scanner_page_cache.PageCache(directory=cache_dir, mode=cache_mode)
+
+
+def get_fingerprint_store(json_path: str, reparse_all: bool) -> syllabus_scanner_fingerprint_store.FingerprintStore:
+    fingerprints_path = F"{json_path}.fingerprints"
+    if reparse_all:
+        return syllabus_scanner_fingerprint_store.FingerprintStore(path=fingerprints_path)
+    return syllabus_scanner_fingerprint_store.FingerprintStore.load(path=fingerprints_path)
+
+
+def get_checkpoint(
+        args: argparse.Namespace,
+        scan_target: syllabus_scanner_non_persistent_models.ScanTarget,
+) -> syllabus_scanner_checkpoint.ScanCheckpoint:
+    # Scans writing different results, such as the shards of a scan or a JSON and an ndjson scan of the same year,
+    # keep their checkpoints apart, so one of them starting over does not lose the progress of the others.
+    results_path = os.path.abspath(args.json)
+    results_path_hash = hashlib.sha256(results_path.encode("utf-8")).hexdigest()[:8]
+    return syllabus_scanner_checkpoint.ScanCheckpoint(
+        directory=args.checkpoint_dir,
+        language=scan_target.language,
+        year=scan_target.year,
+        resume=args.resume,
+        scan_name=F"{os.path.basename(results_path)}-{results_path_hash}",
+    )
+
+
+def get_scan_target(scan_target_text: str) -> syllabus_scanner_non_persistent_models.ScanTarget:
+    try:
+        return syllabus_scanner_non_persistent_models.ScanTarget.from_text(scan_target_text)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+
+
+def get_shard(shard_text: str) -> syllabus_scanner_sharding.Shard:
+    try:
+        return syllabus_scanner_sharding.Shard.from_text(shard_text)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+
+
+def get_target_departments(args: argparse.Namespace) -> typing.Dict[
+    syllabus_scanner_non_persistent_models.ScanTarget,
+    typing.Sequence[syllabus_scanner_non_persistent_models.Department],
+]:
+    scan_targets = args.scan_target or (
+        syllabus_scanner_non_persistent_models.ScanTarget(language=get_language(args.lang), year=args.year),
+    )
+    departments = (
+        get_departments(department_names=args.department or ())
+        or syllabus_scanner_non_persistent_models.Department.all()
+    )
+    if args.shard is None:
+        return {scan_target: departments for scan_target in scan_targets}
+    return args.shard.get_target_departments(scan_targets=scan_targets, departments=departments)
+
+
 def get_default_year() -> int:
     today = datetime.today()
     # Move to next year on August.
@@ -40,7 +115,9 @@ def get_default_year() -> int:
 
 
 def get_arguments() -> argparse.Namespace:
-    parser = argparse.ArgumentParser()
+    parser = argparse.ArgumentParser(
+        epilog="Run cli.py merge --help to combine the outputs of a scan split across machines with --shard.",
+    )
     parser.add_argument(
         "--lang",
         choices=tuple(language.name for language in syllabus_scanner_non_persistent_models.Language.all()),
@@ -53,6 +130,31 @@ def get_arguments() -> argparse.Namespace:
         required=True,
         help="The file path to store the result at",
     )
+    parser.add_argument(
+        "--format",
+        choices=("json", "ndjson", "sqlite"),
+        default="json",
+        help="Write a single JSON document, stream one course per line as soon as it is parsed "
+             "(failures go to a separate <name>.failures file), or upsert the courses into the SQLite database "
+             "at the --json path, deleting the groups a scan of all the departments did not find "
+             "(with ndjson and sqlite, unchanged pages are always parsed again)",
+    )
+    parser.add_argument(
+        "--columnar-results",
+        action="store_true",
+        help="Keep the results of a JSON scan in a compact columnar store until they are written",
+    )
+    parser.add_argument(
+        "--report",
+        choices=("full", "summary", "none"),
+        default="full",
+        help="The text report to write after a JSON scan",
+    )
+    parser.add_argument(
+        "--report-file",
+        type=str,
+        help="The file path to write the text report to (defaults to the standard output)",
+    )
     parser.add_argument(
         "--year",
         default=get_default_year(),
@@ -65,27 +167,373 @@ def get_arguments() -> argparse.Namespace:
         nargs="+",
         help="The department name(s) to scan",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--scan-target",
+        type=get_scan_target,
+        nargs="+",
+        help="Scan several <language>:<year> pairs (e.g. hebrew:2021 english:2021) in one run, "
+             "instead of --lang and --year, and join the languages of every course into one bilingual record",
+    )
+    parser.add_argument(
+        "--shard",
+        type=get_shard,
+        help="Scan only the <number>/<count> shard (e.g. 2/3) of the language, year and department pairs, "
+             "so count machines can split a scan, and combine their outputs with cli.py merge",
+    )
+    parser.add_argument(
+        "--max-concurrent-requests",
+        type=int,
+        help="The maximal number of requests in flight (the actual limit adapts to the server below it)",
+    )
+    parser.add_argument(
+        "--max-buffered-mb",
+        type=float,
+        help="The total size in MB of the pages loaded but not parsed yet, after which loading waits for the parser",
+    )
+    parser.add_argument(
+        "--shard-departments",
+        action="store_true",
+        help="Load every department code packed in a department concurrently, as a separate query",
+    )
+    parser.add_argument(
+        "--shard-by-day",
+        action="store_true",
+        help="Load every department code and day concurrently, as a separate query (implies --shard-departments)",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        help="The number of processes used to parse the pages (defaults to the number of CPUs)",
+    )
+    parser.add_argument(
+        "--cache-mode",
+        choices=tuple(cache_mode.value for cache_mode in syllabus_scanner_page_cache.CacheMode.all()),
+        default=syllabus_scanner_page_cache.CacheMode.off.value,
+        help="Whether to record the fetched pages to the cache directory, or replay them from it",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=".syllabus_cache",
+        help="The directory to record the fetched pages to and replay them from",
+    )
+    parser.add_argument(
+        "--reparse-all",
+        action="store_true",
+        help="Parse every page, even the ones that did not change since the previous scan to the same JSON path",
+    )
+    parser.add_argument(
+        "--checkpoint-dir",
+        type=str,
+        default=".syllabus_checkpoints",
+        help="The directory to record the progress of the scan to, until its results are written "
+             "(scans writing to different --json paths keep their progress apart)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted scan from the last page of every department recorded in the checkpoint directory",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        type=str,
+        help="The file path to write the metrics of the scan to as JSON (defaults to <name>.metrics.json)",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        type=str,
+        help="The file path to write the metrics of the scan to in the Prometheus text format, "
+             "for the textfile collector of the node exporter (defaults to <name>.prom)",
+    )
+    args = parser.parse_args()
+    if args.scan_target and args.format != "json":
+        parser.error("--scan-target only supports --format json")
+    if args.shard is not None:
+        if args.format == "sqlite":
+            parser.error("--shard only supports --format json and ndjson, whose outputs cli.py merge combines")
+        if not get_target_departments(args):
+            parser.error(F"--shard {args.shard} has no departments to scan, use a smaller shard count")
+    return args
 
 
-def main() -> None:
-    setup_logger()
-    args = get_arguments()
+def get_merge_arguments(arguments: typing.Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="cli.py merge",
+        description="Combine the outputs of a scan split across machines with --shard into the output of the whole "
+                    "scan, with every course and group once.",
+    )
+    parser.add_argument(
+        "inputs",
+        type=str,
+        nargs="+",
+        help="The outputs of the shards to merge (with ndjson, their <name>.failures files are merged as well)",
+    )
+    parser.add_argument(
+        "--json",
+        type=str,
+        required=True,
+        help="The file path to store the merged result at",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("json", "ndjson"),
+        default="json",
+        help="The format the shards wrote their outputs in, which the merged result is written in as well",
+    )
+    return parser.parse_args(arguments)
+
+
+def get_scan_arguments(args: argparse.Namespace) -> typing.Dict[str, typing.Any]:
+    scan_target = syllabus_scanner_non_persistent_models.ScanTarget(language=get_language(args.lang), year=args.year)
+    return {
+        "language": scan_target.language,
+        "year": scan_target.year,
+        # The departments of --scan-target are looked up for every target by write_bilingual_json.
+        "departments": get_target_departments(args)[scan_target] if not args.scan_target else (),
+        "parse_workers": args.parse_workers,
+        "page_cache": get_page_cache(cache_mode_name=args.cache_mode, cache_dir=args.cache_dir),
+        "max_concurrent_requests": args.max_concurrent_requests,
+        "max_buffered_mb": args.max_buffered_mb,
+        "shard_departments": args.shard_departments,
+        "shard_by_day": args.shard_by_day,
+    }
+
+
+def get_failures_path(json_path: str) -> str:
+    root, extension = os.path.splitext(json_path)
+    return F"{root}.failures{extension}"
+
+
+def get_metrics_paths(args: argparse.Namespace) -> typing.Tuple[str, str]:
+    root, _ = os.path.splitext(args.json)
+    return args.metrics_json or F"{root}.metrics.json", args.metrics_textfile or F"{root}.prom"
+
+
+def write_metrics(
+        args: argparse.Namespace,
+        all_metrics: typing.Sequence[syllabus_scanner_scan_metrics.ScanMetrics],
+) -> None:
+    metrics_json_path, metrics_textfile_path = get_metrics_paths(args)
+    syllabus_scanner_scan_metrics.write_json(all_metrics=all_metrics, path=metrics_json_path)
+    syllabus_scanner_scan_metrics.write_prometheus_textfile(all_metrics=all_metrics, path=metrics_textfile_path)
+
+
+def write_report(
+        results: typing.Union[
+            syllabus_scanner_non_persistent_models.ScanResults,
+            syllabus_scanner_non_persistent_models.BilingualScanResults,
+        ],
+        report: str,
+        report_path: typing.Optional[str],
+) -> None:
+    if report == "none":
+        return
+
+    if report_path is None:
+        report_file_context = contextlib.nullcontext(sys.stdout)
+    else:
+        report_file_context = open(report_path, "w", encoding="utf-8")
+    with report_file_context as report_file:
+        if report == "summary":
+            results.write_summary_text(text_file=report_file)
+        else:
+            results.write_text(text_file=report_file)
+            report_file.write("\n")
+
+
+def write_json(args: argparse.Namespace) -> typing.Sequence[syllabus_scanner_scan_metrics.ScanMetrics]:
+    from syllabus_scanner import scanner
+
+    fingerprint_store = get_fingerprint_store(json_path=args.json, reparse_all=args.reparse_all)
+    scan_arguments = get_scan_arguments(args)
+    checkpoint = get_checkpoint(
+        args=args,
+        scan_target=syllabus_scanner_non_persistent_models.ScanTarget(
+            language=scan_arguments["language"],
+            year=scan_arguments["year"],
+        ),
+    )
+    metrics = syllabus_scanner_scan_metrics.ScanMetrics(
+        language=scan_arguments["language"],
+        year=scan_arguments["year"],
+    )
 
     results = scanner.scan(
-        language=get_language(args.lang),
-        year=args.year,
-        departments=get_departments(department_names=args.department or ()),
+        **scan_arguments,
+        fingerprint_store=fingerprint_store,
+        columnar_results=args.columnar_results,
+        checkpoint=checkpoint,
+        metrics=metrics,
+    )
+
+    with metrics.measure_serialization(), open(args.json, "w", encoding="utf-8") as json_file:
+        syllabus_scanner_json_encoder.ScanResultsJsonEncoder().write_scan_results(results=results, text_file=json_file)
+    fingerprint_store.save()
+    checkpoint.clear()
+
+    write_report(results=results, report=args.report, report_path=args.report_file)
+    return (metrics,)
+
+
+def write_bilingual_json(args: argparse.Namespace) -> typing.Sequence[syllabus_scanner_scan_metrics.ScanMetrics]:
+    from syllabus_scanner import scanner
+
+    scan_arguments = get_scan_arguments(args)
+    del scan_arguments["language"], scan_arguments["year"], scan_arguments["departments"]
+    # A shard leaves out the scan targets none of its departments belong to.
+    target_departments = get_target_departments(args)
+    checkpoints = {
+        scan_target: get_checkpoint(args=args, scan_target=scan_target) for scan_target in target_departments
+    }
+    metrics = {
+        scan_target: syllabus_scanner_scan_metrics.ScanMetrics(language=scan_target.language, year=scan_target.year)
+        for scan_target in target_departments
+    }
+    results = syllabus_scanner_non_persistent_models.BilingualScanResults.join(
+        scanner.scan_many(
+            scan_targets=tuple(target_departments),
+            **scan_arguments,
+            checkpoints=checkpoints,
+            metrics=metrics,
+            target_departments=target_departments,
+        ),
     )
 
+    serialization_start_time = time.perf_counter()
     with open(args.json, "w", encoding="utf-8") as json_file:
         json.dump(
             obj=results.serialize(),
             fp=json_file,
             ensure_ascii=False,
         )
+    # The languages of every course are serialized together, so every scan target reports the time of all of them.
+    for scan_metrics in metrics.values():
+        scan_metrics.serialization_seconds = time.perf_counter() - serialization_start_time
+    for checkpoint in checkpoints.values():
+        checkpoint.clear()
+
+    write_report(results=results, report=args.report, report_path=args.report_file)
+    return tuple(metrics.values())
+
+
+def write_ndjson(args: argparse.Namespace) -> typing.Sequence[syllabus_scanner_scan_metrics.ScanMetrics]:
+    from syllabus_scanner import scanner
+
+    failures_path = get_failures_path(json_path=args.json)
+    scan_arguments = get_scan_arguments(args)
+    checkpoint = get_checkpoint(
+        args=args,
+        scan_target=syllabus_scanner_non_persistent_models.ScanTarget(
+            language=scan_arguments["language"],
+            year=scan_arguments["year"],
+        ),
+    )
+    metrics = syllabus_scanner_scan_metrics.ScanMetrics(
+        language=scan_arguments["language"],
+        year=scan_arguments["year"],
+    )
+    with open(args.json, "w", encoding="utf-8") as courses_file, \
+            open(failures_path, "w", encoding="utf-8") as failures_file:
+        results_writer = syllabus_scanner_results_writer.NdjsonResultsWriter(
+            courses_file=courses_file,
+            failures_file=failures_file,
+        )
+        # The restored results are written again, so a resumed scan still writes all the results.
+        scanner.scan(
+            **scan_arguments,
+            results_writer=results_writer,
+            checkpoint=checkpoint,
+            metrics=metrics,
+        )
+    checkpoint.clear()
+
+    print(
+        F"Wrote {results_writer.num_courses} courses to {args.json} "
+        F"and {results_writer.num_failures} failures to {failures_path}.",
+    )
+    return (metrics,)
+
+
+def write_sqlite(args: argparse.Namespace) -> typing.Sequence[syllabus_scanner_scan_metrics.ScanMetrics]:
+    from syllabus_scanner import scanner
+
+    scan_arguments = get_scan_arguments(args)
+    checkpoint = get_checkpoint(
+        args=args,
+        scan_target=syllabus_scanner_non_persistent_models.ScanTarget(
+            language=scan_arguments["language"],
+            year=scan_arguments["year"],
+        ),
+    )
+    metrics = syllabus_scanner_scan_metrics.ScanMetrics(
+        language=scan_arguments["language"],
+        year=scan_arguments["year"],
+    )
+    with syllabus_scanner_sqlite_store.SqliteStore(path=args.json) as store, \
+            syllabus_scanner_sqlite_store.SqliteResultsWriter(
+                store=store,
+                language=scan_arguments["language"],
+                year=scan_arguments["year"],
+                # Only a scan of all the departments knows which course groups are gone.
+                delete_missing_course_groups=not args.department,
+            ) as results_writer:
+        scanner.scan(
+            **scan_arguments,
+            results_writer=results_writer,
+            checkpoint=checkpoint,
+            metrics=metrics,
+        )
+    checkpoint.clear()
+
+    print(
+        F"Wrote {results_writer.num_courses} courses and {results_writer.num_failures} failures "
+        F"to the SQLite store {args.json}, and deleted {results_writer.num_deleted_course_groups} course groups.",
+    )
+    return (metrics,)
+
+
+def merge(args: argparse.Namespace) -> None:
+    with syllabus_scanner_sharding.ShardResultsMerger() as merger:
+        for input_path in args.inputs:
+            if args.format == "ndjson":
+                with open(input_path, "r", encoding="utf-8") as courses_file, \
+                        open(get_failures_path(json_path=input_path), "r", encoding="utf-8") as failures_file:
+                    merger.add_ndjson_results(courses_file=courses_file, failures_file=failures_file)
+            else:
+                with open(input_path, "r", encoding="utf-8") as json_file:
+                    merger.add_json_results(text_file=json_file)
+
+        if args.format == "ndjson":
+            failures_path = get_failures_path(json_path=args.json)
+            with open(args.json, "w", encoding="utf-8") as courses_file, \
+                    open(failures_path, "w", encoding="utf-8") as failures_file:
+                merger.write_ndjson(courses_file=courses_file, failures_file=failures_file)
+        else:
+            with open(args.json, "w", encoding="utf-8") as json_file:
+                merger.write_json(text_file=json_file)
+
+        print(
+            F"Merged {merger.num_courses} courses and {merger.num_failures} failures "
+            F"from {len(args.inputs)} shard outputs into {args.json}.",
+        )
+
+
+def main() -> None:
+    setup_logger()
+    if sys.argv[1:2] == ["merge"]:
+        merge(get_merge_arguments(sys.argv[2:]))
+        return
+    args = get_arguments()
 
-    print(results.serialize_text())
+    if args.scan_target:
+        all_metrics = write_bilingual_json(args)
+    elif args.format == "ndjson":
+        all_metrics = write_ndjson(args)
+    elif args.format == "sqlite":
+        all_metrics = write_sqlite(args)
+    else:
+        all_metrics = write_json(args)
+    write_metrics(args=args, all_metrics=all_metrics)
 
 
 if __name__ == "__main__":
@@ -22,4 +22,7 @@ setuptools.setup(
         "types-beautifulsoup4>=4.10.0",
         "aiohttp>=3.8.0",
     ),
+    extras_require={
+        "intervals": ("numpy>=1.21.0",),
+    },
 )
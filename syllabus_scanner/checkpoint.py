@@ -0,0 +1,212 @@
+import logging
+import os
+import pickle
+import typing
+
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+
+_logger = logging.getLogger(__name__)
+
+# Bump whenever the parsed models change, so checkpoints written by an older version are not resumed.
+CHECKPOINT_VERSION = 3
+CHECKPOINT_FILE_EXTENSION = ".checkpoint"
+
+
+class _NavigationFrame(typing.NamedTuple):
+    page_number: int
+    page_navigation: syllabus_scanner_non_persistent_models.PageNavigation
+
+
+class _ResultsFrame(typing.NamedTuple):
+    page_number: int
+    parsed_page: syllabus_scanner_non_persistent_models.ParsedPage
+    fingerprint: typing.Optional[str]
+
+
+class RestoredPage(typing.NamedTuple):
+    page_number: int
+    page_navigation: syllabus_scanner_non_persistent_models.PageNavigation
+    parsed_page: syllabus_scanner_non_persistent_models.ParsedPage
+    fingerprint: typing.Optional[str]
+
+
+class ScanCheckpoint:
+    """
+    Keeps the progress of every pagination chain of a scan on disk, so an interrupted scan can continue from the
+    last page of every chain instead of starting over.
+    Every chain has its own append-only file of pickled frames. The loader appends the navigation form state of every
+    page, and the consumer appends the parsed results of every page. Frames are flushed as soon as they are written,
+    and a partially written frame at the end of a file is ignored.
+    A scan only ever touches the files of its own chains, so scans of other departments may share the directory.
+    """
+
+    def __init__(
+            self,
+            directory: str,
+            language: syllabus_scanner_non_persistent_models.Language,
+            year: int,
+            resume: bool = False,
+            scan_name: typing.Optional[str] = None,
+    ):
+        """
+        :param directory: The directory to keep the checkpoints in.
+        :param language: The language of the scan.
+        :param year: The year of the scan.
+        :param resume: Whether to restore the chains an interrupted scan left, instead of starting them over.
+        :param scan_name: A name to keep the checkpoints of the scan apart from the ones of other scans of the same
+            language and year, such as the path of its results.
+        """
+        self.root_directory = directory
+        self.directory = os.path.join(directory, *(() if scan_name is None else (scan_name,)), language.name, str(year))
+        self.resume = resume
+        self._chain_files: typing.Dict[typing.Tuple[str, typing.Optional[str]], typing.BinaryIO] = {}
+        self._resumed_paths: typing.Set[str] = set()
+        # The files of the chains this scan wrote or restored, which are the only ones it removes.
+        self._paths: typing.Set[str] = set()
+
+    def get_path(
+            self,
+            department: syllabus_scanner_non_persistent_models.Department,
+            shard: typing.Optional[str],
+    ) -> str:
+        chain_name = department.name if shard is None else F"{department.name}-{shard.replace('/', '-')}"
+        return os.path.join(self.directory, F"{chain_name}{CHECKPOINT_FILE_EXTENSION}")
+
+    def restore(
+            self,
+            department: syllabus_scanner_non_persistent_models.Department,
+            shard: typing.Optional[str],
+    ) -> typing.Tuple[RestoredPage, ...]:
+        """
+        Restores the pages of a chain that were both loaded and parsed before the scan was interrupted.
+        :param department: The department of the chain.
+        :param shard: The shard of the chain, or None for a department that is not sharded.
+        :returns: The restored pages, starting at the first page and without gaps.
+            The chain continues from the navigation of the last restored page.
+        """
+        if not self.resume:
+            return ()
+        path = self.get_path(department=department, shard=shard)
+        page_navigations: typing.Dict[int, syllabus_scanner_non_persistent_models.PageNavigation] = {}
+        results_frames: typing.Dict[int, _ResultsFrame] = {}
+        try:
+            with open(path, "r+b") as checkpoint_file:
+                try:
+                    version = pickle.load(checkpoint_file)
+                except (EOFError, pickle.UnpicklingError):
+                    version = None
+                if version != CHECKPOINT_VERSION:
+                    _logger.warning("Ignoring checkpoint %s of version %s.", path, version)
+                    return ()
+                valid_size = checkpoint_file.tell()
+                try:
+                    while True:
+                        frame = pickle.load(checkpoint_file)
+                        # Later frames of the same page override earlier ones.
+                        if isinstance(frame, _NavigationFrame):
+                            page_navigations[frame.page_number] = frame.page_navigation
+                        else:
+                            results_frames[frame.page_number] = frame
+                        valid_size = checkpoint_file.tell()
+                except (EOFError, pickle.UnpicklingError):
+                    # A frame cut off when the scan was interrupted is dropped, so new frames are appended after
+                    # the last complete one.
+                    checkpoint_file.truncate(valid_size)
+        except FileNotFoundError:
+            return ()
+        self._resumed_paths.add(path)
+        self._paths.add(path)
+
+        restored_pages: typing.List[RestoredPage] = []
+        page_number = 1
+        while page_number in page_navigations and page_number in results_frames:
+            restored_pages.append(RestoredPage(
+                page_number=page_number,
+                page_navigation=page_navigations[page_number],
+                parsed_page=results_frames[page_number].parsed_page,
+                fingerprint=results_frames[page_number].fingerprint,
+            ))
+            page_number += 1
+        return tuple(restored_pages)
+
+    def store_navigation(
+            self,
+            department: syllabus_scanner_non_persistent_models.Department,
+            shard: typing.Optional[str],
+            page_number: int,
+            page_navigation: syllabus_scanner_non_persistent_models.PageNavigation,
+    ) -> None:
+        self._write_frame(
+            department=department,
+            shard=shard,
+            frame=_NavigationFrame(page_number=page_number, page_navigation=page_navigation),
+        )
+
+    def store_results(
+            self,
+            page_entry: syllabus_scanner_non_persistent_models.PageEntry,
+            parsed_page: syllabus_scanner_non_persistent_models.ParsedPage,
+            fingerprint: typing.Optional[str],
+    ) -> None:
+        """
+        :param page_entry: The page the results were parsed from.
+        :param parsed_page: The results of the page.
+        :param fingerprint: The fingerprint of the page, so a resumed scan can still remember it, or None when the
+            scan does not keep fingerprints.
+        """
+        self._write_frame(
+            department=page_entry.department,
+            shard=page_entry.shard,
+            frame=_ResultsFrame(page_number=page_entry.page_number, parsed_page=parsed_page, fingerprint=fingerprint),
+        )
+
+    def _write_frame(
+            self,
+            department: syllabus_scanner_non_persistent_models.Department,
+            shard: typing.Optional[str],
+            frame: typing.Union[_NavigationFrame, _ResultsFrame],
+    ) -> None:
+        chain_file = self._chain_files.get((department.name, shard))
+        if chain_file is None:
+            path = self.get_path(department=department, shard=shard)
+            os.makedirs(self.directory, exist_ok=True)
+            # A resumed chain keeps its restored frames, and the frames of the new pages are appended after them.
+            # Any other chain file left by an earlier scan is started over.
+            is_resumed = path in self._resumed_paths
+            chain_file = open(path, "ab" if is_resumed else "wb")
+            if not is_resumed:
+                pickle.dump(CHECKPOINT_VERSION, chain_file)
+            self._chain_files[(department.name, shard)] = chain_file
+            self._paths.add(path)
+        pickle.dump(frame, chain_file)
+        chain_file.flush()
+
+    def close(self) -> None:
+        for chain_file in self._chain_files.values():
+            chain_file.close()
+        self._chain_files.clear()
+
+    def clear(self) -> None:
+        """
+        Removes the checkpoints of the scan, once it completed and its results were saved.
+        The chains of other scans sharing the directory are kept, so they can still be resumed.
+        """
+        self.close()
+        for path in self._paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._paths.clear()
+        self._resumed_paths.clear()
+        # The directories are removed as well, unless the checkpoints of other scans are kept in them.
+        root_directory = os.path.normpath(self.root_directory)
+        directory = os.path.normpath(self.directory)
+        while True:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            if directory == root_directory:
+                break
+            directory = os.path.dirname(directory)
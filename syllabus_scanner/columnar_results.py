@@ -0,0 +1,203 @@
+import array
+import typing
+
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+
+_MEETING_TYPES = tuple(syllabus_scanner_non_persistent_models.MeetingType)
+_MEETING_TYPE_CODES = {meeting_type: code for code, meeting_type in enumerate(_MEETING_TYPES)}
+_SEMESTERS = tuple(syllabus_scanner_non_persistent_models.Semester)
+_SEMESTER_CODES = {semester: code for code, semester in enumerate(_SEMESTERS)}
+_DAYS = tuple(syllabus_scanner_non_persistent_models.Day)
+_DAY_CODES = {day: code for code, day in enumerate(_DAYS)}
+# Stands for None in the columns of optional values.
+_NO_VALUE = -1
+
+
+class StringTable:
+    """
+    Stores every distinct string once, and refers to it by its index.
+    """
+
+    def __init__(self):
+        self._strings: typing.List[str] = []
+        self._string_ids: typing.Dict[str, int] = {}
+
+    def add(self, string: typing.Optional[str]) -> int:
+        if string is None:
+            return _NO_VALUE
+        string_id = self._string_ids.get(string)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(string)
+            self._string_ids[string] = string_id
+        return string_id
+
+    def get(self, string_id: int) -> typing.Optional[str]:
+        if string_id == _NO_VALUE:
+            return None
+        return self._strings[string_id]
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+
+class ColumnarCourses(typing.Sequence[syllabus_scanner_non_persistent_models.CourseInfo]):
+    """
+    Holds courses column by column: enums are stored as small integer codes, strings are interned in a shared
+    string table, and the groups, meetings and teachers of every row are stored as index ranges into the columns
+    of the level below.
+    Indexing builds a regular CourseInfo for the requested row, so it can be used wherever courses are expected.
+    """
+
+    def __init__(self):
+        self.strings = StringTable()
+
+        self._teacher_ids: typing.Dict[syllabus_scanner_non_persistent_models.Teacher, int] = {}
+        self._teacher_honorifics = array.array("i")
+        self._teacher_full_names = array.array("i")
+
+        self._meeting_types = array.array("b")
+        self._meeting_semesters = array.array("b")
+        self._meeting_days = array.array("b")
+        self._meeting_buildings = array.array("i")
+        self._meeting_rooms = array.array("i")
+        self._meeting_starting_times = array.array("i")
+        self._meeting_ending_times = array.array("i")
+        # The teachers of meeting i are _meeting_teachers[_meeting_teachers_starts[i]:_meeting_teachers_starts[i+1]].
+        self._meeting_teachers_starts = array.array("I", (0,))
+        self._meeting_teachers = array.array("I")
+
+        self._group_course_codes = array.array("i")
+        self._group_course_names = array.array("i")
+        self._group_names = array.array("i")
+        self._group_faculties = array.array("i")
+        self._group_schools = array.array("i")
+        self._group_meetings_starts = array.array("I", (0,))
+
+        self._course_codes = array.array("i")
+        self._course_years = array.array("H")
+        # The groups of course i are _group_*[_course_groups_starts[i]:_course_groups_ends[i]], followed by the groups
+        # added to it once the groups of a later course follow its range, which are listed in _course_extra_groups.
+        self._course_groups_starts = array.array("I")
+        self._course_groups_ends = array.array("I")
+        self._course_extra_groups: typing.Dict[int, typing.List[int]] = {}
+
+    def append(self, course: syllabus_scanner_non_persistent_models.CourseInfo) -> None:
+        self._course_groups_starts.append(len(self._group_course_codes))
+        for course_group in course.course_groups:
+            self._append_course_group(course_group=course_group)
+        self._course_codes.append(self.strings.add(course.course_code))
+        self._course_years.append(course.year)
+        self._course_groups_ends.append(len(self._group_course_codes))
+
+    def extend(self, courses: typing.Iterable[syllabus_scanner_non_persistent_models.CourseInfo]) -> None:
+        for course in courses:
+            self.append(course)
+
+    def add_course_groups(
+            self,
+            course_idx: int,
+            course_groups: typing.Iterable[syllabus_scanner_non_persistent_models.CourseGroupInfo],
+    ) -> None:
+        for course_group in course_groups:
+            group_idx = len(self._group_course_codes)
+            self._append_course_group(course_group=course_group)
+            if self._course_groups_ends[course_idx] == group_idx:
+                # No other groups were added since the range of the course, so the range grows.
+                self._course_groups_ends[course_idx] = group_idx + 1
+            else:
+                self._course_extra_groups.setdefault(course_idx, []).append(group_idx)
+
+    def _append_course_group(self, course_group: syllabus_scanner_non_persistent_models.CourseGroupInfo) -> None:
+        for meeting in course_group.meetings:
+            self._append_meeting(meeting=meeting)
+        self._group_course_codes.append(self.strings.add(course_group.course_code))
+        self._group_course_names.append(self.strings.add(course_group.course_name))
+        self._group_names.append(self.strings.add(course_group.course_group_name))
+        self._group_faculties.append(self.strings.add(course_group.faculty))
+        self._group_schools.append(self.strings.add(course_group.school))
+        self._group_meetings_starts.append(len(self._meeting_types))
+
+    def _append_meeting(self, meeting: syllabus_scanner_non_persistent_models.CourseGroupMeetingInfo) -> None:
+        self._meeting_types.append(_MEETING_TYPE_CODES[meeting.meeting_type])
+        self._meeting_semesters.append(_SEMESTER_CODES[meeting.semester])
+        self._meeting_days.append(_NO_VALUE if meeting.day is None else _DAY_CODES[meeting.day])
+        self._meeting_buildings.append(self.strings.add(meeting.building))
+        self._meeting_rooms.append(self.strings.add(meeting.room))
+        self._meeting_starting_times.append(self.strings.add(meeting.starting_time))
+        self._meeting_ending_times.append(self.strings.add(meeting.ending_time))
+        for teacher in meeting.teachers:
+            self._meeting_teachers.append(self._add_teacher(teacher=teacher))
+        self._meeting_teachers_starts.append(len(self._meeting_teachers))
+
+    def _add_teacher(self, teacher: syllabus_scanner_non_persistent_models.Teacher) -> int:
+        teacher_id = self._teacher_ids.get(teacher)
+        if teacher_id is None:
+            teacher_id = len(self._teacher_honorifics)
+            self._teacher_ids[teacher] = teacher_id
+            self._teacher_honorifics.append(self.strings.add(teacher.honorific))
+            self._teacher_full_names.append(self.strings.add(teacher.full_name))
+        return teacher_id
+
+    def _get_teacher(self, teacher_id: int) -> syllabus_scanner_non_persistent_models.Teacher:
+        return syllabus_scanner_non_persistent_models.Teacher(
+            honorific=self.strings.get(self._teacher_honorifics[teacher_id]),
+            full_name=self.strings.get(self._teacher_full_names[teacher_id]),
+        )
+
+    def _get_meeting(self, meeting_idx: int) -> syllabus_scanner_non_persistent_models.CourseGroupMeetingInfo:
+        day_code = self._meeting_days[meeting_idx]
+        teacher_ids = self._meeting_teachers[
+            self._meeting_teachers_starts[meeting_idx]:self._meeting_teachers_starts[meeting_idx + 1]
+        ]
+        return syllabus_scanner_non_persistent_models.CourseGroupMeetingInfo(
+            meeting_type=_MEETING_TYPES[self._meeting_types[meeting_idx]],
+            teachers={self._get_teacher(teacher_id=teacher_id) for teacher_id in teacher_ids},
+            building=self.strings.get(self._meeting_buildings[meeting_idx]),
+            room=self.strings.get(self._meeting_rooms[meeting_idx]),
+            semester=_SEMESTERS[self._meeting_semesters[meeting_idx]],
+            day=None if day_code == _NO_VALUE else _DAYS[day_code],
+            starting_time=self.strings.get(self._meeting_starting_times[meeting_idx]),
+            ending_time=self.strings.get(self._meeting_ending_times[meeting_idx]),
+        )
+
+    def _get_course_group(self, group_idx: int) -> syllabus_scanner_non_persistent_models.CourseGroupInfo:
+        return syllabus_scanner_non_persistent_models.CourseGroupInfo(
+            course_code=self.strings.get(self._group_course_codes[group_idx]),
+            course_name=self.strings.get(self._group_course_names[group_idx]),
+            course_group_name=self.strings.get(self._group_names[group_idx]),
+            faculty=self.strings.get(self._group_faculties[group_idx]),
+            school=self.strings.get(self._group_schools[group_idx]),
+            meetings=tuple(
+                self._get_meeting(meeting_idx=meeting_idx)
+                for meeting_idx in range(
+                    self._group_meetings_starts[group_idx],
+                    self._group_meetings_starts[group_idx + 1],
+                )
+            ),
+        )
+
+    def _get_course(self, course_idx: int) -> syllabus_scanner_non_persistent_models.CourseInfo:
+        return syllabus_scanner_non_persistent_models.CourseInfo(
+            course_code=self.strings.get(self._course_codes[course_idx]),
+            year=self._course_years[course_idx],
+            course_groups=[
+                self._get_course_group(group_idx=group_idx)
+                for group_idx in (
+                    *range(self._course_groups_starts[course_idx], self._course_groups_ends[course_idx]),
+                    *self._course_extra_groups.get(course_idx, ()),
+                )
+            ],
+        )
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return tuple(self._get_course(course_idx=course_idx) for course_idx in range(*idx.indices(len(self))))
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("Course index out of range.")
+        return self._get_course(course_idx=idx)
+
+    def __len__(self) -> int:
+        return len(self._course_codes)
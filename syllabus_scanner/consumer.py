@@ -1,26 +1,71 @@
 import asyncio
+import collections
+import concurrent.futures
 import logging
+import time
 import typing
 
+from syllabus_scanner import checkpoint as syllabus_scanner_checkpoint
+from syllabus_scanner import columnar_results as syllabus_scanner_columnar_results
 from syllabus_scanner import defines as syllabus_scanner_defines
+from syllabus_scanner import fingerprint_store as syllabus_scanner_fingerprint_store
 from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
 from syllabus_scanner import page_parser as syllabus_scanner_page_parser
+from syllabus_scanner import page_queue as syllabus_scanner_page_queue
+from syllabus_scanner import results_writer as syllabus_scanner_results_writer
+from syllabus_scanner import scan_metrics as syllabus_scanner_scan_metrics
 
 _logger = logging.getLogger(__name__)
 
 
+class _PendingPage(typing.NamedTuple):
+    page_entry: syllabus_scanner_non_persistent_models.PageEntry
+    fingerprint: typing.Optional[str]
+    # The parsed page and its timings, which are None for pages that were not parsed by this scan.
+    parse_result: asyncio.Future
+
+
 class SyllabusConsumer:
-    def __init__(self, departments: typing.Sequence[syllabus_scanner_non_persistent_models.Department]):
+    def __init__(
+            self,
+            departments: typing.Sequence[syllabus_scanner_non_persistent_models.Department],
+            parse_executor: typing.Optional[concurrent.futures.Executor] = None,
+            max_pending_pages: int = syllabus_scanner_defines.PARSE_QUEUE_SIZE_MULTIPLIER,
+            fingerprint_store: typing.Optional[syllabus_scanner_fingerprint_store.FingerprintStore] = None,
+            results_writer: typing.Optional[syllabus_scanner_results_writer.ResultsWriter] = None,
+            columnar_results: bool = False,
+            checkpoint: typing.Optional[syllabus_scanner_checkpoint.ScanCheckpoint] = None,
+            metrics: typing.Optional[syllabus_scanner_scan_metrics.ScanMetrics] = None,
+    ):
         self._done = False
-        self._courses: typing.List[syllabus_scanner_non_persistent_models.CourseInfo, ...] = []
+        self._columnar_results = columnar_results
+        self._courses: typing.Union[
+            typing.List[syllabus_scanner_non_persistent_models.CourseInfo],
+            syllabus_scanner_columnar_results.ColumnarCourses,
+        ] = syllabus_scanner_columnar_results.ColumnarCourses() if columnar_results else []
         self._failures: typing.List[syllabus_scanner_non_persistent_models.CourseGroupParsingFailure, ...] = []
+        self._parse_executor = parse_executor
+        self._max_pending_pages = max_pending_pages
+        self._fingerprint_store = fingerprint_store
+        self._results_writer = results_writer
+        self._checkpoint = checkpoint
+        self._metrics = metrics
+        # A course group may be found again in another page, by another department or by another shard.
+        self._seen_course_groups: typing.Set[typing.Tuple[int, str, str]] = set()
+        # The groups of a course may also be split between pages, so they are merged into the course found first.
+        self._course_positions: typing.Dict[typing.Tuple[int, str], int] = {}
+        self._num_courses = 0
+        self._num_failures = 0
+        self.num_reused_pages = 0
+        self.num_restored_pages = 0
         self.expected_completions = len(departments)
 
     @property
     def results(self) -> syllabus_scanner_non_persistent_models.ScanResults:
         assert self.is_done
         return syllabus_scanner_non_persistent_models.ScanResults(
-            courses=tuple(self._courses),
+            # Columnar courses are already immutable, and are only turned into models when accessed.
+            courses=self._courses if self._columnar_results else tuple(self._courses),
             failures=tuple(self._failures),
         )
 
@@ -28,28 +73,164 @@ class SyllabusConsumer:
     def is_done(self) -> bool:
         return self._done
 
-    async def consumer(self, queue: asyncio.Queue) -> None:
+    async def consumer(self, queue: syllabus_scanner_page_queue.PageQueue) -> None:
+        # Pages are parsed concurrently, but collected in the order they were taken off the queue.
+        pending_pages: typing.Deque[_PendingPage] = collections.deque()
         async for page_entry in self.pages(queue):
             _logger.debug("Processing page %s of department %s.", page_entry.page_number, page_entry.department.name)
-            parser = syllabus_scanner_page_parser.SyllabusPageParser(page_entry=page_entry)
-            parser.parse()
-            self._courses.extend(parser.courses)
-            self._failures.extend(parser.failures)
-            _logger.debug(
-                "Done processing page %s of department %s. Total number of courses is %s."
-                "Total number of failures is %s.",
-                page_entry.page_number,
-                page_entry.department.name,
-                len(self._courses),
-                len(self._failures),
-            )
+            pending_pages.append(self._parse_page(page_entry=page_entry))
+            # The pending pages are collected before waiting on an empty queue, since the loaders may be waiting for
+            # them to release their bytes.
+            while pending_pages and (
+                    pending_pages[0].parse_result.done()
+                    or len(pending_pages) > self._max_pending_pages
+                    or queue.empty()
+            ):
+                await self._collect_page(pending_page=pending_pages.popleft(), queue=queue)
+        while pending_pages:
+            await self._collect_page(pending_page=pending_pages.popleft(), queue=queue)
         self._done = True
         _logger.info("Done processing all pages.")
 
-    async def pages(self, queue: asyncio.Queue):
+    def _parse_page(self, page_entry: syllabus_scanner_non_persistent_models.PageEntry) -> _PendingPage:
+        loop = asyncio.get_event_loop()
+        if page_entry.parsed_page is not None:
+            # The page was restored from a checkpoint, along with its results and fingerprint.
+            self.num_restored_pages += 1
+            parse_result = loop.create_future()
+            parse_result.set_result((page_entry.parsed_page, None))
+            return _PendingPage(page_entry=page_entry, fingerprint=page_entry.fingerprint, parse_result=parse_result)
+
+        fingerprint: typing.Optional[str] = None
+        if self._fingerprint_store is not None:
+            fingerprint = self._fingerprint_store.fingerprint(page_entry=page_entry)
+            stored_parsed_page = self._fingerprint_store.get(page_entry=page_entry, fingerprint=fingerprint)
+            if stored_parsed_page is not None:
+                _logger.debug(
+                    "Page %s of department %s did not change, reusing its previous results.",
+                    page_entry.page_number,
+                    page_entry.department.name,
+                )
+                self.num_reused_pages += 1
+                parse_result = loop.create_future()
+                parse_result.set_result((stored_parsed_page, None))
+                return _PendingPage(page_entry=page_entry, fingerprint=fingerprint, parse_result=parse_result)
+
+        return _PendingPage(
+            page_entry=page_entry,
+            fingerprint=fingerprint,
+            parse_result=loop.run_in_executor(
+                self._parse_executor,
+                syllabus_scanner_page_parser.parse_page_with_timings,
+                page_entry,
+            ),
+        )
+
+    async def _collect_page(self, pending_page: _PendingPage, queue: syllabus_scanner_page_queue.PageQueue) -> None:
+        page_entry = pending_page.page_entry
+        (courses, failures), page_timings = await pending_page.parse_result
+        await queue.release(page_entry=page_entry)
+        if self._metrics is not None:
+            self._add_page_metrics(
+                page_entry=page_entry,
+                parsed_page=(courses, failures),
+                page_timings=page_timings,
+            )
+        if self._checkpoint is not None and page_entry.parsed_page is None:
+            self._checkpoint.store_results(
+                page_entry=page_entry,
+                parsed_page=(courses, failures),
+                fingerprint=pending_page.fingerprint,
+            )
+        if self._fingerprint_store is not None and pending_page.fingerprint is not None:
+            self._fingerprint_store.set(
+                page_entry=page_entry,
+                fingerprint=pending_page.fingerprint,
+                parsed_page=(courses, failures),
+            )
+        courses = self._drop_seen_course_groups(courses=courses)
+        if self._results_writer is not None:
+            # Streamed results are not kept, so the memory used does not grow with the scan.
+            start_time = time.perf_counter()
+            for course in courses:
+                self._results_writer.write_course(course)
+            for failure in failures:
+                self._results_writer.write_failure(failure)
+            if self._metrics is not None:
+                self._metrics.serialization_seconds += time.perf_counter() - start_time
+        else:
+            self._merge_courses(courses=courses)
+            self._failures.extend(failures)
+        self._num_courses += len(courses)
+        self._num_failures += len(failures)
+        _logger.debug(
+            "Done processing page %s of department %s. Total number of courses is %s."
+            "Total number of failures is %s.",
+            page_entry.page_number,
+            page_entry.department.name,
+            self._num_courses,
+            self._num_failures,
+        )
+
+    def _add_page_metrics(
+            self,
+            page_entry: syllabus_scanner_non_persistent_models.PageEntry,
+            parsed_page: syllabus_scanner_non_persistent_models.ParsedPage,
+            page_timings: typing.Optional[syllabus_scanner_page_parser.PageTimings],
+    ) -> None:
+        courses, failures = parsed_page
+        department_metrics = self._metrics.get_department(department=page_entry.department)
+        department_metrics.num_pages += 1
+        department_metrics.num_course_groups += sum(len(course.course_groups) for course in courses)
+        department_metrics.num_failures += len(failures)
+        if page_entry.parsed_page is not None:
+            department_metrics.num_restored_pages += 1
+        elif page_timings is None:
+            department_metrics.num_reused_pages += 1
+        else:
+            department_metrics.soup_seconds.observe(page_timings.soup_seconds)
+            department_metrics.parse_seconds.observe(page_timings.parse_seconds)
+            department_metrics.num_rows += page_timings.num_rows
+
+    def _merge_courses(self, courses: typing.Iterable[syllabus_scanner_non_persistent_models.CourseInfo]) -> None:
+        for course in courses:
+            course_key = (course.year, course.course_code)
+            course_position = self._course_positions.get(course_key)
+            if course_position is None:
+                self._course_positions[course_key] = len(self._courses)
+                self._courses.append(course)
+            elif self._columnar_results:
+                self._courses.add_course_groups(course_idx=course_position, course_groups=course.course_groups)
+            else:
+                # The courses were copied when their seen groups were dropped, so they are not shared.
+                self._courses[course_position].course_groups.extend(course.course_groups)
+
+    def _drop_seen_course_groups(
+            self,
+            courses: typing.Iterable[syllabus_scanner_non_persistent_models.CourseInfo],
+    ) -> typing.Tuple[syllabus_scanner_non_persistent_models.CourseInfo, ...]:
+        unique_courses: typing.List[syllabus_scanner_non_persistent_models.CourseInfo] = []
+        for course in courses:
+            unique_course_groups: typing.List[syllabus_scanner_non_persistent_models.CourseGroupInfo] = []
+            for course_group in course.course_groups:
+                course_group_key = (course.year, course_group.course_code, course_group.course_group_name)
+                if course_group_key not in self._seen_course_groups:
+                    self._seen_course_groups.add(course_group_key)
+                    unique_course_groups.append(course_group)
+            if unique_course_groups:
+                # The parsed courses may also be held by the fingerprint store, so they are not modified in place.
+                unique_courses.append(course._replace(course_groups=unique_course_groups))
+        return tuple(unique_courses)
+
+    async def pages(self, queue: syllabus_scanner_page_queue.PageQueue):
         num_completions = 0
         while num_completions < self.expected_completions:
             page_entry: syllabus_scanner_non_persistent_models.PageEntry = await queue.get()
+            if self._metrics is not None:
+                self._metrics.sample_queue_depth(
+                    num_pages=queue.qsize(),
+                    buffered_bytes=queue.buffered_bytes_limit.buffered_bytes,
+                )
             if page_entry.is_valid:
                 yield page_entry
             else:
@@ -13,9 +13,33 @@ USER_AGENT = os.getenv(
     "SYLLABUS_USER_AGENT",
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/74.0.3729.169 Safari/537.36",
 )
-HEADERS = {"User-Agent": USER_AGENT}
+HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept-Encoding": "gzip, deflate",
+}
+
+CONNECTION_LIMIT = int(os.getenv("SYLLABUS_CONNECTION_LIMIT", "100"))
+CONNECTION_LIMIT_PER_HOST = int(os.getenv("SYLLABUS_CONNECTION_LIMIT_PER_HOST", "0"))
+KEEPALIVE_TIMEOUT = float(os.getenv("SYLLABUS_KEEPALIVE_TIMEOUT", "30"))
+DNS_CACHE_TTL = int(os.getenv("SYLLABUS_DNS_CACHE_TTL", "300"))
+REQUEST_TIMEOUT = float(os.getenv("SYLLABUS_REQUEST_TIMEOUT", "120"))
+
+# Requests per second to a single host, zero means no limit.
+RATE_LIMIT = float(os.getenv("SYLLABUS_RATE_LIMIT", "10"))
+RATE_BURST = float(os.getenv("SYLLABUS_RATE_BURST", "20"))
+INITIAL_CONCURRENCY = int(os.getenv("SYLLABUS_INITIAL_CONCURRENCY", "4"))
+MAX_CONCURRENCY = int(os.getenv("SYLLABUS_MAX_CONCURRENCY", "32"))
+# Responses slower than this (in seconds) are taken as a sign that the server is overloaded.
+LATENCY_TARGET = float(os.getenv("SYLLABUS_LATENCY_TARGET", "5"))
+MAX_RETRIES = int(os.getenv("SYLLABUS_MAX_RETRIES", "5"))
+RETRY_BASE_DELAY = float(os.getenv("SYLLABUS_RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.getenv("SYLLABUS_RETRY_MAX_DELAY", "60"))
+RETRIABLE_STATUS_CODES = frozenset((408, 429, 500, 502, 503, 504))
 
-PAGE_QUEUE_SIZE_MULTIPLIER = 2
+# The total size of the pages loaded but not parsed yet, after which the loaders wait for the consumers.
+MAX_BUFFERED_MB = float(os.getenv("SYLLABUS_MAX_BUFFERED_MB", "64"))
+# The number of pages that may wait for the parse workers, per worker.
+PARSE_QUEUE_SIZE_MULTIPLIER = 2
 
 YEAR_PATTERN = re.compile(r"^.*(\d{4})/\d{4}.*$")
 COURSE_AND_GROUP_PATTERN = re.compile(r"^(\d{4}-\d{4})\s+(קב'|Gr):\s(\d{2})$")
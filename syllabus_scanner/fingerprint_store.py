@@ -0,0 +1,94 @@
+import hashlib
+import logging
+import os
+import pickle
+import typing
+
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+from syllabus_scanner import page_navigation as syllabus_scanner_page_navigation
+
+_logger = logging.getLogger(__name__)
+
+# Bump whenever the parsed models change, so results pickled by an older version are not reused.
+FINGERPRINT_STORE_VERSION = 4
+
+
+class _StoredPage(typing.NamedTuple):
+    fingerprint: str
+    parsed_page: syllabus_scanner_non_persistent_models.ParsedPage
+
+
+class FingerprintStore:
+    """
+    Remembers a fingerprint of every page together with the results that were parsed from it,
+    so pages that did not change since the previous scan do not have to be parsed again.
+    Pages the scan did not visit, like those of departments it left out, keep what the previous scan remembered.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._previous_pages: typing.Dict[typing.Tuple[str, typing.Optional[str], int], _StoredPage] = {}
+        self._current_pages: typing.Dict[typing.Tuple[str, typing.Optional[str], int], _StoredPage] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "FingerprintStore":
+        fingerprint_store = cls(path=path)
+        try:
+            with open(path, "rb") as fingerprints_file:
+                stored = pickle.load(fingerprints_file)
+        except FileNotFoundError:
+            return fingerprint_store
+        except (pickle.UnpicklingError, AttributeError, EOFError, ImportError):
+            _logger.warning("Ignoring unreadable fingerprints file %s.", path)
+            return fingerprint_store
+
+        if stored.get("version") != FINGERPRINT_STORE_VERSION:
+            _logger.info("Ignoring fingerprints file %s of version %s.", path, stored.get("version"))
+            return fingerprint_store
+        fingerprint_store._previous_pages = stored["pages"]
+        return fingerprint_store
+
+    def save(self) -> None:
+        temporary_path = F"{self.path}.tmp"
+        with open(temporary_path, "wb") as fingerprints_file:
+            pickle.dump(
+                {"version": FINGERPRINT_STORE_VERSION, "pages": {**self._previous_pages, **self._current_pages}},
+                fingerprints_file,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(temporary_path, self.path)
+
+    @staticmethod
+    def fingerprint(page_entry: syllabus_scanner_non_persistent_models.PageEntry) -> str:
+        # The form state changes on every request, even when the course grid itself does not.
+        # Loaded pages are already stripped of it, which leaves nothing for this to remove.
+        return hashlib.sha256(
+            syllabus_scanner_page_navigation.strip_form_state(content=page_entry.content),
+        ).hexdigest()
+
+    @staticmethod
+    def _get_key(
+            page_entry: syllabus_scanner_non_persistent_models.PageEntry,
+    ) -> typing.Tuple[str, typing.Optional[str], int]:
+        return page_entry.department.name, page_entry.shard, page_entry.page_number
+
+    def get(
+            self,
+            page_entry: syllabus_scanner_non_persistent_models.PageEntry,
+            fingerprint: str,
+    ) -> typing.Optional[syllabus_scanner_non_persistent_models.ParsedPage]:
+        stored_page = self._previous_pages.get(self._get_key(page_entry=page_entry))
+        if stored_page is None or stored_page.fingerprint != fingerprint:
+            return None
+        return stored_page.parsed_page
+
+    def set(
+            self,
+            page_entry: syllabus_scanner_non_persistent_models.PageEntry,
+            fingerprint: str,
+            parsed_page: syllabus_scanner_non_persistent_models.ParsedPage,
+    ) -> None:
+        self._current_pages[self._get_key(page_entry=page_entry)] = _StoredPage(
+            fingerprint=fingerprint,
+            parsed_page=parsed_page,
+        )
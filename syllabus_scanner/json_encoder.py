@@ -0,0 +1,116 @@
+import json.encoder
+import typing
+
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+
+# The string encoder json.dumps uses with ensure_ascii=False, so the output is identical.
+_encode_string: typing.Callable[[str], str] = json.encoder.encode_basestring
+_ENUM_NAMES = {
+    member: _encode_string(member.name)
+    for enum_type in (
+        syllabus_scanner_non_persistent_models.Department,
+        syllabus_scanner_non_persistent_models.Semester,
+        syllabus_scanner_non_persistent_models.MeetingType,
+        syllabus_scanner_non_persistent_models.Day,
+    )
+    for member in enum_type
+}
+
+
+class ScanResultsJsonEncoder:
+    """
+    Encodes scan results as JSON straight from the models, in one pass, without building the dicts and tuples of
+    their serialize methods first.
+    The output is identical to json.dumps(results.serialize(), ensure_ascii=False).
+    Buildings, rooms, times, faculties, schools and teachers repeat throughout a scan, so their encodings are cached.
+    """
+
+    def __init__(self):
+        self._strings: typing.Dict[str, str] = {}
+        self._teachers: typing.Dict[syllabus_scanner_non_persistent_models.Teacher, str] = {}
+
+    def _encode_repeated_string(self, string: str) -> str:
+        encoded_string = self._strings.get(string)
+        if encoded_string is None:
+            encoded_string = self._strings[string] = _encode_string(string)
+        return encoded_string
+
+    def _encode_teacher(self, teacher: syllabus_scanner_non_persistent_models.Teacher) -> str:
+        encoded_teacher = self._teachers.get(teacher)
+        if encoded_teacher is None:
+            encoded_teacher = self._teachers[teacher] = (
+                F'{{"honorific": {_encode_string(teacher.honorific)}, '
+                F'"full_name": {_encode_string(teacher.full_name)}}}'
+            )
+        return encoded_teacher
+
+    def _encode_meeting(self, meeting: syllabus_scanner_non_persistent_models.CourseGroupMeetingInfo) -> str:
+        encode_repeated_string = self._encode_repeated_string
+        encoded_teachers = ", ".join([self._encode_teacher(teacher) for teacher in meeting.sorted_teachers])
+        encoded_meeting = (
+            F'{{"meeting_type": {_ENUM_NAMES[meeting.meeting_type]}, "teachers": [{encoded_teachers}], '
+            F'"semester": {_ENUM_NAMES[meeting.semester]}'
+        )
+        if meeting.building is not None:
+            encoded_meeting += F', "building": {encode_repeated_string(meeting.building)}'
+        if meeting.room is not None:
+            encoded_meeting += F', "room": {encode_repeated_string(meeting.room)}'
+        if meeting.day is not None:
+            encoded_meeting += F', "day": {_ENUM_NAMES[meeting.day]}'
+        if meeting.starting_time is not None:
+            encoded_meeting += F', "starting_time": {encode_repeated_string(meeting.starting_time)}'
+        if meeting.ending_time is not None:
+            encoded_meeting += F', "ending_time": {encode_repeated_string(meeting.ending_time)}'
+        return encoded_meeting + "}"
+
+    def _encode_course_group(self, course_group: syllabus_scanner_non_persistent_models.CourseGroupInfo) -> str:
+        encode_repeated_string = self._encode_repeated_string
+        encoded_meetings = ", ".join([self._encode_meeting(meeting) for meeting in course_group.meetings])
+        return (
+            F'{{"course_code": {_encode_string(course_group.course_code)}, '
+            F'"course_name": {_encode_string(course_group.course_name)}, '
+            F'"course_group_name": {encode_repeated_string(course_group.course_group_name)}, '
+            F'"semester": {_ENUM_NAMES[course_group.semester]}, '
+            F'"faculty": {encode_repeated_string(course_group.faculty)}, '
+            F'"school": {encode_repeated_string(course_group.school)}, '
+            F'"meetings": [{encoded_meetings}]}}'
+        )
+
+    def encode_course(self, course: syllabus_scanner_non_persistent_models.CourseInfo) -> str:
+        encoded_course_groups = ", ".join([
+            self._encode_course_group(course_group) for course_group in course.course_groups
+        ])
+        return (
+            F'{{"course_code": {_encode_string(course.course_code)}, "year": {int(course.year)!r}, '
+            F'"course_groups": [{encoded_course_groups}]}}'
+        )
+
+    def encode_failure(self, failure: syllabus_scanner_non_persistent_models.CourseGroupParsingFailure) -> str:
+        encoded_failure = (
+            F'{{"department": {_ENUM_NAMES[failure.department]}, "page_number": {int(failure.page_number)!r}, '
+            F'"index_in_page": {int(failure.index_in_page)!r}, '
+            F'"exception_message": {_encode_string(failure.exception_message)}'
+        )
+        if failure.shard is not None:
+            encoded_failure += F', "shard": {_encode_string(failure.shard)}'
+        return encoded_failure + "}"
+
+    def write_scan_results(
+            self,
+            results: syllabus_scanner_non_persistent_models.ScanResults,
+            text_file: typing.TextIO,
+    ) -> None:
+        """
+        Writes the scan results as JSON, a course at a time, so the whole document is never held in memory.
+        :param results: The scan results to write.
+        :param text_file: The file to write to.
+        """
+        text_file.write('{"courses": [')
+        separator = ""
+        for course in results.courses:
+            text_file.write(separator)
+            text_file.write(self.encode_course(course))
+            separator = ", "
+        text_file.write('], "failures": [')
+        text_file.write(", ".join([self.encode_failure(failure) for failure in results.failures]))
+        text_file.write("]}")
@@ -1,134 +1,483 @@
 import asyncio
 import logging
+import time
 import typing
 
-from aiohttp import ClientSession
-from bs4 import BeautifulSoup
-from bs4.element import Tag
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector, TraceConfig
 
+from syllabus_scanner import checkpoint as syllabus_scanner_checkpoint
 from syllabus_scanner import defines as syllabus_scanner_defines
 from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+from syllabus_scanner import page_cache as syllabus_scanner_page_cache
+from syllabus_scanner import page_navigation as syllabus_scanner_page_navigation
+from syllabus_scanner import page_queue as syllabus_scanner_page_queue
+from syllabus_scanner import request_scheduler as syllabus_scanner_request_scheduler
+from syllabus_scanner import scan_metrics as syllabus_scanner_scan_metrics
 
 _logger = logging.getLogger(__name__)
 
 
+class ConnectionSettings(typing.NamedTuple):
+    limit: int = syllabus_scanner_defines.CONNECTION_LIMIT
+    # Zero means no limit.
+    limit_per_host: int = syllabus_scanner_defines.CONNECTION_LIMIT_PER_HOST
+    keepalive_timeout: float = syllabus_scanner_defines.KEEPALIVE_TIMEOUT
+    dns_cache_ttl: int = syllabus_scanner_defines.DNS_CACHE_TTL
+    request_timeout: float = syllabus_scanner_defines.REQUEST_TIMEOUT
+
+    def create_connector(self) -> TCPConnector:
+        return TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+        )
+
+
+class ConnectionStatistics:
+    def __init__(self):
+        self.opened = 0
+        self.reused = 0
+
+    def create_trace_config(self) -> TraceConfig:
+        trace_config = TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        return trace_config
+
+    async def _on_connection_create_end(self, *_) -> None:
+        self.opened += 1
+
+    async def _on_connection_reuseconn(self, *_) -> None:
+        self.reused += 1
+
+
+def create_session(
+        connection_settings: ConnectionSettings,
+        connection_statistics: ConnectionStatistics,
+) -> ClientSession:
+    return ClientSession(
+        connector=connection_settings.create_connector(),
+        timeout=ClientTimeout(total=connection_settings.request_timeout),
+        headers=syllabus_scanner_defines.HEADERS,
+        trace_configs=[connection_statistics.create_trace_config()],
+    )
+
+
 class SyllabusLoader:
     def __init__(
             self,
             language: syllabus_scanner_non_persistent_models.Language,
             year: int,
             departments: typing.Sequence[syllabus_scanner_non_persistent_models.Department],
+            connection_settings: ConnectionSettings = ConnectionSettings(),
+            page_cache: typing.Optional[syllabus_scanner_page_cache.PageCache] = None,
+            request_scheduler: typing.Optional[syllabus_scanner_request_scheduler.RequestScheduler] = None,
+            shard_departments: bool = False,
+            shard_by_day: bool = False,
+            checkpoint: typing.Optional[syllabus_scanner_checkpoint.ScanCheckpoint] = None,
+            buffered_bytes_limit: typing.Optional[syllabus_scanner_page_queue.BufferedBytesLimit] = None,
+            url: typing.Optional[str] = None,
+            metrics: typing.Optional[syllabus_scanner_scan_metrics.ScanMetrics] = None,
     ):
         self._language = language
+        self._url = url or syllabus_scanner_defines.URLS[language]
         self._year = year
+        self._connection_settings = connection_settings
+        self._page_cache = page_cache
+        self._request_scheduler = request_scheduler or syllabus_scanner_request_scheduler.RequestScheduler()
+        self._shard_departments = shard_departments or shard_by_day
+        self._shard_by_day = shard_by_day
+        self._checkpoint = checkpoint
+        self._metrics = metrics
+        self.connection_statistics = ConnectionStatistics()
         self.departments = departments
-        queue_size = len(self.departments) * syllabus_scanner_defines.PAGE_QUEUE_SIZE_MULTIPLIER
-        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.queue = syllabus_scanner_page_queue.PageQueue(
+            buffered_bytes_limit=buffered_bytes_limit or syllabus_scanner_page_queue.BufferedBytesLimit.from_megabytes(
+                max_buffered_mb=syllabus_scanner_defines.MAX_BUFFERED_MB,
+            ),
+        )
         self.consumer: typing.Optional[asyncio.Task] = None
 
-    async def _load_syllabus_pages(self, department: syllabus_scanner_non_persistent_models.Department) -> None:
-        async with ClientSession(headers=syllabus_scanner_defines.HEADERS) as session:
-            page_number = 1
-            first_page = await self._get_first_page(session=session, department=department)
-            parsed_page = BeautifulSoup(first_page, features="html.parser")
-            parsed_body = parsed_page.body
-            if parsed_body is None:
-                _logger.error(F"Page number %s of department %s does not have a body.", page_number, department.name)
-                raise ValueError(F"Page number {page_number} of department {department.name} does not have a body.")
-
-            page_entry = syllabus_scanner_non_persistent_models.PageEntry(
+    async def _load_department(
+            self,
+            session: ClientSession,
+            department: syllabus_scanner_non_persistent_models.Department,
+    ) -> None:
+        if self._shard_departments:
+            department_queries = syllabus_scanner_non_persistent_models.DepartmentQuery.split(
                 department=department,
-                page_number=page_number,
-                body=parsed_body,
+                by_day=self._shard_by_day,
+            )
+        else:
+            department_queries = (
+                syllabus_scanner_non_persistent_models.DepartmentQuery.whole(department=department),
             )
-            await self.queue.put(page_entry)
-            _logger.debug("Loaded page %s of department %s.", page_number, department.name)
+        # Every sub-query has its own pagination chain, so they can all be loaded concurrently.
+        await asyncio.gather(*(
+            self._load_syllabus_pages(session=session, department_query=department_query)
+            for department_query in department_queries
+        ))
 
-            while True:
-                next_page = await self._get_next_page(session=session, body=parsed_body)
-                if next_page is None:
-                    break
-                page_number += 1
-                parsed_page = BeautifulSoup(next_page, features="html.parser")
-                parsed_body = parsed_page.body
-                if parsed_body is None:
-                    raise ValueError(F"Page number {page_number} does not have a body.")
+        empty_page = syllabus_scanner_non_persistent_models.PageEntry(
+            department=department,
+            page_number=-1,
+            content=None,
+        )
+        await self.queue.put(empty_page)
 
+    async def _load_syllabus_pages(
+            self,
+            session: ClientSession,
+            department_query: syllabus_scanner_non_persistent_models.DepartmentQuery,
+    ) -> None:
+        page_number = 1
+        page_navigation: typing.Optional[syllabus_scanner_non_persistent_models.PageNavigation] = None
+        if self._checkpoint is not None:
+            # Pages restored from the checkpoint are queued with their parsed results, so they are not parsed again.
+            restored_pages = self._checkpoint.restore(
+                department=department_query.department,
+                shard=department_query.shard,
+            )
+            for restored_page in restored_pages:
                 page_entry = syllabus_scanner_non_persistent_models.PageEntry(
-                    department=department,
-                    page_number=page_number,
-                    body=parsed_body,
+                    department=department_query.department,
+                    page_number=restored_page.page_number,
+                    content=None,
+                    shard=department_query.shard,
+                    parsed_page=restored_page.parsed_page,
+                    fingerprint=restored_page.fingerprint,
                 )
                 await self.queue.put(page_entry)
-                _logger.debug("Loaded page %s of department %s.", page_number, department.name)
+                page_number += 1
+                page_navigation = restored_page.page_navigation
+            if page_navigation is not None:
+                _logger.info("Resuming department %s from page %s.", department_query.name, page_number)
 
-            empty_page = syllabus_scanner_non_persistent_models.PageEntry(
-                department=department,
-                page_number=-1,
-                body=None,
+        if page_navigation is None:
+            page = await self._get_first_page(session=session, department_query=department_query)
+        else:
+            page = await self._get_next_page(
+                session=session,
+                department_query=department_query,
+                page_number=page_number,
+                page_navigation=page_navigation,
             )
-            await self.queue.put(empty_page)
+        loop = asyncio.get_event_loop()
+        while page is not None:
+            # The navigation is extracted from the raw bytes, so the next page is requested without waiting for the
+            # page to be parsed.
+            page_navigation = syllabus_scanner_page_navigation.extract_page_navigation(content=page)
+            if not page_navigation.has_body:
+                _logger.error(
+                    "Page number %s of department %s does not have a body.",
+                    page_number,
+                    department_query.name,
+                )
+                raise ValueError(
+                    F"Page number {page_number} of department {department_query.name} does not have a body.",
+                )
+            if self._checkpoint is not None:
+                self._checkpoint.store_navigation(
+                    department=department_query.department,
+                    shard=department_query.shard,
+                    page_number=page_number,
+                    page_navigation=page_navigation,
+                )
+
+            next_page = loop.create_task(self._get_next_page(
+                session=session,
+                department_query=department_query,
+                page_number=page_number + 1,
+                page_navigation=page_navigation,
+            ))
+            page_entry = syllabus_scanner_non_persistent_models.PageEntry(
+                department=department_query.department,
+                page_number=page_number,
+                # Only the navigation needs the form state, and it is often the bulk of the page.
+                content=syllabus_scanner_page_navigation.strip_form_state(content=page),
+                shard=department_query.shard,
+            )
+            try:
+                # The next page is loaded while this one waits for room in the queue.
+                await self.queue.put(page_entry)
+            except BaseException:
+                next_page.cancel()
+                raise
+            _logger.debug("Loaded page %s of department %s.", page_number, department_query.name)
+
+            page_number += 1
+            page = await next_page
 
     async def _get_first_page(
             self,
             session: ClientSession,
-            department: syllabus_scanner_non_persistent_models.Department,
+            department_query: syllabus_scanner_non_persistent_models.DepartmentQuery,
     ) -> bytes:
         params = {
             "lstYear1": str(self._year),
-            "lstDep1": department.value,
-            "ckYom": ["1", "2", "3", "4", "5", "6"],
+            "lstDep1": department_query.department_codes,
+            "ckYom": [day.search_code for day in department_query.days],
         }
 
         if self._language == syllabus_scanner_non_persistent_models.Language.english:
             params["taulang"] = "eng"
 
-        async with session.post(
-            url=syllabus_scanner_defines.URLS[self._language],
-            data=params,
-        ) as response:
-            if response.status != 200:
-                raise ValueError(F"Failed to fetch first syllabus page. status_code={response.status}")
-            return await response.read()
+        return await self._get_page(
+            session=session,
+            department_query=department_query,
+            page_number=1,
+            method="POST",
+            params=params,
+        )
 
-    async def _get_next_page(self, session: ClientSession, body: Tag) -> typing.Optional[bytes]:
-        if not body.find("input", attrs={"id": "next"}):
+    async def _get_next_page(
+            self,
+            session: ClientSession,
+            department_query: syllabus_scanner_non_persistent_models.DepartmentQuery,
+            page_number: int,
+            page_navigation: syllabus_scanner_non_persistent_models.PageNavigation,
+    ) -> typing.Optional[bytes]:
+        if not page_navigation.has_next:
             return None
 
-        form = body.find("form", attrs={"id": "frmgrid"})
-        method = form.attrs["method"].upper()
         params = {
-            "__VIEWSTATE": form.find("input", attrs={"id": "__VIEWSTATE"}).attrs["value"],
-            "__EVENTVALIDATION": form.find("input", attrs={"id": "__EVENTVALIDATION"}).attrs["value"],
+            "__VIEWSTATE": page_navigation.view_state,
+            "__EVENTVALIDATION": page_navigation.event_validation,
             "dir1": "1",
         }
 
-        async with session.request(
+        return await self._get_page(
+            session=session,
+            department_query=department_query,
+            page_number=page_number,
+            method=page_navigation.method,
+            params=params,
+        )
+
+    async def _get_page(
+            self,
+            session: ClientSession,
+            department_query: syllabus_scanner_non_persistent_models.DepartmentQuery,
+            page_number: int,
+            method: str,
+            params: typing.Dict[str, typing.Any],
+    ) -> bytes:
+        loop = asyncio.get_event_loop()
+        cache_path: typing.Optional[str] = None
+        if self._page_cache is not None:
+            cache_path = self._page_cache.get_path(
+                language=self._language,
+                year=self._year,
+                department=department_query.department,
+                page_number=page_number,
+                params=params,
+            )
+            cached_page = await loop.run_in_executor(None, self._page_cache.load, cache_path)
+            if cached_page is not None:
+                return cached_page
+
+        page = await self._request_page(
+            session=session,
+            department_query=department_query,
+            page_number=page_number,
             method=method,
-            url=syllabus_scanner_defines.URLS[self._language],
-            data=params,
-        ) as response:
-            if response.status != 200:
-                raise ValueError(F"Failed to fetch next syllabus page. status_code={response.status}")
-            return await response.read()
-
-    def set_consumer(self, consumer: typing.Callable[[asyncio.Queue], typing.Coroutine]) -> None:
+            params=params,
+        )
+
+        if self._page_cache is not None:
+            await loop.run_in_executor(None, self._page_cache.store, cache_path, page)
+        return page
+
+    async def _request_page(
+            self,
+            session: ClientSession,
+            department_query: syllabus_scanner_non_persistent_models.DepartmentQuery,
+            page_number: int,
+            method: str,
+            params: typing.Dict[str, typing.Any],
+    ) -> bytes:
+        """
+        Requests a page, retrying with backoff when the server fails or throttles us.
+        Retrying sends the same form state again, so the department continues from the failed page.
+        """
+        retry_policy = self._request_scheduler.retry_policy
+        department_metrics = (
+            self._metrics.get_department(department=department_query.department) if self._metrics is not None else None
+        )
+        for attempt in range(retry_policy.max_retries + 1):
+            is_retriable = True
+            async with self._request_scheduler.request(url=self._url) as request_slot:
+                start_time = time.perf_counter()
+                try:
+                    async with session.request(method=method, url=self._url, data=params) as response:
+                        if response.status == 200:
+                            page = await response.read()
+                            request_slot.success = True
+                            if department_metrics is not None:
+                                self._add_request_metrics(
+                                    department_metrics=department_metrics,
+                                    start_time=start_time,
+                                    num_bytes=len(page),
+                                )
+                            return page
+                        error = F"status_code={response.status}"
+                        is_retriable = response.status in syllabus_scanner_defines.RETRIABLE_STATUS_CODES
+                except (ClientError, asyncio.TimeoutError) as exc:
+                    error = F"{type(exc).__name__}: {exc}"
+                if department_metrics is not None:
+                    department_metrics.num_failed_requests += 1
+                    self._add_request_metrics(department_metrics=department_metrics, start_time=start_time)
+
+            if not is_retriable or attempt == retry_policy.max_retries:
+                break
+            delay = retry_policy.get_delay(attempt=attempt)
+            _logger.warning(
+                "Failed to fetch page %s of department %s (%s), retrying in %.1f seconds.",
+                page_number,
+                department_query.name,
+                error,
+                delay,
+            )
+            await asyncio.sleep(delay)
+
+        _logger.error("Failed to fetch page %s of department %s. %s", page_number, department_query.name, error)
+        raise ValueError(F"Failed to fetch page {page_number} of department {department_query.name}. {error}")
+
+    @staticmethod
+    def _add_request_metrics(
+            department_metrics: syllabus_scanner_scan_metrics.DepartmentMetrics,
+            start_time: float,
+            num_bytes: int = 0,
+    ) -> None:
+        department_metrics.request_seconds.observe(time.perf_counter() - start_time)
+        department_metrics.num_requests += 1
+        department_metrics.downloaded_bytes += num_bytes
+
+    def set_consumer(
+            self,
+            consumer: typing.Callable[[syllabus_scanner_page_queue.PageQueue], typing.Coroutine],
+    ) -> None:
         loop = asyncio.get_event_loop()
         self.consumer = loop.create_task(consumer(self.queue))
 
     def run(self):
         loop = asyncio.get_event_loop()
-        loop.run_until_complete(
-            asyncio.wait((
-                self._run(),
-            )),
+        loop.run_until_complete(self.run_async())
+
+    async def run_async(self):
+        """
+        Loads all the departments in the running event loop, with a session of its own.
+        Cancelling it cancels the loading of the departments and the consumer.
+        """
+        # A single session is shared by all the departments, so connections to the site are reused between them.
+        async with create_session(
+            connection_settings=self._connection_settings,
+            connection_statistics=self.connection_statistics,
+        ) as session:
+            await self.load(session=session)
+        _logger.info(
+            "Opened %s connections and reused %s connections.",
+            self.connection_statistics.opened,
+            self.connection_statistics.reused,
+        )
+        _logger.info(
+            "Buffered at most %.1f MiB of pages.",
+            self.queue.buffered_bytes_limit.peak_buffered_bytes / 1024 / 1024,
         )
 
-    async def _run(self):
+    async def load(self, session: ClientSession) -> None:
         loop = asyncio.get_event_loop()
+        start_time = time.perf_counter()
         producer_tasks = tuple(
-            loop.create_task(self._load_syllabus_pages(department=department))
+            loop.create_task(self._load_department(session=session, department=department))
             for department in self.departments
         )
-        await asyncio.wait(producer_tasks)
-        await self.queue.join()
+        consumer_tasks = (self.consumer,) if self.consumer is not None else ()
+        queue_join_task = loop.create_task(self.queue.join())
+        try:
+            # The consumer is watched while the departments load and while the queue drains, since once it fails
+            # nothing takes the pages off the queue, and the producers and the join would wait for it forever.
+            # A failed department never signals its completion, so the consumer would wait for it forever as well.
+            await self._wait_for_tasks(tasks=producer_tasks, watched_tasks=consumer_tasks)
+            await self._wait_for_tasks(tasks=(queue_join_task,), watched_tasks=consumer_tasks)
+            if self.consumer is not None:
+                # The consumer may still be waiting for the parse workers after taking the last page off the queue.
+                await self.consumer
+        finally:
+            # When loading fails or is cancelled, the tasks it started are cancelled too instead of being left behind.
+            await self._cancel_tasks(tasks=(*producer_tasks, *consumer_tasks, queue_join_task))
+        if self._metrics is not None:
+            self._metrics.scan_seconds = time.perf_counter() - start_time
+
+    @staticmethod
+    async def _wait_for_tasks(
+            tasks: typing.Sequence[asyncio.Task],
+            watched_tasks: typing.Sequence[asyncio.Task],
+    ) -> None:
+        """
+        Waits for the tasks to finish, and raises the exception of the first one of them or of the watched tasks that
+        fails. The watched tasks may keep running after the tasks finish.
+        """
+        pending_tasks = set(tasks)
+        running_watched_tasks = set(watched_tasks)
+        while pending_tasks:
+            done_tasks, _ = await asyncio.wait(
+                pending_tasks | running_watched_tasks,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for done_task in done_tasks:
+                # Raises the exception of a failed task, or CancelledError for a cancelled one.
+                done_task.result()
+            pending_tasks -= done_tasks
+            running_watched_tasks -= done_tasks
+
+    @staticmethod
+    async def _cancel_tasks(tasks: typing.Sequence[asyncio.Task]) -> None:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        # Gathering the finished tasks as well retrieves the exceptions of every department that failed, not just the
+        # one that was raised.
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def run_loaders(
+        loaders: typing.Sequence[SyllabusLoader],
+        connection_settings: ConnectionSettings = ConnectionSettings(),
+) -> ConnectionStatistics:
+    """
+    Runs several loaders in a single event loop, sharing one session between all of them.
+    :param loaders: The loaders to run. Their consumers should already be set.
+    :param connection_settings: The settings of the connection pool shared by all the loaders.
+    :returns: The statistics of the connections opened by the shared session.
+    """
+    connection_statistics = ConnectionStatistics()
+
+    async def _run_loaders() -> None:
+        async with create_session(
+            connection_settings=connection_settings,
+            connection_statistics=connection_statistics,
+        ) as session:
+            loop = asyncio.get_event_loop()
+            load_tasks = tuple(loop.create_task(loader.load(session=session)) for loader in loaders)
+            try:
+                await SyllabusLoader._wait_for_tasks(tasks=load_tasks, watched_tasks=())
+            finally:
+                # When one of the loaders fails, the others are cancelled before their session is closed.
+                await SyllabusLoader._cancel_tasks(tasks=load_tasks)
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(_run_loaders())
+    _logger.info(
+        "Opened %s connections and reused %s connections.",
+        connection_statistics.opened,
+        connection_statistics.reused,
+    )
+    if loaders:
+        _logger.info(
+            "Buffered at most %.1f MiB of pages.",
+            max(loader.queue.buffered_bytes_limit.peak_buffered_bytes for loader in loaders) / 1024 / 1024,
+        )
+    return connection_statistics
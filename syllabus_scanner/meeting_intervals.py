@@ -0,0 +1,260 @@
+import logging
+import typing
+
+import numpy
+
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+
+_logger = logging.getLogger(__name__)
+
+SEMESTERS = tuple(syllabus_scanner_non_persistent_models.Semester)
+DAYS = tuple(syllabus_scanner_non_persistent_models.Day)
+_SEMESTER_CODES = {semester: code for code, semester in enumerate(SEMESTERS)}
+_DAY_CODES = {day: code for code, day in enumerate(DAYS)}
+MINUTES_PER_DAY = 24 * 60
+# Stands for a meeting without a room in the room ids.
+NO_ROOM = -1
+
+
+def parse_minute(time_text: str) -> int:
+    """
+    :param time_text: A time of the day as HH:MM.
+    :returns: The minutes since midnight.
+    """
+    hours_text, _, minutes_text = time_text.partition(":")
+    try:
+        minute = int(hours_text) * 60 + int(minutes_text)
+    except ValueError:
+        minute = -1
+    if not 0 <= minute <= MINUTES_PER_DAY:
+        _logger.error("Invalid time %s.", time_text)
+        raise ValueError(F"Invalid time {time_text}.")
+    return minute
+
+
+def format_minute(minute: int) -> str:
+    return F"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class IndexedMeeting(typing.NamedTuple):
+    year: int
+    course_group: syllabus_scanner_non_persistent_models.CourseGroupInfo
+    meeting: syllabus_scanner_non_persistent_models.CourseGroupMeetingInfo
+
+
+class TimeSlot(typing.NamedTuple):
+    day: syllabus_scanner_non_persistent_models.Day
+    starting_time: str
+    ending_time: str
+
+
+class MeetingIntervals:
+    """
+    The meetings of a scan that have a day and hours, as parallel NumPy arrays with a row per meeting, to find room
+    and teacher conflicts, free room slots and hourly occupancy with sorts and sweeps instead of comparing every pair.
+    Meetings without a day or hours cannot conflict, so they are left out.
+    Teachers are kept in a separate pair of arrays with a row per meeting and teacher, since a meeting may have
+    several teachers.
+    Requires NumPy, which is installed with the intervals extra of the package.
+    """
+
+    def __init__(self, meetings: typing.Iterable[IndexedMeeting]):
+        self.meetings: typing.List[IndexedMeeting] = []
+        room_ids: typing.Dict[typing.Tuple[str, str], int] = {}
+        teacher_ids: typing.Dict[str, int] = {}
+        course_ids: typing.Dict[typing.Tuple[int, str], int] = {}
+        minutes: typing.Dict[str, int] = {}
+        columns: typing.Tuple[typing.List[int], ...] = ([], [], [], [], [], [])
+        teacher_meetings: typing.List[int] = []
+        teacher_columns: typing.List[int] = []
+        for indexed_meeting in meetings:
+            meeting = indexed_meeting.meeting
+            if meeting.day is None or meeting.starting_time is None or meeting.ending_time is None:
+                continue
+            for time_text in (meeting.starting_time, meeting.ending_time):
+                if time_text not in minutes:
+                    minutes[time_text] = parse_minute(time_text)
+            room_id = NO_ROOM
+            if meeting.building is not None and meeting.room is not None:
+                room_id = room_ids.setdefault((meeting.building, meeting.room), len(room_ids))
+            course_key = (indexed_meeting.year, indexed_meeting.course_group.course_code)
+            row = len(self.meetings)
+            for column, value in zip(columns, (
+                    _SEMESTER_CODES[meeting.semester],
+                    _DAY_CODES[meeting.day],
+                    minutes[meeting.starting_time],
+                    minutes[meeting.ending_time],
+                    room_id,
+                    course_ids.setdefault(course_key, len(course_ids)),
+            )):
+                column.append(value)
+            for teacher in meeting.teachers:
+                teacher_meetings.append(row)
+                teacher_columns.append(teacher_ids.setdefault(teacher.full_name, len(teacher_ids)))
+            self.meetings.append(indexed_meeting)
+        self.rooms: typing.List[typing.Tuple[str, str]] = list(room_ids)
+        self.teachers: typing.List[str] = list(teacher_ids)
+        self._room_ids = room_ids
+        self._teacher_ids = teacher_ids
+
+        semesters, days, starts, ends, rooms, courses = columns
+        self.semester = numpy.array(semesters, dtype=numpy.int8)
+        self.day = numpy.array(days, dtype=numpy.int8)
+        self.start = numpy.array(starts, dtype=numpy.int32)
+        self.end = numpy.array(ends, dtype=numpy.int32)
+        self.room = numpy.array(rooms, dtype=numpy.int32)
+        self.course = numpy.array(courses, dtype=numpy.int32)
+        self.teacher_meeting = numpy.array(teacher_meetings, dtype=numpy.int32)
+        self.teacher = numpy.array(teacher_columns, dtype=numpy.int32)
+
+    @classmethod
+    def from_results(cls, results: syllabus_scanner_non_persistent_models.ScanResults) -> "MeetingIntervals":
+        return cls(meetings=(
+            IndexedMeeting(year=course.year, course_group=course_group, meeting=meeting)
+            for course in results.courses
+            for course_group in course.course_groups
+            for meeting in course_group.meetings
+        ))
+
+    def _find_overlaps(
+            self,
+            rows: numpy.ndarray,
+            resources: numpy.ndarray,
+            exclude_same_course: bool,
+    ) -> numpy.ndarray:
+        """
+        Finds every pair of the given meeting rows that use the same resource at overlapping times.
+        The rows are sorted by their semester, day, resource and starting minute, so the meetings that may overlap a
+        meeting are the ones right after it in the order, up to the first one that starts when it ends.
+        :param rows: The meeting rows to check.
+        :param resources: The resource of every given row, such as its room or its teacher.
+        :param exclude_same_course: Whether to leave out pairs of meetings of the same course, which are usually the
+            same meeting listed under several course groups.
+        :returns: An array of pairs of meeting rows, one pair per row.
+        """
+        if len(rows) == 0:
+            return numpy.empty((0, 2), dtype=numpy.int32)
+        # The rows of a semester, day and resource share a bucket, which does not have to be numbered densely.
+        buckets = (
+            (self.semester[rows].astype(numpy.int64) * len(DAYS) + self.day[rows]) * (int(resources.max()) + 1)
+            + resources
+        )
+        # A single key orders the rows by bucket and then by starting minute.
+        start_keys = buckets * (MINUTES_PER_DAY + 1) + self.start[rows]
+        order = numpy.argsort(start_keys, kind="stable")
+        sorted_start_keys = start_keys[order]
+        end_keys = buckets[order] * (MINUTES_PER_DAY + 1) + self.end[rows][order]
+        # Touching meetings, where one starts when the other ends, do not overlap.
+        overlap_ends = numpy.searchsorted(sorted_start_keys, end_keys, side="left")
+        positions = numpy.arange(len(order))
+        counts = numpy.maximum(overlap_ends - positions - 1, 0)
+
+        firsts = numpy.repeat(positions, counts)
+        # The offsets of every pair from the first of its meeting, counting from 1.
+        offsets = numpy.arange(counts.sum()) - numpy.repeat(numpy.cumsum(counts) - counts, counts) + 1
+        pairs = numpy.stack((rows[order[firsts]], rows[order[firsts + offsets]]), axis=1)
+        if exclude_same_course:
+            pairs = pairs[self.course[pairs[:, 0]] != self.course[pairs[:, 1]]]
+        return pairs
+
+    def find_room_conflicts(self, exclude_same_course: bool = True) -> numpy.ndarray:
+        """
+        Finds the pairs of meetings in the same room, in the same semester and day, at overlapping hours.
+        :param exclude_same_course: Whether to leave out pairs of meetings of the same course.
+        :returns: An array of pairs of meeting rows, one pair per row. Use get_meeting to get their models.
+        """
+        rows = numpy.flatnonzero(self.room != NO_ROOM).astype(numpy.int32)
+        return self._find_overlaps(rows=rows, resources=self.room[rows], exclude_same_course=exclude_same_course)
+
+    def find_teacher_conflicts(self, exclude_same_course: bool = True) -> numpy.ndarray:
+        """
+        Finds the pairs of meetings of the same teacher, in the same semester and day, at overlapping hours.
+        :param exclude_same_course: Whether to leave out pairs of meetings of the same course.
+        :returns: An array of pairs of meeting rows, one pair per row. Use get_meeting to get their models.
+        """
+        pairs = self._find_overlaps(
+            rows=self.teacher_meeting,
+            resources=self.teacher,
+            exclude_same_course=exclude_same_course,
+        )
+        # Meetings with several teachers in common conflict once per teacher, so the pairs are deduplicated by sorting
+        # a single key per pair, which is much faster than finding the unique rows.
+        pairs = numpy.sort(pairs, axis=1).astype(numpy.int64)
+        pair_keys = numpy.sort(pairs[:, 0] * len(self.meetings) + pairs[:, 1])
+        pair_keys = pair_keys[numpy.concatenate(((True,), pair_keys[1:] != pair_keys[:-1]))]
+        num_meetings = len(self.meetings)
+        return numpy.stack((pair_keys // num_meetings, pair_keys % num_meetings), axis=1).astype(numpy.int32)
+
+    def get_meeting(self, row: int) -> IndexedMeeting:
+        return self.meetings[row]
+
+    def _get_room_id(self, building: str, room: str) -> int:
+        room_id = self._room_ids.get((building, room))
+        if room_id is None:
+            _logger.error("Room %s in building %s has no meetings.", room, building)
+            raise ValueError(F"Room {room} in building {building} has no meetings.")
+        return room_id
+
+    def find_free_slots(
+            self,
+            building: str,
+            room: str,
+            semester: syllabus_scanner_non_persistent_models.Semester,
+            day_start: str = "08:00",
+            day_end: str = "22:00",
+            min_minutes: int = 0,
+    ) -> typing.Tuple[TimeSlot, ...]:
+        """
+        Finds the times a room is free in every day of a semester.
+        :param building: The building of the room.
+        :param room: The room.
+        :param semester: The semester.
+        :param day_start: The time the room opens.
+        :param day_end: The time the room closes.
+        :param min_minutes: The shortest free slot to return.
+        :returns: The free slots, by day and by time.
+        """
+        room_id = self._get_room_id(building=building, room=room)
+        opening_minute, closing_minute = parse_minute(day_start), parse_minute(day_end)
+        rows = numpy.flatnonzero((self.room == room_id) & (self.semester == _SEMESTER_CODES[semester]))
+        free_slots: typing.List[TimeSlot] = []
+        for day_code, day in enumerate(DAYS):
+            day_rows = rows[self.day[rows] == day_code]
+            order = numpy.argsort(self.start[day_rows], kind="stable")
+            starts = numpy.clip(self.start[day_rows][order], opening_minute, closing_minute)
+            ends = numpy.clip(self.end[day_rows][order], opening_minute, closing_minute)
+            # A gap starts where every meeting that started so far has ended, and ends where the next one starts.
+            busy_until = numpy.maximum.accumulate(numpy.concatenate(((opening_minute,), ends)))
+            gap_starts = busy_until
+            gap_ends = numpy.concatenate((starts, (closing_minute,)))
+            for gap_start, gap_end in zip(gap_starts.tolist(), gap_ends.tolist()):
+                if gap_end > gap_start and gap_end - gap_start >= min_minutes:
+                    free_slots.append(TimeSlot(
+                        day=day,
+                        starting_time=format_minute(gap_start),
+                        ending_time=format_minute(gap_end),
+                    ))
+        return tuple(free_slots)
+
+    def get_hourly_occupancy(self, building: typing.Optional[str] = None) -> numpy.ndarray:
+        """
+        Counts the meetings in progress during every hour of the week, in every semester.
+        :param building: Count only the meetings in this building, instead of all the meetings.
+        :returns: An array of the counts, indexed by the position of the semester in SEMESTERS, the position of the day
+            in DAYS and the hour of the day.
+        """
+        rows = numpy.arange(len(self.meetings))
+        if building is not None:
+            building_room_ids = [
+                room_id for (room_building, _), room_id in self._room_ids.items() if room_building == building
+            ]
+            rows = rows[numpy.isin(self.room, building_room_ids)]
+        hour_starts = numpy.arange(24) * 60
+        # A meeting is in progress during an hour when it starts before the hour ends and ends after the hour starts.
+        in_progress = (
+            (self.start[rows, numpy.newaxis] < hour_starts + 60)
+            & (self.end[rows, numpy.newaxis] > hour_starts)
+        )
+        occupancy = numpy.zeros((len(SEMESTERS), len(DAYS), 24), dtype=numpy.int32)
+        numpy.add.at(occupancy, (self.semester[rows], self.day[rows]), in_progress.astype(numpy.int32))
+        return occupancy
@@ -1,13 +1,67 @@
 import enum
 import functools
+import io
 import logging
 import typing
 
-from bs4.element import Tag
-
 _logger = logging.getLogger(__name__)
 
 
+def _serialize_text(write_text: typing.Callable[[typing.TextIO, int], None], indent: int) -> str:
+    text_file = io.StringIO()
+    write_text(text_file, indent)
+    return text_file.getvalue()
+
+
+class _FrozenModel:
+    """
+    A base for immutable models that have fields derived from their other fields.
+    The derived fields are computed and validated once in __init__, and stored in __slots__ next to the fields.
+    Subclasses list the fields they are built from in _fields, in the order of the arguments of __init__, and
+    provide the rest of the NamedTuple API the other models have, such as _replace and _asdict.
+    """
+
+    __slots__ = ()
+    _fields: typing.Tuple[str, ...] = ()
+
+    def _set(self, name: str, value: typing.Any) -> None:
+        object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        raise AttributeError(F"Cannot set {name}, {type(self).__name__} is immutable.")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(F"Cannot delete {name}, {type(self).__name__} is immutable.")
+
+    def _astuple(self) -> tuple:
+        return tuple(getattr(self, field_name) for field_name in self._fields)
+
+    def _asdict(self) -> typing.Dict[str, typing.Any]:
+        return {field_name: getattr(self, field_name) for field_name in self._fields}
+
+    def _replace(self: "_FrozenModelType", **changes: typing.Any) -> "_FrozenModelType":
+        return type(self)(**{**self._asdict(), **changes})
+
+    def __eq__(self, other: typing.Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._astuple() == other._astuple()
+
+    def __hash__(self) -> int:
+        return hash(self._astuple())
+
+    def __repr__(self) -> str:
+        fields_text = ", ".join(F"{field_name}={value!r}" for field_name, value in self._asdict().items())
+        return F"{type(self).__name__}({fields_text})"
+
+    def __reduce__(self) -> typing.Tuple[type, tuple]:
+        # The derived fields are computed again when unpickling, so they are not pickled.
+        return type(self), self._astuple()
+
+
+_FrozenModelType = typing.TypeVar("_FrozenModelType", bound=_FrozenModel)
+
+
 class Language(enum.Enum):
     hebrew = "Hebrew"
     english = "English"
@@ -60,22 +114,84 @@ class Department(enum.Enum):
 class PageEntry(typing.NamedTuple):
     department: Department
     page_number: int
-    body: typing.Optional[Tag]
+    content: typing.Optional[bytes]
+    # The sub-query of the department the page belongs to, when the department is sharded.
+    shard: typing.Optional[str] = None
+    # The results of the page when they were restored from a checkpoint, in which case it is not parsed again.
+    parsed_page: typing.Optional["ParsedPage"] = None
+    # The fingerprint of the page restored from a checkpoint, when the scan that parsed it kept fingerprints.
+    fingerprint: typing.Optional[str] = None
 
     @property
     def is_valid(self) -> bool:
-        return self.body is not None
+        return self.content is not None or self.parsed_page is not None
 
     def __lt__(self, other: "PageEntry") -> bool:
-        return (self.department.name, self.page_number) < (other.department.name, other.page_number)
+        return (self.department.name, self.shard or "", self.page_number) < (
+            other.department.name,
+            other.shard or "",
+            other.page_number,
+        )
 
     def __eq__(self, other: typing.Any) -> bool:
         if not isinstance(other, PageEntry):
             return False
-        return self.department == other.department and self.page_number == other.page_number
+        return (
+            self.department == other.department
+            and self.shard == other.shard
+            and self.page_number == other.page_number
+        )
 
     def __hash__(self) -> int:
-        return hash((self.department, self.page_number))
+        return hash((self.department, self.shard, self.page_number))
+
+
+class DepartmentQuery(typing.NamedTuple):
+    department: Department
+    department_codes: str
+    days: typing.Tuple["Day", ...]
+    shard: typing.Optional[str] = None
+
+    @classmethod
+    def whole(cls, department: Department) -> "DepartmentQuery":
+        return DepartmentQuery(department=department, department_codes=department.value, days=tuple(Day))
+
+    @classmethod
+    def split(cls, department: Department, by_day: bool = False) -> typing.Tuple["DepartmentQuery", ...]:
+        """
+        Splits a department into independent sub-queries, one per department code packed in its value,
+        and optionally one per day as well. The sub-queries may return the same course groups more than once.
+        :param department: The department to split.
+        :param by_day: Whether to split every department code by day as well.
+        :returns: The sub-queries of the department.
+        """
+        department_codes = department.value.split("-")
+        if not by_day and len(department_codes) == 1:
+            return (cls.whole(department=department),)
+        return tuple(
+            DepartmentQuery(
+                department=department,
+                department_codes=department_code,
+                days=days,
+                shard=department_code if not by_day else F"{department_code}/{days[0].name}",
+            )
+            for department_code in department_codes
+            for days in (((day,) for day in Day) if by_day else (tuple(Day),))
+        )
+
+    @property
+    def name(self) -> str:
+        if self.shard is None:
+            return self.department.name
+        return F"{self.department.name}[{self.shard}]"
+
+
+class PageNavigation(typing.NamedTuple):
+    has_body: bool
+    has_next: bool
+    method: typing.Optional[str]
+    view_state: typing.Optional[str]
+    event_validation: typing.Optional[str]
 
 
 class Semester(enum.Enum):
@@ -86,15 +202,7 @@ class Semester(enum.Enum):
 
     @staticmethod
     def from_text(text: str) -> "Semester":
-        text_to_semester_mapping = {
-            "א'": Semester.a,
-            "ב'": Semester.b,
-            "קיץ": Semester.summer,
-            "First": Semester.a,
-            "Second": Semester.b,
-            "Summer": Semester.summer,
-        }
-        semester = text_to_semester_mapping.get(text)
+        semester = _TEXT_TO_SEMESTER_MAPPING.get(text)
         if semester is None:
             _logger.error("Got a Unexpected semester %s.", text)
             raise ValueError(F"Got a Unexpected semester {text}.")
@@ -110,6 +218,17 @@ class Semester(enum.Enum):
         return self.serialize_text()
 
 
+# Built once, since from_text is called for every meeting row of every page.
+_TEXT_TO_SEMESTER_MAPPING = {
+    "א'": Semester.a,
+    "ב'": Semester.b,
+    "קיץ": Semester.summer,
+    "First": Semester.a,
+    "Second": Semester.b,
+    "Summer": Semester.summer,
+}
+
+
 class MeetingType(enum.Enum):
     lecture = "Lecture"
     exercise = "Exercise"
@@ -134,29 +253,7 @@ class MeetingType(enum.Enum):
 
     @staticmethod
     def from_text(text: str) -> "MeetingType":
-        hebrew_mapping = {
-            "שיעור": MeetingType.lecture,
-            "תרגיל": MeetingType.exercise,
-            "שיעור ותרגיל": MeetingType.lecture_and_exercise,
-            "שיעור ומעבדה": MeetingType.lecture_and_laboratory,
-            "פרוייקט": MeetingType.project,
-            "סדנה": MeetingType.workshop,
-            "סמינר": MeetingType.seminar,
-            "פרוסמינר": MeetingType.proseminar,
-            "עבודה סמינריונית": MeetingType.seminar_paper,
-            "עבודה מעשית": MeetingType.practicum,
-            "קולוקויום": MeetingType.colloqium,
-            "מעבדה": MeetingType.laboratory,
-            "סיור": MeetingType.field_trip,
-            "הדרכה אישית": MeetingType.personal_training,
-            "הדרכה ביבליוגרפית": MeetingType.bibliography_tutorial,
-            "קריאה מודרכת": MeetingType.guided_readings,
-            "Tutorial": MeetingType.personal_training,
-        }
-        english_mapping = {meeting_type.value: meeting_type for meeting_type in MeetingType.all()}
-        text_to_meeting_type_mapping = {**hebrew_mapping, **english_mapping}
-
-        meeting_type = text_to_meeting_type_mapping.get(text)
+        meeting_type = _TEXT_TO_MEETING_TYPE_MAPPING.get(text)
         if meeting_type is None:
             _logger.error("Got a Unexpected meeting type %s.", text)
             raise ValueError(F"Got a Unexpected meeting type {text}.")
@@ -172,6 +269,28 @@ class MeetingType(enum.Enum):
         return self.serialize_text()
 
 
+_TEXT_TO_MEETING_TYPE_MAPPING = {
+    "שיעור": MeetingType.lecture,
+    "תרגיל": MeetingType.exercise,
+    "שיעור ותרגיל": MeetingType.lecture_and_exercise,
+    "שיעור ומעבדה": MeetingType.lecture_and_laboratory,
+    "פרוייקט": MeetingType.project,
+    "סדנה": MeetingType.workshop,
+    "סמינר": MeetingType.seminar,
+    "פרוסמינר": MeetingType.proseminar,
+    "עבודה סמינריונית": MeetingType.seminar_paper,
+    "עבודה מעשית": MeetingType.practicum,
+    "קולוקויום": MeetingType.colloqium,
+    "מעבדה": MeetingType.laboratory,
+    "סיור": MeetingType.field_trip,
+    "הדרכה אישית": MeetingType.personal_training,
+    "הדרכה ביבליוגרפית": MeetingType.bibliography_tutorial,
+    "קריאה מודרכת": MeetingType.guided_readings,
+    "Tutorial": MeetingType.personal_training,
+    **{meeting_type.value: meeting_type for meeting_type in MeetingType},
+}
+
+
 class Day(enum.Enum):
     sunday = "Sunday"
     monday = "Monday"
@@ -180,23 +299,16 @@ class Day(enum.Enum):
     thursday = "Thursday"
     friday = "Friday"
 
+    @property
+    def search_code(self) -> str:
+        """
+        The value of the day in the ckYom parameter of the syllabus search.
+        """
+        return _DAY_TO_SEARCH_CODE_MAPPING[self]
+
     @staticmethod
     def from_text(text: str) -> "Day":
-        text_to_day_mapping = {
-            "א": Day.sunday,
-            "ב": Day.monday,
-            "ג": Day.tuesday,
-            "ד": Day.wednesday,
-            "ה": Day.thursday,
-            "ו": Day.friday,
-            "Sun": Day.sunday,
-            "Mon": Day.monday,
-            "Tue": Day.tuesday,
-            "Wed": Day.wednesday,
-            "Thu": Day.thursday,
-            "Fri": Day.friday,
-        }
-        day = text_to_day_mapping.get(text)
+        day = _TEXT_TO_DAY_MAPPING.get(text)
         if day is None:
             _logger.error("Got a Unexpected day %s.", text)
             raise ValueError(F"Got a Unexpected day {text}.")
@@ -212,6 +324,23 @@ class Day(enum.Enum):
         return self.serialize_text()
 
 
+_TEXT_TO_DAY_MAPPING = {
+    "א": Day.sunday,
+    "ב": Day.monday,
+    "ג": Day.tuesday,
+    "ד": Day.wednesday,
+    "ה": Day.thursday,
+    "ו": Day.friday,
+    "Sun": Day.sunday,
+    "Mon": Day.monday,
+    "Tue": Day.tuesday,
+    "Wed": Day.wednesday,
+    "Thu": Day.thursday,
+    "Fri": Day.friday,
+}
+_DAY_TO_SEARCH_CODE_MAPPING = {day: str(day_index + 1) for day_index, day in enumerate(Day)}
+
+
 class Teacher(typing.NamedTuple):
     honorific: str
     full_name: str
@@ -240,9 +369,22 @@ class Teacher(typing.NamedTuple):
         return self.serialize_text()
 
 
-class CourseGroupMeetingInfo(typing.NamedTuple):
+class CourseGroupMeetingInfo(_FrozenModel):
+    __slots__ = (
+        "meeting_type",
+        "teachers",
+        "building",
+        "room",
+        "semester",
+        "day",
+        "starting_time",
+        "ending_time",
+        "sorted_teachers",
+    )
+    _fields = ("meeting_type", "teachers", "building", "room", "semester", "day", "starting_time", "ending_time")
+
     meeting_type: MeetingType
-    teachers: typing.Set[Teacher]
+    teachers: typing.FrozenSet[Teacher]
     # Location
     building: typing.Optional[str]
     room: typing.Optional[str]
@@ -251,11 +393,35 @@ class CourseGroupMeetingInfo(typing.NamedTuple):
     day: typing.Optional[Day]
     starting_time: typing.Optional[str]
     ending_time: typing.Optional[str]
+    # Derived
+    sorted_teachers: typing.Tuple[Teacher, ...]
+
+    def __init__(
+            self,
+            meeting_type: MeetingType,
+            teachers: typing.Iterable[Teacher],
+            building: typing.Optional[str],
+            room: typing.Optional[str],
+            semester: Semester,
+            day: typing.Optional[Day],
+            starting_time: typing.Optional[str],
+            ending_time: typing.Optional[str],
+    ):
+        teachers = frozenset(teachers)
+        self._set("meeting_type", meeting_type)
+        self._set("teachers", teachers)
+        self._set("building", building)
+        self._set("room", room)
+        self._set("semester", semester)
+        self._set("day", day)
+        self._set("starting_time", starting_time)
+        self._set("ending_time", ending_time)
+        self._set("sorted_teachers", tuple(sorted(teachers)))
 
     def serialize(self) -> dict:
         response = {
             "meeting_type": self.meeting_type.serialize(),
-            "teachers": tuple(teacher.serialize() for teacher in sorted(self.teachers)),
+            "teachers": tuple(teacher.serialize() for teacher in self.sorted_teachers),
             "semester": self.semester.serialize(),
         }
         if self.building is not None:
@@ -270,40 +436,75 @@ class CourseGroupMeetingInfo(typing.NamedTuple):
             response["ending_time"] = self.ending_time
         return response
 
-    def serialize_text(self, indent: int = 0) -> str:
-        response = ""
-        response += "\t" * indent + F"Meeting type: {self.meeting_type.serialize_text()}\n"
-        response += "\t" * indent + F"Semester: {self.semester.serialize_text()}\n"
+    def write_text(self, text_file: typing.TextIO, indent: int = 0) -> None:
+        prefix = "\t" * indent
+        text_file.write(F"{prefix}Meeting type: {self.meeting_type.serialize_text()}\n")
+        text_file.write(F"{prefix}Semester: {self.semester.serialize_text()}\n")
         if self.building:
-            response += "\t" * indent + F"Building: {self.building}\n"
+            text_file.write(F"{prefix}Building: {self.building}\n")
         if self.room:
-            response += "\t" * indent + F"Room: {self.room}\n"
+            text_file.write(F"{prefix}Room: {self.room}\n")
         if self.day:
-            response += "\t" * indent + F"Day: {self.day}\n"
+            text_file.write(F"{prefix}Day: {self.day}\n")
         if self.starting_time:
-            response += "\t" * indent + F"Starting time: {self.starting_time}\n"
+            text_file.write(F"{prefix}Starting time: {self.starting_time}\n")
         if self.ending_time:
-            response += "\t" * indent + F"Ending time: {self.ending_time}\n"
+            text_file.write(F"{prefix}Ending time: {self.ending_time}\n")
         if self.teachers:
-            response += "\t" * indent + F"Teachers:\n"
-            for teacher in sorted(self.teachers):
-                response += "\t" * (indent+1) + F"{teacher.serialize_text()}\n"
-        return response
+            text_file.write(F"{prefix}Teachers:\n")
+            for teacher in self.sorted_teachers:
+                text_file.write(F"{prefix}\t{teacher.serialize_text()}\n")
+
+    def serialize_text(self, indent: int = 0) -> str:
+        return _serialize_text(self.write_text, indent)
 
     def __str__(self):
         return self.serialize_text()
 
 
-class CourseGroupInfo(typing.NamedTuple):
+class CourseGroupInfo(_FrozenModel):
+    __slots__ = (
+        "course_code",
+        "course_name",
+        "course_group_name",
+        "faculty",
+        "school",
+        "meetings",
+        "semester",
+        "teachers",
+    )
+    _fields = ("course_code", "course_name", "course_group_name", "faculty", "school", "meetings")
+
     course_code: str
     course_name: str
     course_group_name: str
     faculty: str
     school: str
     meetings: typing.Tuple[CourseGroupMeetingInfo, ...]
-
-    @property
-    def semester(self) -> Semester:
+    # Derived
+    semester: Semester
+    teachers: typing.FrozenSet[Teacher]
+
+    def __init__(
+            self,
+            course_code: str,
+            course_name: str,
+            course_group_name: str,
+            faculty: str,
+            school: str,
+            meetings: typing.Iterable[CourseGroupMeetingInfo],
+    ):
+        meetings = tuple(meetings)
+        self._set("course_code", course_code)
+        self._set("course_name", course_name)
+        self._set("course_group_name", course_group_name)
+        self._set("faculty", faculty)
+        self._set("school", school)
+        self._set("meetings", meetings)
+        self._set("semester", self._deduce_semester())
+        self._set("teachers", frozenset().union(*(meeting.teachers for meeting in meetings)))
+
+    def _deduce_semester(self) -> Semester:
         semesters: typing.Set[Semester] = {meeting.semester for meeting in self.meetings}
         if len(semesters) == 1:
             return tuple(semesters)[0]
@@ -331,13 +532,6 @@ class CourseGroupInfo(typing.NamedTuple):
             )
         return Semester.all_year
 
-    @property
-    def teachers(self) -> typing.Iterable[Teacher]:
-        teachers: typing.Set[Teacher] = set()
-        for meeting in self.meetings:
-            teachers = teachers.union(meeting.teachers)
-        return teachers
-
     def serialize(self) -> dict:
         return {
             "course_code": self.course_code,
@@ -349,19 +543,21 @@ class CourseGroupInfo(typing.NamedTuple):
             "meetings": tuple(course_group_meeting.serialize() for course_group_meeting in self.meetings)
         }
 
-    def serialize_text(self, indent: int = 0) -> str:
-        response = ""
-        response += "\t" * indent + F"Course code: {self.course_code}\n"
-        response += "\t" * indent + F"Course name: {self.course_name}\n"
-        response += "\t" * indent + F"Course group name: {self.course_group_name}\n"
-        response += "\t" * indent + F"Semester: {self.semester.serialize_text()}\n"
-        response += "\t" * indent + F"Faculty: {self.faculty}\n"
-        response += "\t" * indent + F"School: {self.school}\n"
+    def write_text(self, text_file: typing.TextIO, indent: int = 0) -> None:
+        prefix = "\t" * indent
+        text_file.write(F"{prefix}Course code: {self.course_code}\n")
+        text_file.write(F"{prefix}Course name: {self.course_name}\n")
+        text_file.write(F"{prefix}Course group name: {self.course_group_name}\n")
+        text_file.write(F"{prefix}Semester: {self.semester.serialize_text()}\n")
+        text_file.write(F"{prefix}Faculty: {self.faculty}\n")
+        text_file.write(F"{prefix}School: {self.school}\n")
         if self.meetings:
-            response += "\t" * indent + "Meetings:\n"
+            text_file.write(F"{prefix}Meetings:\n")
             for course_group_meeting in self.meetings:
-                response += F"{course_group_meeting.serialize_text(indent=indent+1)}"
-        return response
+                course_group_meeting.write_text(text_file=text_file, indent=indent+1)
+
+    def serialize_text(self, indent: int = 0) -> str:
+        return _serialize_text(self.write_text, indent)
 
     def __str__(self):
         return self.serialize_text()
@@ -379,15 +575,17 @@ class CourseInfo(typing.NamedTuple):
             "course_groups": tuple(course_group.serialize() for course_group in self.course_groups),
         }
 
-    def serialize_text(self, indent: int = 0) -> str:
-        response = ""
-        response += "\t" * indent + F"Course code: {self.course_code}\n"
-        response += "\t" * indent + F"Year: {self.year}\n"
+    def write_text(self, text_file: typing.TextIO, indent: int = 0) -> None:
+        prefix = "\t" * indent
+        text_file.write(F"{prefix}Course code: {self.course_code}\n")
+        text_file.write(F"{prefix}Year: {self.year}\n")
         if self.course_groups:
-            response += "\t" * indent + "Groups:\n"
+            text_file.write(F"{prefix}Groups:\n")
             for course_group in self.course_groups:
-                response += F"{course_group.serialize_text(indent=indent+1)}"
-        return response
+                course_group.write_text(text_file=text_file, indent=indent+1)
+
+    def serialize_text(self, indent: int = 0) -> str:
+        return _serialize_text(self.write_text, indent)
 
     def __str__(self):
         return self.serialize_text()
@@ -398,26 +596,37 @@ class CourseGroupParsingFailure(typing.NamedTuple):
     page_number: int
     index_in_page: int
     exception_message: str
+    shard: typing.Optional[str] = None
 
     def serialize(self) -> dict:
-        return {
+        response = {
             "department": self.department.serialize(),
             "page_number": self.page_number,
             "index_in_page": self.index_in_page,
             "exception_message": self.exception_message,
         }
+        if self.shard is not None:
+            response["shard"] = self.shard
+        return response
+
+    def write_text(self, text_file: typing.TextIO, indent: int = 0) -> None:
+        prefix = "\t" * indent
+        text_file.write(F"{prefix}Department: {self.department.serialize_text()}\n")
+        if self.shard is not None:
+            text_file.write(F"{prefix}Shard: {self.shard}\n")
+        text_file.write(F"{prefix}Page number: {self.page_number}\n")
+        text_file.write(F"{prefix}Index in page: {self.index_in_page}\n")
+        text_file.write(F"{prefix}Exception message: {self.exception_message}\n")
 
     def serialize_text(self, indent: int = 0) -> str:
-        response = ""
-        response += "\t" * indent + F"Department: {self.department.serialize_text()}\n"
-        response += "\t" * indent + F"Page number: {self.page_number}\n"
-        response += "\t" * indent + F"Index in page: {self.index_in_page}\n"
-        response += "\t" * indent + F"Exception message: {self.exception_message}\n"
-        return response
+        return _serialize_text(self.write_text, indent)
+
+
+ParsedPage = typing.Tuple[typing.Tuple[CourseInfo, ...], typing.Tuple[CourseGroupParsingFailure, ...]]
 
 
 class ScanResults(typing.NamedTuple):
-    courses: typing.Tuple[CourseInfo, ...]
+    courses: typing.Sequence[CourseInfo]
     failures: typing.Tuple[CourseGroupParsingFailure, ...]
 
     def serialize(self) -> dict:
@@ -426,19 +635,193 @@ class ScanResults(typing.NamedTuple):
             "failures": tuple(failure.serialize() for failure in self.failures),
         }
 
-    def serialize_text(self, indent: int = 0) -> str:
+    def write_text(self, text_file: typing.TextIO, indent: int = 0) -> None:
         if not self.courses:
-            return "No courses!"
-        response = ""
-        if self.courses:
-            response += "\t" * indent + "Courses:\n"
-            for course in self.courses:
-                response += F"{course.serialize_text(indent=indent+1)}"
+            text_file.write("No courses!")
+            return
+        prefix = "\t" * indent
+        text_file.write(F"{prefix}Courses:\n")
+        for course in self.courses:
+            course.write_text(text_file=text_file, indent=indent+1)
         if self.failures:
-            response += "\t" * indent + "Failures:\n"
+            text_file.write(F"{prefix}Failures:\n")
             for failure in self.failures:
-                response += F"{failure.serialize_text(indent=indent+1)}"
+                failure.write_text(text_file=text_file, indent=indent+1)
+
+    def write_summary_text(self, text_file: typing.TextIO, indent: int = 0) -> None:
+        prefix = "\t" * indent
+        num_course_groups = sum(len(course.course_groups) for course in self.courses)
+        text_file.write(F"{prefix}Courses: {len(self.courses)}\n")
+        text_file.write(F"{prefix}Course groups: {num_course_groups}\n")
+        text_file.write(F"{prefix}Failures: {len(self.failures)}\n")
+
+    def serialize_text(self, indent: int = 0) -> str:
+        return _serialize_text(self.write_text, indent)
+
+    def __str__(self):
+        return self.serialize_text()
+
+
+class ScanTarget(typing.NamedTuple):
+    language: Language
+    year: int
+
+    @classmethod
+    def from_text(cls, text: str) -> "ScanTarget":
+        target_split = text.split(":", 1)
+        if len(target_split) != 2 or not hasattr(Language, target_split[0]) or not target_split[1].isdigit():
+            _logger.error("Invalid scan target %s.", text)
+            raise ValueError(F"Invalid scan target {text}, expected <language>:<year>.")
+        return ScanTarget(
+            language=getattr(Language, target_split[0]),
+            year=int(target_split[1]),
+        )
+
+    def serialize(self) -> dict:
+        return {
+            "language": self.language.serialize(),
+            "year": self.year,
+        }
+
+    def serialize_text(self) -> str:
+        return F"{self.language.serialize_text()} {self.year}"
+
+    def __str__(self):
+        return self.serialize_text()
+
+
+class BilingualCourseGroupInfo(typing.NamedTuple):
+    course_group_name: str
+    translations: typing.Dict[Language, CourseGroupInfo]
+
+    def serialize(self) -> dict:
+        response = {"course_group_name": self.course_group_name}
+        for language in Language.all():
+            if language in self.translations:
+                response[language.serialize()] = self.translations[language].serialize()
         return response
 
+    def write_text(self, text_file: typing.TextIO, indent: int = 0) -> None:
+        prefix = "\t" * indent
+        text_file.write(F"{prefix}Course group name: {self.course_group_name}\n")
+        for language in Language.all():
+            if language in self.translations:
+                text_file.write(F"{prefix}{language.serialize_text()}:\n")
+                self.translations[language].write_text(text_file=text_file, indent=indent+1)
+
+    def serialize_text(self, indent: int = 0) -> str:
+        return _serialize_text(self.write_text, indent)
+
+    def __str__(self):
+        return self.serialize_text()
+
+
+class BilingualCourseInfo(typing.NamedTuple):
+    course_code: str
+    year: int
+    course_groups: typing.List[BilingualCourseGroupInfo]
+
+    def serialize(self) -> dict:
+        return {
+            "course_code": self.course_code,
+            "year": self.year,
+            "course_groups": tuple(course_group.serialize() for course_group in self.course_groups),
+        }
+
+    def write_text(self, text_file: typing.TextIO, indent: int = 0) -> None:
+        prefix = "\t" * indent
+        text_file.write(F"{prefix}Course code: {self.course_code}\n")
+        text_file.write(F"{prefix}Year: {self.year}\n")
+        if self.course_groups:
+            text_file.write(F"{prefix}Groups:\n")
+            for course_group in self.course_groups:
+                course_group.write_text(text_file=text_file, indent=indent+1)
+
+    def serialize_text(self, indent: int = 0) -> str:
+        return _serialize_text(self.write_text, indent)
+
+    def __str__(self):
+        return self.serialize_text()
+
+
+class BilingualScanResults(typing.NamedTuple):
+    courses: typing.Tuple[BilingualCourseInfo, ...]
+    failures: typing.Dict[ScanTarget, typing.Tuple[CourseGroupParsingFailure, ...]]
+
+    @classmethod
+    def join(cls, results: typing.Mapping[ScanTarget, ScanResults]) -> "BilingualScanResults":
+        """
+        Joins the results of several scans into one record per course and year,
+        holding every group of the course in all the languages it was scanned in.
+        :param results: The results of every scan target.
+        :returns: The joined results.
+        """
+        courses: typing.Dict[typing.Tuple[int, str], BilingualCourseInfo] = {}
+        course_groups: typing.Dict[typing.Tuple[int, str, str], BilingualCourseGroupInfo] = {}
+        for scan_target, scan_results in results.items():
+            for course in scan_results.courses:
+                course_key = (course.year, course.course_code)
+                bilingual_course = courses.get(course_key)
+                if bilingual_course is None:
+                    bilingual_course = BilingualCourseInfo(
+                        course_code=course.course_code,
+                        year=course.year,
+                        course_groups=[],
+                    )
+                    courses[course_key] = bilingual_course
+
+                for course_group in course.course_groups:
+                    course_group_key = (course.year, course.course_code, course_group.course_group_name)
+                    bilingual_course_group = course_groups.get(course_group_key)
+                    if bilingual_course_group is None:
+                        bilingual_course_group = BilingualCourseGroupInfo(
+                            course_group_name=course_group.course_group_name,
+                            translations={},
+                        )
+                        course_groups[course_group_key] = bilingual_course_group
+                        bilingual_course.course_groups.append(bilingual_course_group)
+                    bilingual_course_group.translations.setdefault(scan_target.language, course_group)
+
+        return BilingualScanResults(
+            courses=tuple(courses.values()),
+            failures={scan_target: tuple(scan_results.failures) for scan_target, scan_results in results.items()},
+        )
+
+    def serialize(self) -> dict:
+        return {
+            "courses": tuple(course.serialize() for course in self.courses),
+            "failures": tuple(
+                {**scan_target.serialize(), **failure.serialize()}
+                for scan_target, failures in self.failures.items()
+                for failure in failures
+            ),
+        }
+
+    def write_text(self, text_file: typing.TextIO, indent: int = 0) -> None:
+        if not self.courses:
+            text_file.write("No courses!")
+            return
+        prefix = "\t" * indent
+        text_file.write(F"{prefix}Courses:\n")
+        for course in self.courses:
+            course.write_text(text_file=text_file, indent=indent+1)
+        if any(self.failures.values()):
+            text_file.write(F"{prefix}Failures:\n")
+            for scan_target, failures in self.failures.items():
+                for failure in failures:
+                    text_file.write(F"{prefix}\tScan target: {scan_target.serialize_text()}\n")
+                    failure.write_text(text_file=text_file, indent=indent+1)
+
+    def write_summary_text(self, text_file: typing.TextIO, indent: int = 0) -> None:
+        prefix = "\t" * indent
+        num_course_groups = sum(len(course.course_groups) for course in self.courses)
+        num_failures = sum(len(failures) for failures in self.failures.values())
+        text_file.write(F"{prefix}Courses: {len(self.courses)}\n")
+        text_file.write(F"{prefix}Course groups: {num_course_groups}\n")
+        text_file.write(F"{prefix}Failures: {num_failures}\n")
+
+    def serialize_text(self, indent: int = 0) -> str:
+        return _serialize_text(self.write_text, indent)
+
     def __str__(self):
         return self.serialize_text()
@@ -0,0 +1,74 @@
+import enum
+import hashlib
+import logging
+import os
+import typing
+import urllib.parse
+
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+
+_logger = logging.getLogger(__name__)
+
+
+class CacheMode(enum.Enum):
+    off = "off"
+    # Use stored responses when available, and store the rest.
+    record = "record"
+    # Use stored responses only, without accessing the network.
+    replay = "replay"
+    # Fetch every response again, and store it.
+    refresh = "refresh"
+
+    @classmethod
+    def all(cls) -> typing.Tuple["CacheMode", ...]:
+        return tuple(cache_mode for cache_mode in cls)
+
+
+class PageCache:
+    """
+    Stores the responses of the syllabus site on disk, so scans can be replayed without accessing the network.
+    Responses are keyed by the language, year, department, page number and a hash of the request body.
+    """
+
+    def __init__(self, directory: str, mode: CacheMode):
+        self.directory = directory
+        self.mode = mode
+
+    def get_path(
+            self,
+            language: syllabus_scanner_non_persistent_models.Language,
+            year: int,
+            department: syllabus_scanner_non_persistent_models.Department,
+            page_number: int,
+            params: typing.Mapping[str, typing.Any],
+    ) -> str:
+        request_body = urllib.parse.urlencode(params, doseq=True).encode("utf-8")
+        request_body_hash = hashlib.sha256(request_body).hexdigest()[:16]
+        return os.path.join(
+            self.directory,
+            language.name,
+            str(year),
+            department.name,
+            F"{page_number}-{request_body_hash}.html",
+        )
+
+    def load(self, path: str) -> typing.Optional[bytes]:
+        if self.mode in (CacheMode.off, CacheMode.refresh):
+            return None
+        try:
+            with open(path, "rb") as page_file:
+                return page_file.read()
+        except FileNotFoundError:
+            if self.mode == CacheMode.replay:
+                _logger.error("No stored response at %s to replay.", path)
+                raise ValueError(F"No stored response at {path} to replay.")
+            return None
+
+    def store(self, path: str, page: bytes) -> None:
+        if self.mode not in (CacheMode.record, CacheMode.refresh):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = F"{path}.tmp"
+        with open(temporary_path, "wb") as page_file:
+            page_file.write(page)
+        os.replace(temporary_path, path)
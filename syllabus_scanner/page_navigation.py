@@ -0,0 +1,72 @@
+import html
+import re
+import typing
+
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+
+GRID_FORM_ID = "frmgrid"
+NEXT_INPUT_ID = "next"
+VIEW_STATE_INPUT_ID = "__VIEWSTATE"
+EVENT_VALIDATION_INPUT_ID = "__EVENTVALIDATION"
+# The hidden ASP.NET form state inputs. They are often the bulk of a page, and the course grid does not depend on them.
+FORM_STATE_INPUT_PATTERN = re.compile(rb"<input\b[^>]*?\b(?:id|name)\s*=\s*[\"']?__[A-Z]+[^>]*>", re.IGNORECASE)
+
+_BODY_TAG_PATTERN = re.compile(rb"<body[\s/>]", re.IGNORECASE)
+_GRID_FORM_PATTERN = re.compile(
+    rb"<form\b[^>]*\bid\s*=\s*[\"']?" + GRID_FORM_ID.encode("ascii") + rb"(?=[\"'\s/>])[^>]*>",
+    re.IGNORECASE,
+)
+_FORM_END_PATTERN = re.compile(rb"</form\s*>", re.IGNORECASE)
+_INPUT_TAG_PATTERN = re.compile(rb"<input\b[^>]*>", re.IGNORECASE)
+_ATTRIBUTE_PATTERN = re.compile(rb"([\w:.-]+)\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s\"'>]+))")
+
+
+def _get_attributes(tag: bytes) -> typing.Dict[str, str]:
+    return {
+        name.decode("latin-1").lower(): html.unescape(
+            (double_quoted_value or single_quoted_value or unquoted_value).decode("latin-1"),
+        )
+        for name, double_quoted_value, single_quoted_value, unquoted_value in _ATTRIBUTE_PATTERN.findall(tag)
+    }
+
+
+def extract_page_navigation(content: bytes) -> syllabus_scanner_non_persistent_models.PageNavigation:
+    """
+    Extracts the navigation state of a page, which is needed in order to request the page that follows it.
+    The fields are matched directly in the raw bytes, without parsing the page, so this is cheap enough to run on
+    the event loop right before the next page is requested.
+    The form state values are base64, so they never contain the ">" the tag patterns stop at.
+    :param content: The raw page content.
+    :returns: The navigation state of the page.
+    """
+    method: typing.Optional[str] = None
+    grid_form_start = grid_form_end = 0
+    grid_form_match = _GRID_FORM_PATTERN.search(content)
+    if grid_form_match is not None:
+        method = _get_attributes(grid_form_match.group()).get("method", "").upper()
+        grid_form_start = grid_form_match.end()
+        grid_form_end_match = _FORM_END_PATTERN.search(content, grid_form_start)
+        grid_form_end = grid_form_end_match.start() if grid_form_end_match is not None else len(content)
+
+    has_next = False
+    form_inputs: typing.Dict[str, str] = {}
+    for input_match in _INPUT_TAG_PATTERN.finditer(content):
+        attributes = _get_attributes(input_match.group())
+        input_id = attributes.get("id")
+        is_in_grid_form = grid_form_start <= input_match.start() < grid_form_end
+        if input_id == NEXT_INPUT_ID:
+            has_next = True
+        elif is_in_grid_form and input_id is not None and input_id not in form_inputs:
+            form_inputs[input_id] = attributes.get("value", "")
+
+    return syllabus_scanner_non_persistent_models.PageNavigation(
+        has_body=_BODY_TAG_PATTERN.search(content) is not None,
+        has_next=has_next,
+        method=method,
+        view_state=form_inputs.get(VIEW_STATE_INPUT_ID),
+        event_validation=form_inputs.get(EVENT_VALIDATION_INPUT_ID),
+    )
+
+
+def strip_form_state(content: bytes) -> bytes:
+    return FORM_STATE_INPUT_PATTERN.sub(b"", content)
@@ -1,8 +1,9 @@
-import copy
 import logging
 import re
+import time
 import typing
 
+from bs4 import BeautifulSoup
 from bs4.element import Tag
 
 from syllabus_scanner import defines as syllabus_scanner_defines
@@ -16,12 +17,38 @@ class SyllabusPageParser:
     def __init__(self, page_entry: syllabus_scanner_non_persistent_models.PageEntry):
         self.page_entry = page_entry
 
+        self._body: typing.Optional[Tag] = None
         self._year: typing.Optional[int] = None
         self._courses: typing.Dict[str, syllabus_scanner_non_persistent_models.CourseInfo] = {}
         self._failures: typing.List[syllabus_scanner_non_persistent_models.CourseGroupParsingFailure] = []
+        # The table rows of the course groups the parser walked through.
+        self.num_rows = 0
+
+    @property
+    def body(self) -> Tag:
+        if self._body is None:
+            self.build_body()
+        return self._body
+
+    def build_body(self) -> None:
+        """
+        Builds the tree of the page, which is most of the time it takes to parse it.
+        """
+        parsed_page = BeautifulSoup(self.page_entry.content, features="html.parser")
+        if parsed_page.body is None:
+            _logger.error(
+                "Page number %s of department %s does not have a body.",
+                self.page_entry.page_number,
+                self.page_entry.department.name,
+            )
+            raise ValueError(
+                F"Page number {self.page_entry.page_number} of department {self.page_entry.department.name} "
+                "does not have a body.",
+            )
+        self._body = parsed_page.body
 
     def parse(self) -> None:
-        for idx, course_first_row in enumerate(self.page_entry.body.find_all("tr", attrs={"class": "listtds"})):
+        for idx, course_first_row in enumerate(self.body.find_all("tr", attrs={"class": "listtds"})):
             try:
                 self._add_course_group(self._parse_course_group(course_first_row))
             except ValueError as exc:
@@ -34,6 +61,7 @@ class SyllabusPageParser:
                 page_number=self.page_entry.page_number,
                 index_in_page=index_in_page,
                 exception_message=exception_message,
+                shard=self.page_entry.shard,
             ),
         )
 
@@ -60,7 +88,7 @@ class SyllabusPageParser:
         if self._year is not None:
             return self._year
 
-        year_cell = self.page_entry.body.select_one(".listtdbbld")
+        year_cell = self.body.select_one(".listtdbbld")
         if year_cell is None:
             _logger.error("Could not find year cell to parse.")
             raise ValueError("Could not find year cell to parse.")
@@ -93,6 +121,8 @@ class SyllabusPageParser:
         while row and not self._is_final_row_in_course(row):
             meetings_rows.append(row)
             row = row.next_sibling
+        # The first, main info, school info and meeting titles rows, followed by the meeting rows.
+        self.num_rows += 4 + len(meetings_rows)
 
         course_code, course_group_name, course_name = self._parse_course_main_info(course_main_info_row)
         faculty, school = self._parse_course_school_info(course_school_info_row)
@@ -129,7 +159,7 @@ class SyllabusPageParser:
             _logger.error("Could not parse course_and_group_text: \"%s\".", course_and_group_text)
             raise ValueError(F"Could not parse course_and_group_text: \"{course_and_group_text}\".")
         course_code = course_and_group_result[1]
-        course_group_name = course_and_group_result[2]
+        course_group_name = course_and_group_result[3]
 
         course_name = syllabus_scanner_utils.normalize(course_main_info_cells[1].text)
         return course_code, course_group_name, course_name
@@ -187,7 +217,7 @@ class SyllabusPageParser:
         if " " in teacher_name_text:
             teachers = {syllabus_scanner_non_persistent_models.Teacher.from_text(teacher_name_text)}
         elif not teacher_name_text and last_course_group_meeting and last_course_group_meeting.teachers:
-            teachers = copy.copy(last_course_group_meeting.teachers)
+            teachers = last_course_group_meeting.teachers
         else:
             teachers = set()
 
@@ -206,14 +236,14 @@ class SyllabusPageParser:
     def _parse_course_meeting_with_partial_data(
             course_meeting_cells: typing.Sequence[Tag],
             last_course_group_meeting: typing.Optional[syllabus_scanner_non_persistent_models.CourseGroupMeetingInfo],
-    ) -> None:
+    ) -> syllabus_scanner_non_persistent_models.CourseGroupMeetingInfo:
         """
         Parses a row of a specific meeting in a course group instance, when the row consists only of the
         teacher name. This happens whenever a meeting has more than one teacher.
         In this case we just add the teacher to the last parsed meeting
         :param course_meeting_cells: The cells of the meeting row being processed.
         :param last_course_group_meeting: The last meeting that was processed, if exists.
-        :returns: Nothing
+        :returns: The last meeting with the teacher added, as a new meeting since meetings are immutable.
         """
         teacher_name_text = syllabus_scanner_utils.normalize(course_meeting_cells[0].text)
         empty_cell = syllabus_scanner_utils.normalize(course_meeting_cells[1].text)
@@ -225,10 +255,11 @@ class SyllabusPageParser:
             _logger.error("Partial meeting rows are expected only after parsing a full meeting row.")
             raise ValueError("Partial meeting rows are expected only after parsing a full meeting row.")
 
-        if " " in teacher_name_text:
-            last_course_group_meeting.teachers.add(
-                syllabus_scanner_non_persistent_models.Teacher.from_text(teacher_name_text),
-            )
+        if " " not in teacher_name_text:
+            return last_course_group_meeting
+        return last_course_group_meeting._replace(teachers=last_course_group_meeting.teachers.union((
+            syllabus_scanner_non_persistent_models.Teacher.from_text(teacher_name_text),
+        )))
 
     def _parse_course_group_meetings(
             self,
@@ -247,12 +278,55 @@ class SyllabusPageParser:
                 )
                 course_group_meetings.append(course_group_meeting)
             elif num_course_meeting_cells == 2:
-                self._parse_course_meeting_with_partial_data(
+                course_group_meeting = self._parse_course_meeting_with_partial_data(
                     course_meeting_cells=course_meeting_cells,
                     last_course_group_meeting=course_group_meeting,
                 )
+                course_group_meetings[-1] = course_group_meeting
             else:
                 _logger.error("Unexpected meeting row with %s cells.", num_course_meeting_cells)
                 raise ValueError(F"Unexpected meeting row with {num_course_meeting_cells} cells.")
 
         return tuple(course_group_meetings)
+
+
+def parse_page(
+        page_entry: syllabus_scanner_non_persistent_models.PageEntry,
+) -> syllabus_scanner_non_persistent_models.ParsedPage:
+    """
+    Parses a single page entry into its courses and failures.
+    This is the entry point of the parse workers, so it only takes and returns picklable objects.
+    :param page_entry: The page entry to parse, holding the raw page content.
+    :returns: A tuple of the parsed courses and the parsing failures of the page.
+    """
+    parser = SyllabusPageParser(page_entry=page_entry)
+    parser.parse()
+    return parser.courses, parser.failures
+
+
+class PageTimings(typing.NamedTuple):
+    soup_seconds: float
+    parse_seconds: float
+    num_rows: int
+
+
+def parse_page_with_timings(
+        page_entry: syllabus_scanner_non_persistent_models.PageEntry,
+) -> typing.Tuple[syllabus_scanner_non_persistent_models.ParsedPage, PageTimings]:
+    """
+    Parses a single page entry like parse_page, and measures the time it took to build its tree and to parse it.
+    :param page_entry: The page entry to parse, holding the raw page content.
+    :returns: A tuple of the parsed page and its timings.
+    """
+    parser = SyllabusPageParser(page_entry=page_entry)
+    start_time = time.perf_counter()
+    parser.build_body()
+    soup_time = time.perf_counter()
+    parser.parse()
+    parse_time = time.perf_counter()
+    page_timings = PageTimings(
+        soup_seconds=soup_time - start_time,
+        parse_seconds=parse_time - soup_time,
+        num_rows=parser.num_rows,
+    )
+    return (parser.courses, parser.failures), page_timings
@@ -0,0 +1,60 @@
+import asyncio
+
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+
+
+def get_page_size(page_entry: syllabus_scanner_non_persistent_models.PageEntry) -> int:
+    return len(page_entry.content) if page_entry.content is not None else 0
+
+
+class BufferedBytesLimit:
+    """
+    Limits the total size of the pages that were loaded but not collected by a consumer yet.
+    A single limit may be shared by the queues of several loaders, so the memory used by a scan of several languages
+    and years is bounded as a whole.
+    """
+
+    def __init__(self, max_buffered_bytes: int):
+        self.max_buffered_bytes = max_buffered_bytes
+        self.buffered_bytes = 0
+        self.peak_buffered_bytes = 0
+        self._released = asyncio.Condition()
+
+    @classmethod
+    def from_megabytes(cls, max_buffered_mb: float) -> "BufferedBytesLimit":
+        return cls(max_buffered_bytes=int(max_buffered_mb * 1024 * 1024))
+
+    def _can_acquire(self, num_bytes: int) -> bool:
+        # A page larger than the whole limit is let through on its own, so it cannot stall the scan forever.
+        return self.buffered_bytes == 0 or self.buffered_bytes + num_bytes <= self.max_buffered_bytes
+
+    async def acquire(self, num_bytes: int) -> None:
+        async with self._released:
+            await self._released.wait_for(lambda: self._can_acquire(num_bytes=num_bytes))
+            self.buffered_bytes += num_bytes
+            self.peak_buffered_bytes = max(self.peak_buffered_bytes, self.buffered_bytes)
+
+    async def release(self, num_bytes: int) -> None:
+        async with self._released:
+            self.buffered_bytes -= num_bytes
+            self._released.notify_all()
+
+
+class PageQueue(asyncio.Queue):
+    """
+    A queue of page entries that applies backpressure on the loaders by the size of the buffered pages,
+    rather than by their number.
+    The size of a page is released by the consumer once the page was parsed and collected, not when it is taken off
+    the queue, since the page is still held while it waits for the parse workers.
+    """
+
+    def __init__(self, buffered_bytes_limit: BufferedBytesLimit):
+        super().__init__()
+        self.buffered_bytes_limit = buffered_bytes_limit
+
+    async def put(self, page_entry: syllabus_scanner_non_persistent_models.PageEntry) -> None:
+        await self.buffered_bytes_limit.acquire(num_bytes=get_page_size(page_entry=page_entry))
+        await super().put(page_entry)
+
+    async def release(self, page_entry: syllabus_scanner_non_persistent_models.PageEntry) -> None:
+        await self.buffered_bytes_limit.release(num_bytes=get_page_size(page_entry=page_entry))
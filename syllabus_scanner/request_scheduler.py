@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import random
+import time
+import typing
+import urllib.parse
+
+from syllabus_scanner import defines as syllabus_scanner_defines
+
+_logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Limits the rate of requests, while still allowing short bursts of up to `capacity` requests.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self._rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class AimdLimiter:
+    """
+    Limits the number of concurrent requests with additive-increase/multiplicative-decrease:
+    every fast successful request grows the limit by about one request per round trip,
+    while an error or a request slower than the latency target halves it.
+    """
+
+    def __init__(self, initial_limit: int, min_limit: int, max_limit: int, latency_target: float):
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._latency_target = latency_target
+        self._in_flight = 0
+        self._last_decrease_at = 0.0
+        self._condition = asyncio.Condition()
+        self.limit = float(initial_limit)
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+
+    async def release(self, latency: float, success: bool) -> None:
+        async with self._condition:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if success and latency <= self._latency_target:
+                self.limit = min(self._max_limit, self.limit + 1 / self.limit)
+            elif now - self._last_decrease_at >= self._latency_target:
+                # Requests that were already in flight when the server got overloaded should only
+                # shrink the limit once, and not collapse it to the minimum.
+                self._last_decrease_at = now
+                self.limit = max(self._min_limit, self.limit / 2)
+                _logger.debug("Decreased the concurrency limit to %s.", int(self.limit))
+            self._condition.notify_all()
+
+    async def cancel(self) -> None:
+        """
+        Frees the slot of a request that was never sent, without changing the limit.
+        """
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+
+class RetryPolicy(typing.NamedTuple):
+    max_retries: int = syllabus_scanner_defines.MAX_RETRIES
+    base_delay: float = syllabus_scanner_defines.RETRY_BASE_DELAY
+    max_delay: float = syllabus_scanner_defines.RETRY_MAX_DELAY
+
+    def get_delay(self, attempt: int) -> float:
+        """
+        Exponential backoff with full jitter, so retries of concurrent requests do not hit the server together.
+        :param attempt: The number of the attempt that failed, starting at 0.
+        :returns: The number of seconds to wait before the next attempt.
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class RequestSlot:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.success = False
+
+
+class _ScheduledRequest:
+    def __init__(self, token_bucket: TokenBucket, aimd_limiter: AimdLimiter):
+        self._token_bucket = token_bucket
+        self._aimd_limiter = aimd_limiter
+        self._request_slot: typing.Optional[RequestSlot] = None
+
+    async def __aenter__(self) -> RequestSlot:
+        await self._aimd_limiter.acquire()
+        try:
+            await self._token_bucket.acquire()
+        except BaseException:
+            await self._aimd_limiter.cancel()
+            raise
+        self._request_slot = RequestSlot()
+        return self._request_slot
+
+    async def __aexit__(self, *_) -> None:
+        await self._aimd_limiter.release(
+            latency=time.monotonic() - self._request_slot.started_at,
+            success=self._request_slot.success,
+        )
+
+
+class RequestScheduler:
+    """
+    Decides when requests may be sent, with a token bucket rate limit and an AIMD concurrency limit per host.
+    A single scheduler should be shared by every loader of a scan, so the limits apply to the scan as a whole.
+    """
+
+    def __init__(
+            self,
+            rate_limit: float = syllabus_scanner_defines.RATE_LIMIT,
+            rate_burst: float = syllabus_scanner_defines.RATE_BURST,
+            initial_concurrency: int = syllabus_scanner_defines.INITIAL_CONCURRENCY,
+            max_concurrency: int = syllabus_scanner_defines.MAX_CONCURRENCY,
+            latency_target: float = syllabus_scanner_defines.LATENCY_TARGET,
+            retry_policy: RetryPolicy = RetryPolicy(),
+    ):
+        self._rate_limit = rate_limit
+        self._rate_burst = rate_burst
+        self._initial_concurrency = min(initial_concurrency, max_concurrency)
+        self._max_concurrency = max_concurrency
+        self._latency_target = latency_target
+        self._hosts: typing.Dict[str, typing.Tuple[TokenBucket, AimdLimiter]] = {}
+        self.retry_policy = retry_policy
+
+    def _get_host_limits(self, url: str) -> typing.Tuple[TokenBucket, AimdLimiter]:
+        host = urllib.parse.urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = (
+                TokenBucket(rate=self._rate_limit, capacity=self._rate_burst),
+                AimdLimiter(
+                    initial_limit=self._initial_concurrency,
+                    min_limit=1,
+                    max_limit=self._max_concurrency,
+                    latency_target=self._latency_target,
+                ),
+            )
+        return self._hosts[host]
+
+    def get_concurrency_limit(self, url: str) -> int:
+        return int(self._get_host_limits(url)[1].limit)
+
+    def request(self, url: str) -> _ScheduledRequest:
+        """
+        Waits for a request slot to the host of the given url.
+        Set `success` on the returned slot once the response was received, so the limits can adapt.
+        """
+        token_bucket, aimd_limiter = self._get_host_limits(url)
+        return _ScheduledRequest(token_bucket=token_bucket, aimd_limiter=aimd_limiter)
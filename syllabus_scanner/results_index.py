@@ -0,0 +1,143 @@
+import logging
+import os
+import pickle
+import typing
+
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+
+_logger = logging.getLogger(__name__)
+
+# Bump whenever the indexes or the parsed models change, so indexes pickled by an older version are not loaded.
+RESULTS_INDEX_VERSION = 2
+
+
+_Key = typing.TypeVar("_Key")
+
+
+def _freeze(index: typing.Mapping[_Key, typing.Set[int]]) -> typing.Dict[_Key, typing.FrozenSet[int]]:
+    return {key: frozenset(positions) for key, positions in index.items()}
+
+
+class IndexedCourseGroup(typing.NamedTuple):
+    year: int
+    course_group: syllabus_scanner_non_persistent_models.CourseGroupInfo
+
+
+class ResultsIndex:
+    """
+    Hash indexes over the course groups of scan results, built once, so the course groups of a teacher, a school
+    or a room are found without walking all the courses.
+    Every index maps a key to the positions of the course groups that have it, and a query intersects the positions
+    of all its filters.
+    Filters on meetings match a course group when any of its meetings matches, not necessarily the same meeting.
+    """
+
+    def __init__(self, course_groups: typing.Sequence[IndexedCourseGroup]):
+        self.course_groups = tuple(course_groups)
+        self.teachers: typing.Dict[str, typing.FrozenSet[int]] = {}
+        self.faculties: typing.Dict[str, typing.FrozenSet[int]] = {}
+        self.schools: typing.Dict[str, typing.FrozenSet[int]] = {}
+        self.buildings: typing.Dict[str, typing.FrozenSet[int]] = {}
+        self.rooms: typing.Dict[typing.Tuple[str, str], typing.FrozenSet[int]] = {}
+        self.semesters: typing.Dict[syllabus_scanner_non_persistent_models.Semester, typing.FrozenSet[int]] = {}
+        self.meeting_types: typing.Dict[syllabus_scanner_non_persistent_models.MeetingType, typing.FrozenSet[int]] = {}
+        self._build()
+
+    @classmethod
+    def from_results(cls, results: syllabus_scanner_non_persistent_models.ScanResults) -> "ResultsIndex":
+        return cls(course_groups=tuple(
+            IndexedCourseGroup(year=course.year, course_group=course_group)
+            for course in results.courses
+            for course_group in course.course_groups
+        ))
+
+    def _build(self) -> None:
+        teachers: typing.Dict[str, typing.Set[int]] = {}
+        faculties: typing.Dict[str, typing.Set[int]] = {}
+        schools: typing.Dict[str, typing.Set[int]] = {}
+        buildings: typing.Dict[str, typing.Set[int]] = {}
+        rooms: typing.Dict[typing.Tuple[str, str], typing.Set[int]] = {}
+        semesters: typing.Dict[syllabus_scanner_non_persistent_models.Semester, typing.Set[int]] = {}
+        meeting_types: typing.Dict[syllabus_scanner_non_persistent_models.MeetingType, typing.Set[int]] = {}
+        for position, indexed_course_group in enumerate(self.course_groups):
+            course_group = indexed_course_group.course_group
+            faculties.setdefault(course_group.faculty, set()).add(position)
+            schools.setdefault(course_group.school, set()).add(position)
+            semesters.setdefault(course_group.semester, set()).add(position)
+            for meeting in course_group.meetings:
+                meeting_types.setdefault(meeting.meeting_type, set()).add(position)
+                for teacher in meeting.teachers:
+                    teachers.setdefault(teacher.full_name, set()).add(position)
+                if meeting.building is not None:
+                    buildings.setdefault(meeting.building, set()).add(position)
+                    if meeting.room is not None:
+                        rooms.setdefault((meeting.building, meeting.room), set()).add(position)
+
+        self.teachers = _freeze(teachers)
+        self.faculties = _freeze(faculties)
+        self.schools = _freeze(schools)
+        self.buildings = _freeze(buildings)
+        self.rooms = _freeze(rooms)
+        self.semesters = _freeze(semesters)
+        self.meeting_types = _freeze(meeting_types)
+
+    def find(
+            self,
+            teacher_full_name: typing.Optional[str] = None,
+            faculty: typing.Optional[str] = None,
+            school: typing.Optional[str] = None,
+            building: typing.Optional[str] = None,
+            room: typing.Optional[str] = None,
+            semester: typing.Optional[syllabus_scanner_non_persistent_models.Semester] = None,
+            meeting_type: typing.Optional[syllabus_scanner_non_persistent_models.MeetingType] = None,
+    ) -> typing.Tuple[IndexedCourseGroup, ...]:
+        """
+        Finds the course groups that match all the given filters.
+        :param teacher_full_name: The full name of a teacher of the group.
+        :param faculty: The faculty of the group.
+        :param school: The school of the group.
+        :param building: A building the group meets in.
+        :param room: A room the group meets in, in the given building.
+        :param semester: The semester of the group, as deduced from all its meetings.
+        :param meeting_type: The type of one of the meetings of the group.
+        :returns: The matching course groups, in the order of the scan results. With no filters, all the course groups.
+        """
+        if room is not None and building is None:
+            _logger.error("Got room %s without a building.", room)
+            raise ValueError(F"Got room {room} without a building.")
+
+        filters = (
+            (self.teachers, teacher_full_name),
+            (self.faculties, faculty),
+            (self.schools, school),
+            (self.buildings, building),
+            (self.rooms, (building, room) if room is not None else None),
+            (self.semesters, semester),
+            (self.meeting_types, meeting_type),
+        )
+        matches = [index.get(key, frozenset()) for index, key in filters if key is not None]
+        if not matches:
+            return self.course_groups
+        # Intersecting from the smallest set keeps every intersection as small as possible.
+        matches.sort(key=len)
+        positions = matches[0].intersection(*matches[1:])
+        return tuple(self.course_groups[position] for position in sorted(positions))
+
+    def save(self, path: str) -> None:
+        temporary_path = F"{path}.tmp"
+        with open(temporary_path, "wb") as index_file:
+            pickle.dump(
+                {"version": RESULTS_INDEX_VERSION, "index": self},
+                index_file,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ResultsIndex":
+        with open(path, "rb") as index_file:
+            stored = pickle.load(index_file)
+        if stored.get("version") != RESULTS_INDEX_VERSION:
+            _logger.error("Results index %s is of version %s.", path, stored.get("version"))
+            raise ValueError(F"Results index {path} is of version {stored.get('version')}.")
+        return stored["index"]
@@ -0,0 +1,80 @@
+import abc
+import typing
+
+from syllabus_scanner import json_encoder as syllabus_scanner_json_encoder
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+
+if typing.TYPE_CHECKING:
+    # Only the async writer needs asyncio, and the other writers are used by scripts that do not import it.
+    import asyncio
+
+
+class ResultsWriter(abc.ABC):
+    """
+    Receives every course and failure as soon as it is parsed, so the results of a scan never have to be held in
+    memory all at once.
+    """
+
+    def __init__(self):
+        self.num_courses = 0
+        self.num_failures = 0
+
+    @abc.abstractmethod
+    def write_course(self, course: syllabus_scanner_non_persistent_models.CourseInfo) -> None:
+        pass
+
+    @abc.abstractmethod
+    def write_failure(self, failure: syllabus_scanner_non_persistent_models.CourseGroupParsingFailure) -> None:
+        pass
+
+
+class AsyncQueueResultsWriter(ResultsWriter):
+    """
+    Puts every course on an asyncio queue, for a coroutine of the same event loop to take while the scan goes on.
+    The queue is unbounded, since courses are written from synchronous code that cannot wait for room.
+    """
+
+    def __init__(
+            self,
+            courses_queue: "asyncio.Queue",
+            failures: typing.Optional[typing.List[
+                syllabus_scanner_non_persistent_models.CourseGroupParsingFailure
+            ]] = None,
+    ):
+        """
+        :param courses_queue: The queue to put the courses on.
+        :param failures: A list to append the failures to. Defaults to a new list.
+        """
+        super().__init__()
+        self.courses_queue = courses_queue
+        self.failures = failures if failures is not None else []
+
+    def write_course(self, course: syllabus_scanner_non_persistent_models.CourseInfo) -> None:
+        self.courses_queue.put_nowait(course)
+        self.num_courses += 1
+
+    def write_failure(self, failure: syllabus_scanner_non_persistent_models.CourseGroupParsingFailure) -> None:
+        self.failures.append(failure)
+        self.num_failures += 1
+
+
+class NdjsonResultsWriter(ResultsWriter):
+    """
+    Writes every course and failure as a single JSON line.
+    """
+
+    def __init__(self, courses_file: typing.TextIO, failures_file: typing.TextIO):
+        super().__init__()
+        self._courses_file = courses_file
+        self._failures_file = failures_file
+        self._encoder = syllabus_scanner_json_encoder.ScanResultsJsonEncoder()
+
+    def write_course(self, course: syllabus_scanner_non_persistent_models.CourseInfo) -> None:
+        self._courses_file.write(self._encoder.encode_course(course))
+        self._courses_file.write("\n")
+        self.num_courses += 1
+
+    def write_failure(self, failure: syllabus_scanner_non_persistent_models.CourseGroupParsingFailure) -> None:
+        self._failures_file.write(self._encoder.encode_failure(failure))
+        self._failures_file.write("\n")
+        self.num_failures += 1
@@ -0,0 +1,330 @@
+import bisect
+import contextlib
+import json
+import os
+import time
+import typing
+
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+
+# The default buckets of the Prometheus client libraries, in seconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_PREFIX = "syllabus_scanner"
+
+
+class Histogram:
+    def __init__(self, buckets: typing.Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # The last count is of the values above the largest bucket.
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def get_cumulative_counts(self) -> typing.Iterator[typing.Tuple[str, int]]:
+        cumulative_count = 0
+        for bucket, bucket_count in zip((*(repr(bucket) for bucket in self.buckets), "+Inf"), self.bucket_counts):
+            cumulative_count += bucket_count
+            yield bucket, cumulative_count
+
+    def serialize(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(self.get_cumulative_counts()),
+        }
+
+
+class DepartmentMetrics:
+    """
+    The metrics of the pages of a single department, collected by the loader and the consumer.
+    """
+
+    def __init__(self):
+        self.request_seconds = Histogram()
+        self.num_requests = 0
+        self.num_failed_requests = 0
+        self.downloaded_bytes = 0
+        self.soup_seconds = Histogram()
+        self.parse_seconds = Histogram()
+        self.num_pages = 0
+        self.num_reused_pages = 0
+        self.num_restored_pages = 0
+        self.num_rows = 0
+        self.num_course_groups = 0
+        self.num_failures = 0
+
+    def serialize(self) -> dict:
+        return {
+            "request_seconds": self.request_seconds.serialize(),
+            "num_requests": self.num_requests,
+            "num_failed_requests": self.num_failed_requests,
+            "downloaded_bytes": self.downloaded_bytes,
+            "soup_seconds": self.soup_seconds.serialize(),
+            "parse_seconds": self.parse_seconds.serialize(),
+            "num_pages": self.num_pages,
+            "num_reused_pages": self.num_reused_pages,
+            "num_restored_pages": self.num_restored_pages,
+            "num_rows": self.num_rows,
+            "num_course_groups": self.num_course_groups,
+            "num_failures": self.num_failures,
+        }
+
+
+class QueueDepthSample(typing.NamedTuple):
+    # Seconds since the metrics were created.
+    elapsed_seconds: float
+    num_pages: int
+    buffered_bytes: int
+
+
+class ScanMetrics:
+    """
+    The metrics of a scan of a single language and year, to find which stage of the scan is its bottleneck.
+    Pass it to scanner.scan, and read it or write it with write_json and write_prometheus_textfile after the scan.
+    """
+
+    def __init__(self, language: syllabus_scanner_non_persistent_models.Language, year: int):
+        self.language = language
+        self.year = year
+        self.departments: typing.Dict[str, DepartmentMetrics] = {}
+        self.queue_depth: typing.List[QueueDepthSample] = []
+        self.scan_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self._start_time = time.perf_counter()
+
+    def get_department(self, department: syllabus_scanner_non_persistent_models.Department) -> DepartmentMetrics:
+        department_metrics = self.departments.get(department.name)
+        if department_metrics is None:
+            department_metrics = self.departments[department.name] = DepartmentMetrics()
+        return department_metrics
+
+    def sample_queue_depth(self, num_pages: int, buffered_bytes: int) -> None:
+        self.queue_depth.append(QueueDepthSample(
+            elapsed_seconds=time.perf_counter() - self._start_time,
+            num_pages=num_pages,
+            buffered_bytes=buffered_bytes,
+        ))
+
+    @contextlib.contextmanager
+    def measure_serialization(self) -> typing.Iterator[None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.serialization_seconds += time.perf_counter() - start_time
+
+    def serialize(self) -> dict:
+        return {
+            "language": self.language.name,
+            "year": self.year,
+            "scan_seconds": self.scan_seconds,
+            "serialization_seconds": self.serialization_seconds,
+            "departments": {
+                department_name: department_metrics.serialize()
+                for department_name, department_metrics in self.departments.items()
+            },
+            "queue_depth": [sample._asdict() for sample in self.queue_depth],
+        }
+
+    @property
+    def peak_queue_depth(self) -> int:
+        return max((sample.num_pages for sample in self.queue_depth), default=0)
+
+    @property
+    def peak_buffered_bytes(self) -> int:
+        return max((sample.buffered_bytes for sample in self.queue_depth), default=0)
+
+    def get_labels(self, department_name: typing.Optional[str] = None) -> str:
+        labels = F'language="{self.language.name}",year="{self.year}"'
+        if department_name is not None:
+            labels = F'{labels},department="{department_name}"'
+        return labels
+
+
+class _PrometheusMetric(typing.NamedTuple):
+    name: str
+    type: str
+    help: str
+    # The attribute that holds the value, of DepartmentMetrics or of ScanMetrics.
+    attribute: str
+
+
+_PROMETHEUS_DEPARTMENT_METRICS = (
+    _PrometheusMetric(
+        name="request_duration_seconds",
+        type="histogram",
+        help="The latency of the requests to the syllabus site, including reading the page.",
+        attribute="request_seconds",
+    ),
+    _PrometheusMetric(
+        name="requests_total",
+        type="counter",
+        help="The requests sent to the syllabus site, including retries.",
+        attribute="num_requests",
+    ),
+    _PrometheusMetric(
+        name="failed_requests_total",
+        type="counter",
+        help="The requests that failed with an error status or a connection error.",
+        attribute="num_failed_requests",
+    ),
+    _PrometheusMetric(
+        name="downloaded_bytes_total",
+        type="counter",
+        help="The bytes of the pages downloaded from the syllabus site.",
+        attribute="downloaded_bytes",
+    ),
+    _PrometheusMetric(
+        name="soup_duration_seconds",
+        type="histogram",
+        help="The time it took to build the BeautifulSoup tree of a page.",
+        attribute="soup_seconds",
+    ),
+    _PrometheusMetric(
+        name="parse_duration_seconds",
+        type="histogram",
+        help="The time it took SyllabusPageParser.parse to parse the tree of a page.",
+        attribute="parse_seconds",
+    ),
+    _PrometheusMetric(
+        name="pages_total",
+        type="counter",
+        help="The pages collected, including the reused and restored ones.",
+        attribute="num_pages",
+    ),
+    _PrometheusMetric(
+        name="reused_pages_total",
+        type="counter",
+        help="The pages that did not change since the previous scan, so their previous results were reused.",
+        attribute="num_reused_pages",
+    ),
+    _PrometheusMetric(
+        name="restored_pages_total",
+        type="counter",
+        help="The pages restored from the checkpoint of an interrupted scan.",
+        attribute="num_restored_pages",
+    ),
+    _PrometheusMetric(
+        name="rows_total",
+        type="counter",
+        help="The table rows of the course groups in the parsed pages.",
+        attribute="num_rows",
+    ),
+    _PrometheusMetric(
+        name="course_groups_total",
+        type="counter",
+        help="The course groups parsed from the pages.",
+        attribute="num_course_groups",
+    ),
+    _PrometheusMetric(
+        name="failures_total",
+        type="counter",
+        help="The course groups that failed to parse.",
+        attribute="num_failures",
+    ),
+)
+_PROMETHEUS_SCAN_METRICS = (
+    _PrometheusMetric(
+        name="queue_depth_peak",
+        type="gauge",
+        help="The largest number of pages waiting in the queue of the consumer.",
+        attribute="peak_queue_depth",
+    ),
+    _PrometheusMetric(
+        name="buffered_bytes_peak",
+        type="gauge",
+        help="The largest size of the pages loaded but not collected by the consumer yet.",
+        attribute="peak_buffered_bytes",
+    ),
+    _PrometheusMetric(
+        name="scan_duration_seconds",
+        type="gauge",
+        help="The time it took to load and parse all the pages.",
+        attribute="scan_seconds",
+    ),
+    _PrometheusMetric(
+        name="serialization_duration_seconds",
+        type="gauge",
+        help="The time it took to serialize and write the results.",
+        attribute="serialization_seconds",
+    ),
+)
+
+
+def _write_prometheus_sample(text_file: typing.TextIO, name: str, labels: str, value: float) -> None:
+    text_file.write(F"{name}{{{labels}}} {value!r}\n")
+
+
+def _write_prometheus_metric(
+        text_file: typing.TextIO,
+        prometheus_metric: _PrometheusMetric,
+        samples: typing.Iterable[typing.Tuple[str, typing.Union[Histogram, float]]],
+) -> None:
+    name = F"{METRIC_PREFIX}_{prometheus_metric.name}"
+    text_file.write(F"# HELP {name} {prometheus_metric.help}\n")
+    text_file.write(F"# TYPE {name} {prometheus_metric.type}\n")
+    for labels, value in samples:
+        if not isinstance(value, Histogram):
+            _write_prometheus_sample(text_file=text_file, name=name, labels=labels, value=value)
+            continue
+        for bucket, cumulative_count in value.get_cumulative_counts():
+            _write_prometheus_sample(
+                text_file=text_file,
+                name=F"{name}_bucket",
+                labels=F'{labels},le="{bucket}"',
+                value=cumulative_count,
+            )
+        _write_prometheus_sample(text_file=text_file, name=F"{name}_sum", labels=labels, value=value.sum)
+        _write_prometheus_sample(text_file=text_file, name=F"{name}_count", labels=labels, value=value.count)
+
+
+def write_prometheus_text(all_metrics: typing.Iterable[ScanMetrics], text_file: typing.TextIO) -> None:
+    """
+    Writes the metrics in the Prometheus text exposition format.
+    :param all_metrics: The metrics of every scan, told apart by their language and year labels.
+    :param text_file: The file to write to.
+    """
+    all_metrics = tuple(all_metrics)
+    for prometheus_metric in _PROMETHEUS_DEPARTMENT_METRICS:
+        _write_prometheus_metric(
+            text_file=text_file,
+            prometheus_metric=prometheus_metric,
+            samples=(
+                (
+                    metrics.get_labels(department_name=department_name),
+                    getattr(department_metrics, prometheus_metric.attribute),
+                )
+                for metrics in all_metrics
+                for department_name, department_metrics in metrics.departments.items()
+            ),
+        )
+    for prometheus_metric in _PROMETHEUS_SCAN_METRICS:
+        _write_prometheus_metric(
+            text_file=text_file,
+            prometheus_metric=prometheus_metric,
+            samples=((metrics.get_labels(), getattr(metrics, prometheus_metric.attribute)) for metrics in all_metrics),
+        )
+
+
+def write_prometheus_textfile(all_metrics: typing.Iterable[ScanMetrics], path: str) -> None:
+    """
+    Writes the metrics to a file for the textfile collector of the Prometheus node exporter.
+    The file is replaced at once, so the collector never reads it half written.
+    :param all_metrics: The metrics of every scan.
+    :param path: The path of the file, which should end with .prom for the collector to read it.
+    """
+    temporary_path = F"{path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as text_file:
+        write_prometheus_text(all_metrics=all_metrics, text_file=text_file)
+    os.replace(temporary_path, path)
+
+
+def write_json(all_metrics: typing.Iterable[ScanMetrics], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as json_file:
+        json.dump(obj=[metrics.serialize() for metrics in all_metrics], fp=json_file, indent=4)
+        json_file.write("\n")
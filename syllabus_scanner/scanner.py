@@ -1,26 +1,315 @@
+import asyncio
+import concurrent.futures
+import os
 import typing
 
+from syllabus_scanner import checkpoint as syllabus_scanner_checkpoint
 from syllabus_scanner import consumer as syllabus_scanner_consumer
+from syllabus_scanner import defines as syllabus_scanner_defines
+from syllabus_scanner import fingerprint_store as syllabus_scanner_fingerprint_store
 from syllabus_scanner import loader as syllabus_scanner_loader
 from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+from syllabus_scanner import page_cache as syllabus_scanner_page_cache
+from syllabus_scanner import page_queue as syllabus_scanner_page_queue
+from syllabus_scanner import request_scheduler as syllabus_scanner_request_scheduler
+from syllabus_scanner import results_writer as syllabus_scanner_results_writer
+from syllabus_scanner import scan_metrics as syllabus_scanner_scan_metrics
 
 
 def scan(
         language: syllabus_scanner_non_persistent_models.Language,
         year: int,
         departments: typing.Sequence[syllabus_scanner_non_persistent_models.Department] = (),
+        parse_workers: typing.Optional[int] = None,
+        connection_settings: syllabus_scanner_loader.ConnectionSettings = syllabus_scanner_loader.ConnectionSettings(),
+        page_cache: typing.Optional[syllabus_scanner_page_cache.PageCache] = None,
+        fingerprint_store: typing.Optional[syllabus_scanner_fingerprint_store.FingerprintStore] = None,
+        results_writer: typing.Optional[syllabus_scanner_results_writer.ResultsWriter] = None,
+        columnar_results: bool = False,
+        max_concurrent_requests: typing.Optional[int] = None,
+        shard_departments: bool = False,
+        shard_by_day: bool = False,
+        checkpoint: typing.Optional[syllabus_scanner_checkpoint.ScanCheckpoint] = None,
+        max_buffered_mb: typing.Optional[float] = None,
+        rate_limit: typing.Optional[float] = None,
+        url: typing.Optional[str] = None,
+        metrics: typing.Optional[syllabus_scanner_scan_metrics.ScanMetrics] = None,
 ) -> syllabus_scanner_non_persistent_models.ScanResults:
     """
     Scan the syllabus site of Tel-Aviv University and retrieve courses information.
     :param language: The syllabus language.
     :param year: The Gregorian year the academic year starts at.
     :param departments: The departments to scan. If none are provided then scan all departments.
+    :param parse_workers: The number of processes used to parse the pages. Defaults to the number of CPUs.
+    :param connection_settings: The settings of the connection pool shared by all the departments.
+    :param page_cache: A cache to record the fetched pages to, or replay them from.
+    :param fingerprint_store: The fingerprints of the previous scan, used to skip parsing pages that did not change.
+        It is updated with the fingerprints of this scan, and it is up to the caller to save it.
+    :param results_writer: A writer to stream the courses and failures to as soon as they are parsed.
+        When provided, the returned ScanResults object is empty. Course groups found again are dropped, but the
+        groups of a course split between pages are written as separate course objects.
+    :param columnar_results: Whether to keep the courses in a compact columnar store, which builds the course
+        objects only when they are accessed.
+    :param max_concurrent_requests: The maximal number of requests in flight.
+        The actual limit adapts to the server below this value.
+    :param shard_departments: Whether to split every department into a sub-query per department code,
+        so their pagination chains are loaded concurrently.
+    :param shard_by_day: Whether to split every department code into a sub-query per day as well.
+    :param checkpoint: A checkpoint to record the progress of the scan to, and to resume it from.
+        It is up to the caller to clear it once the results are saved.
+    :param max_buffered_mb: The total size of the pages loaded but not parsed yet, after which loading waits
+        for the parse workers.
+    :param rate_limit: The maximal number of requests per second, zero for no limit. Defaults to SYLLABUS_RATE_LIMIT.
+    :param url: The URL of the syllabus search, to scan a stand-in of the site instead. Defaults to SYLLABUS_URL.
+    :param metrics: The metrics to collect the timings and counts of every stage of the scan to.
+    :return: A ScanResults object containing the collected objects from the syllabus scan.
+    """
+    loop = asyncio.get_event_loop()
+    return loop.run_until_complete(scan_async(
+        language=language,
+        year=year,
+        departments=departments,
+        parse_workers=parse_workers,
+        connection_settings=connection_settings,
+        page_cache=page_cache,
+        fingerprint_store=fingerprint_store,
+        results_writer=results_writer,
+        columnar_results=columnar_results,
+        max_concurrent_requests=max_concurrent_requests,
+        shard_departments=shard_departments,
+        shard_by_day=shard_by_day,
+        checkpoint=checkpoint,
+        max_buffered_mb=max_buffered_mb,
+        rate_limit=rate_limit,
+        url=url,
+        metrics=metrics,
+    ))
+
+
+async def scan_async(
+        language: syllabus_scanner_non_persistent_models.Language,
+        year: int,
+        departments: typing.Sequence[syllabus_scanner_non_persistent_models.Department] = (),
+        parse_workers: typing.Optional[int] = None,
+        connection_settings: syllabus_scanner_loader.ConnectionSettings = syllabus_scanner_loader.ConnectionSettings(),
+        page_cache: typing.Optional[syllabus_scanner_page_cache.PageCache] = None,
+        fingerprint_store: typing.Optional[syllabus_scanner_fingerprint_store.FingerprintStore] = None,
+        results_writer: typing.Optional[syllabus_scanner_results_writer.ResultsWriter] = None,
+        columnar_results: bool = False,
+        max_concurrent_requests: typing.Optional[int] = None,
+        shard_departments: bool = False,
+        shard_by_day: bool = False,
+        checkpoint: typing.Optional[syllabus_scanner_checkpoint.ScanCheckpoint] = None,
+        max_buffered_mb: typing.Optional[float] = None,
+        rate_limit: typing.Optional[float] = None,
+        url: typing.Optional[str] = None,
+        metrics: typing.Optional[syllabus_scanner_scan_metrics.ScanMetrics] = None,
+) -> syllabus_scanner_non_persistent_models.ScanResults:
+    """
+    Scan the syllabus site like scan, in the running event loop, so it can be awaited by an application that already
+    runs one. Takes the same parameters as scan.
+    Cancelling it cancels the loading and parsing of the pages, and waits only for the pages being parsed.
     :return: A ScanResults object containing the collected objects from the syllabus scan.
     """
     departments = departments or syllabus_scanner_non_persistent_models.Department.all()
+    parse_workers = parse_workers or os.cpu_count() or 1
 
-    loader = syllabus_scanner_loader.SyllabusLoader(language=language, year=year, departments=departments)
-    consumer = syllabus_scanner_consumer.SyllabusConsumer(departments=departments)
-    loader.set_consumer(consumer.consumer)
-    loader.run()
+    parse_executor = concurrent.futures.ProcessPoolExecutor(max_workers=parse_workers)
+    try:
+        loader = syllabus_scanner_loader.SyllabusLoader(
+            language=language,
+            year=year,
+            departments=departments,
+            connection_settings=connection_settings,
+            page_cache=page_cache,
+            request_scheduler=syllabus_scanner_request_scheduler.RequestScheduler(
+                rate_limit=syllabus_scanner_defines.RATE_LIMIT if rate_limit is None else rate_limit,
+                max_concurrency=max_concurrent_requests or syllabus_scanner_defines.MAX_CONCURRENCY,
+            ),
+            shard_departments=shard_departments,
+            shard_by_day=shard_by_day,
+            checkpoint=checkpoint,
+            buffered_bytes_limit=syllabus_scanner_page_queue.BufferedBytesLimit.from_megabytes(
+                max_buffered_mb=max_buffered_mb or syllabus_scanner_defines.MAX_BUFFERED_MB,
+            ),
+            url=url,
+            metrics=metrics,
+        )
+        consumer = syllabus_scanner_consumer.SyllabusConsumer(
+            departments=departments,
+            parse_executor=parse_executor,
+            max_pending_pages=parse_workers * syllabus_scanner_defines.PARSE_QUEUE_SIZE_MULTIPLIER,
+            fingerprint_store=fingerprint_store,
+            results_writer=results_writer,
+            columnar_results=columnar_results,
+            checkpoint=checkpoint,
+            metrics=metrics,
+        )
+        loader.set_consumer(consumer.consumer)
+        await loader.run_async()
+    finally:
+        # Shutting down waits for the pages being parsed, which should not block the event loop meanwhile.
+        await asyncio.get_event_loop().run_in_executor(None, parse_executor.shutdown)
     return consumer.results
+
+
+async def iter_courses(
+        language: syllabus_scanner_non_persistent_models.Language,
+        year: int,
+        departments: typing.Sequence[syllabus_scanner_non_persistent_models.Department] = (),
+        parse_workers: typing.Optional[int] = None,
+        connection_settings: syllabus_scanner_loader.ConnectionSettings = syllabus_scanner_loader.ConnectionSettings(),
+        page_cache: typing.Optional[syllabus_scanner_page_cache.PageCache] = None,
+        fingerprint_store: typing.Optional[syllabus_scanner_fingerprint_store.FingerprintStore] = None,
+        max_concurrent_requests: typing.Optional[int] = None,
+        shard_departments: bool = False,
+        shard_by_day: bool = False,
+        checkpoint: typing.Optional[syllabus_scanner_checkpoint.ScanCheckpoint] = None,
+        max_buffered_mb: typing.Optional[float] = None,
+        rate_limit: typing.Optional[float] = None,
+        url: typing.Optional[str] = None,
+        metrics: typing.Optional[syllabus_scanner_scan_metrics.ScanMetrics] = None,
+        failures: typing.Optional[typing.List[syllabus_scanner_non_persistent_models.CourseGroupParsingFailure]] = None,
+) -> typing.AsyncIterator[syllabus_scanner_non_persistent_models.CourseInfo]:
+    """
+    Scan the syllabus site like scan_async, and yield every course as soon as its page is parsed, so the courses of
+    the first departments can be handled while the others are still loading.
+    Takes the same parameters as scan, except for the results writer and the columnar results.
+    Like with a results writer, course groups found again are dropped, but the groups of a course split between
+    pages are yielded as separate course objects.
+    Closing the iterator before it is exhausted, such as with contextlib.aclosing, cancels the scan.
+    :param failures: A list to append the parsing failures to, as they are found.
+    :return: An asynchronous iterator of the parsed courses.
+    """
+    courses_queue: asyncio.Queue = asyncio.Queue()
+    scan_task = asyncio.get_event_loop().create_task(scan_async(
+        language=language,
+        year=year,
+        departments=departments,
+        parse_workers=parse_workers,
+        connection_settings=connection_settings,
+        page_cache=page_cache,
+        fingerprint_store=fingerprint_store,
+        results_writer=syllabus_scanner_results_writer.AsyncQueueResultsWriter(
+            courses_queue=courses_queue,
+            failures=failures,
+        ),
+        max_concurrent_requests=max_concurrent_requests,
+        shard_departments=shard_departments,
+        shard_by_day=shard_by_day,
+        checkpoint=checkpoint,
+        max_buffered_mb=max_buffered_mb,
+        rate_limit=rate_limit,
+        url=url,
+        metrics=metrics,
+    ))
+    # None marks the end of the courses, whether the scan finished or failed.
+    scan_task.add_done_callback(lambda _: courses_queue.put_nowait(None))
+    try:
+        while True:
+            course = await courses_queue.get()
+            if course is None:
+                break
+            yield course
+        # Raises the exception of a failed scan.
+        await scan_task
+    finally:
+        if not scan_task.done():
+            scan_task.cancel()
+            await asyncio.gather(scan_task, return_exceptions=True)
+
+
+def scan_many(
+        scan_targets: typing.Sequence[syllabus_scanner_non_persistent_models.ScanTarget],
+        departments: typing.Sequence[syllabus_scanner_non_persistent_models.Department] = (),
+        parse_workers: typing.Optional[int] = None,
+        connection_settings: syllabus_scanner_loader.ConnectionSettings = syllabus_scanner_loader.ConnectionSettings(),
+        page_cache: typing.Optional[syllabus_scanner_page_cache.PageCache] = None,
+        max_concurrent_requests: typing.Optional[int] = None,
+        shard_departments: bool = False,
+        shard_by_day: bool = False,
+        checkpoints: typing.Optional[typing.Mapping[
+            syllabus_scanner_non_persistent_models.ScanTarget,
+            syllabus_scanner_checkpoint.ScanCheckpoint,
+        ]] = None,
+        max_buffered_mb: typing.Optional[float] = None,
+        rate_limit: typing.Optional[float] = None,
+        url: typing.Optional[str] = None,
+        metrics: typing.Optional[typing.Mapping[
+            syllabus_scanner_non_persistent_models.ScanTarget,
+            syllabus_scanner_scan_metrics.ScanMetrics,
+        ]] = None,
+        target_departments: typing.Optional[typing.Mapping[
+            syllabus_scanner_non_persistent_models.ScanTarget,
+            typing.Sequence[syllabus_scanner_non_persistent_models.Department],
+        ]] = None,
+) -> typing.Dict[syllabus_scanner_non_persistent_models.ScanTarget, syllabus_scanner_non_persistent_models.ScanResults]:
+    """
+    Scan the syllabus site for several languages and years at once, in a single event loop.
+    All the scans share one session, one pool of parse workers and one request scheduler.
+    :param scan_targets: The languages and years to scan.
+    :param departments: The departments to scan. If none are provided then scan all departments.
+    :param parse_workers: The number of processes used to parse the pages. Defaults to the number of CPUs.
+    :param connection_settings: The settings of the connection pool shared by all the scans.
+    :param page_cache: A cache to record the fetched pages to, or replay them from.
+    :param max_concurrent_requests: The maximal number of requests in flight across all the scans.
+        The actual limit adapts to the server below this value.
+    :param shard_departments: Whether to split every department into a sub-query per department code.
+    :param shard_by_day: Whether to split every department code into a sub-query per day as well.
+    :param checkpoints: The checkpoint of every scan target, to record the progress of the scans to and resume them
+        from. It is up to the caller to clear them once the results are saved.
+    :param max_buffered_mb: The total size of the pages loaded but not parsed yet across all the scans,
+        after which loading waits for the parse workers.
+    :param rate_limit: The maximal number of requests per second across all the scans, zero for no limit.
+        Defaults to SYLLABUS_RATE_LIMIT.
+    :param url: The URL of the syllabus search, to scan a stand-in of the site instead. Defaults to SYLLABUS_URL.
+    :param metrics: The metrics of every scan target, to collect the timings and counts of every stage of the scans to.
+    :param target_departments: The departments to scan for every scan target, instead of the same departments for all
+        of them, like a shard of a scan split across several machines does.
+    :return: The ScanResults of every scan target. Use BilingualScanResults.join to combine them into bilingual records.
+    """
+    departments = departments or syllabus_scanner_non_persistent_models.Department.all()
+    parse_workers = parse_workers or os.cpu_count() or 1
+    request_scheduler = syllabus_scanner_request_scheduler.RequestScheduler(
+        rate_limit=syllabus_scanner_defines.RATE_LIMIT if rate_limit is None else rate_limit,
+        max_concurrency=max_concurrent_requests or syllabus_scanner_defines.MAX_CONCURRENCY,
+    )
+    buffered_bytes_limit = syllabus_scanner_page_queue.BufferedBytesLimit.from_megabytes(
+        max_buffered_mb=max_buffered_mb or syllabus_scanner_defines.MAX_BUFFERED_MB,
+    )
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=parse_workers) as parse_executor:
+        loaders: typing.List[syllabus_scanner_loader.SyllabusLoader] = []
+        consumers: typing.Dict[
+            syllabus_scanner_non_persistent_models.ScanTarget,
+            syllabus_scanner_consumer.SyllabusConsumer,
+        ] = {}
+        for scan_target in scan_targets:
+            checkpoint = checkpoints[scan_target] if checkpoints is not None else None
+            scan_metrics = metrics[scan_target] if metrics is not None else None
+            scan_target_departments = target_departments[scan_target] if target_departments is not None else departments
+            loader = syllabus_scanner_loader.SyllabusLoader(
+                language=scan_target.language,
+                year=scan_target.year,
+                departments=scan_target_departments,
+                page_cache=page_cache,
+                request_scheduler=request_scheduler,
+                shard_departments=shard_departments,
+                shard_by_day=shard_by_day,
+                checkpoint=checkpoint,
+                buffered_bytes_limit=buffered_bytes_limit,
+                url=url,
+                metrics=scan_metrics,
+            )
+            consumer = syllabus_scanner_consumer.SyllabusConsumer(
+                departments=scan_target_departments,
+                parse_executor=parse_executor,
+                max_pending_pages=parse_workers * syllabus_scanner_defines.PARSE_QUEUE_SIZE_MULTIPLIER,
+                checkpoint=checkpoint,
+                metrics=scan_metrics,
+            )
+            loader.set_consumer(consumer.consumer)
+            loaders.append(loader)
+            consumers[scan_target] = consumer
+        syllabus_scanner_loader.run_loaders(loaders=loaders, connection_settings=connection_settings)
+    return {scan_target: consumer.results for scan_target, consumer in consumers.items()}
@@ -0,0 +1,223 @@
+import json
+import logging
+import tempfile
+import typing
+
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+
+_logger = logging.getLogger(__name__)
+
+
+class WorkUnit(typing.NamedTuple):
+    scan_target: syllabus_scanner_non_persistent_models.ScanTarget
+    department: syllabus_scanner_non_persistent_models.Department
+
+    @property
+    def sort_key(self) -> typing.Tuple[str, int, str]:
+        return self.scan_target.language.name, self.scan_target.year, self.department.name
+
+
+class Shard(typing.NamedTuple):
+    """
+    One of several machines a scan is split across.
+    The work units are sorted and dealt to the shards in turn, so every shard finds the same units no matter the
+    order they were given in, and the departments of every scan target are spread across all the shards.
+    """
+    # Counted from 1, like the shards of most CLI tools.
+    number: int
+    count: int
+
+    @classmethod
+    def from_text(cls, text: str) -> "Shard":
+        shard_split = text.split("/", 1)
+        if len(shard_split) != 2 or not shard_split[0].isdigit() or not shard_split[1].isdigit():
+            _logger.error("Invalid shard %s.", text)
+            raise ValueError(F"Invalid shard {text}, expected <number>/<count>.")
+        shard = Shard(number=int(shard_split[0]), count=int(shard_split[1]))
+        if not 1 <= shard.number <= shard.count:
+            _logger.error("Invalid shard %s.", text)
+            raise ValueError(F"Invalid shard {text}, the shard number must be between 1 and the shard count.")
+        return shard
+
+    def select(self, work_units: typing.Iterable[WorkUnit]) -> typing.Tuple[WorkUnit, ...]:
+        """
+        :param work_units: The work units of the whole scan.
+        :returns: The work units of this shard.
+        """
+        return tuple(sorted(work_units, key=lambda work_unit: work_unit.sort_key)[self.number - 1::self.count])
+
+    def get_target_departments(
+            self,
+            scan_targets: typing.Iterable[syllabus_scanner_non_persistent_models.ScanTarget],
+            departments: typing.Sequence[syllabus_scanner_non_persistent_models.Department],
+    ) -> typing.Dict[
+        syllabus_scanner_non_persistent_models.ScanTarget,
+        typing.Tuple[syllabus_scanner_non_persistent_models.Department, ...],
+    ]:
+        """
+        :param scan_targets: The languages and years of the whole scan.
+        :param departments: The departments of the whole scan.
+        :returns: The departments this shard scans for every scan target. Scan targets without any are left out.
+        """
+        target_departments: typing.Dict[
+            syllabus_scanner_non_persistent_models.ScanTarget,
+            typing.List[syllabus_scanner_non_persistent_models.Department],
+        ] = {}
+        for work_unit in self.select(
+            WorkUnit(scan_target=scan_target, department=department)
+            for scan_target in set(scan_targets)
+            for department in set(departments)
+        ):
+            target_departments.setdefault(work_unit.scan_target, []).append(work_unit.department)
+        return {
+            scan_target: tuple(target_departments[scan_target])
+            for scan_target in sorted(target_departments, key=lambda scan_target: scan_target.serialize_text())
+        }
+
+    def __str__(self):
+        return F"{self.number}/{self.count}"
+
+
+def _merge_course_groups(merged_course_group: dict, course_group: dict) -> dict:
+    # A bilingual group holds a key per language, so the languages found by different shards are combined.
+    # For any other key, including the whole group of a single language scan, the first shard wins.
+    missing_keys = course_group.keys() - merged_course_group.keys()
+    if not missing_keys:
+        return merged_course_group
+    return {**merged_course_group, **{key: value for key, value in course_group.items() if key in missing_keys}}
+
+
+class ShardResultsMerger:
+    """
+    Merges the JSON results of the shards of a scan into the results of the whole scan.
+    The same course may be found by several shards, when its groups are listed under several departments,
+    so the records of every course are merged into one, with every group once. When departments list a group of a
+    course differently, the group of the first output added is kept, like the scan keeps the first one it parses.
+    The courses are spilled to a temporary file as they are added, and only the position of every course record is
+    held in memory, so merging ndjson outputs needs about the memory of the largest course. A JSON output is a single
+    document, so it is loaded whole, one output at a time.
+    The failures of a scan are few, so they are held in memory.
+    The merged courses are written sorted by their year and code.
+    """
+
+    def __init__(self):
+        self._spill_file = tempfile.TemporaryFile()
+        self._course_positions: typing.Dict[typing.Tuple[int, str], typing.List[int]] = {}
+        # The encoded failures, without the ones added by more than one output.
+        self._failures: typing.Dict[str, None] = {}
+
+    def __enter__(self) -> "ShardResultsMerger":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._spill_file.close()
+
+    @property
+    def num_courses(self) -> int:
+        return len(self._course_positions)
+
+    @property
+    def num_failures(self) -> int:
+        return len(self._failures)
+
+    def add_course(self, encoded_course: str) -> None:
+        """
+        :param encoded_course: A course record as JSON, on a single line.
+        """
+        course = json.loads(encoded_course)
+        position = self._spill_file.tell()
+        self._spill_file.write(encoded_course.encode("utf-8"))
+        self._spill_file.write(b"\n")
+        self._course_positions.setdefault((course["year"], course["course_code"]), []).append(position)
+
+    def add_failure(self, encoded_failure: str) -> None:
+        """
+        :param encoded_failure: A failure record as JSON, on a single line.
+        """
+        self._failures[encoded_failure] = None
+
+    def add_json_results(self, text_file: typing.TextIO) -> None:
+        """
+        Adds the results a shard wrote with --format json, as a single JSON document.
+        :param text_file: The file of the JSON document.
+        """
+        results = json.load(text_file)
+        for course in results["courses"]:
+            self.add_course(json.dumps(course, ensure_ascii=False))
+        for failure in results["failures"]:
+            self.add_failure(json.dumps(failure, ensure_ascii=False))
+
+    def add_ndjson_results(self, courses_file: typing.TextIO, failures_file: typing.TextIO) -> None:
+        """
+        Adds the results a shard wrote with --format ndjson, a line at a time.
+        :param courses_file: The file of the courses, a course per line.
+        :param failures_file: The file of the failures, a failure per line.
+        """
+        for line in courses_file:
+            if line.strip():
+                self.add_course(line.rstrip("\n"))
+        for line in failures_file:
+            if line.strip():
+                self.add_failure(line.rstrip("\n"))
+
+    def _read_course(self, position: int) -> dict:
+        self._spill_file.seek(position)
+        return json.loads(self._spill_file.readline().decode("utf-8"))
+
+    def iter_encoded_courses(self) -> typing.Iterator[str]:
+        """
+        :returns: The merged course records as JSON, a course at a time.
+        """
+        for course_key in sorted(self._course_positions):
+            positions = self._course_positions[course_key]
+            if len(positions) == 1:
+                # The only record of the course is written as is.
+                self._spill_file.seek(positions[0])
+                yield self._spill_file.readline().decode("utf-8").rstrip("\n")
+                continue
+
+            merged_course: typing.Optional[dict] = None
+            merged_course_groups: typing.Dict[str, dict] = {}
+            for position in positions:
+                course = self._read_course(position=position)
+                if merged_course is None:
+                    merged_course = course
+                for course_group in course["course_groups"]:
+                    course_group_name = course_group["course_group_name"]
+                    merged_course_group = merged_course_groups.get(course_group_name)
+                    merged_course_groups[course_group_name] = course_group if merged_course_group is None else (
+                        _merge_course_groups(merged_course_group=merged_course_group, course_group=course_group)
+                    )
+            merged_course["course_groups"] = list(merged_course_groups.values())
+            yield json.dumps(merged_course, ensure_ascii=False)
+
+    def write_json(self, text_file: typing.TextIO) -> None:
+        """
+        Writes the merged results as a single JSON document, in the layout of a scan with --format json.
+        :param text_file: The file to write to.
+        """
+        text_file.write('{"courses": [')
+        separator = ""
+        for encoded_course in self.iter_encoded_courses():
+            text_file.write(separator)
+            text_file.write(encoded_course)
+            separator = ", "
+        text_file.write('], "failures": [')
+        text_file.write(", ".join(self._failures))
+        text_file.write("]}")
+
+    def write_ndjson(self, courses_file: typing.TextIO, failures_file: typing.TextIO) -> None:
+        """
+        Writes the merged results a record per line, in the layout of a scan with --format ndjson.
+        :param courses_file: The file to write the courses to.
+        :param failures_file: The file to write the failures to.
+        """
+        for encoded_course in self.iter_encoded_courses():
+            courses_file.write(encoded_course)
+            courses_file.write("\n")
+        for encoded_failure in self._failures:
+            failures_file.write(encoded_failure)
+            failures_file.write("\n")
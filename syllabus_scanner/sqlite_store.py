@@ -0,0 +1,502 @@
+import array
+import contextlib
+import logging
+import sqlite3
+import typing
+
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+from syllabus_scanner import results_writer as syllabus_scanner_results_writer
+
+_logger = logging.getLogger(__name__)
+
+# Bump whenever the schema changes. A store of another version is created again from scratch.
+SQLITE_STORE_VERSION = 1
+DEFAULT_BATCH_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    id INTEGER PRIMARY KEY,
+    language TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    course_code TEXT NOT NULL,
+    UNIQUE (language, year, course_code)
+);
+CREATE TABLE IF NOT EXISTS course_groups (
+    id INTEGER PRIMARY KEY,
+    course_id INTEGER NOT NULL REFERENCES courses (id) ON DELETE CASCADE,
+    course_group_name TEXT NOT NULL,
+    course_name TEXT NOT NULL,
+    semester TEXT NOT NULL,
+    faculty TEXT NOT NULL,
+    school TEXT NOT NULL,
+    UNIQUE (course_id, course_group_name)
+);
+CREATE TABLE IF NOT EXISTS meetings (
+    id INTEGER PRIMARY KEY,
+    course_group_id INTEGER NOT NULL REFERENCES course_groups (id) ON DELETE CASCADE,
+    meeting_index INTEGER NOT NULL,
+    meeting_type TEXT NOT NULL,
+    building TEXT,
+    room TEXT,
+    semester TEXT NOT NULL,
+    day TEXT,
+    starting_time TEXT,
+    ending_time TEXT,
+    UNIQUE (course_group_id, meeting_index)
+);
+CREATE TABLE IF NOT EXISTS teachers (
+    id INTEGER PRIMARY KEY,
+    honorific TEXT NOT NULL,
+    full_name TEXT NOT NULL,
+    UNIQUE (full_name, honorific)
+);
+CREATE TABLE IF NOT EXISTS meeting_teachers (
+    meeting_id INTEGER NOT NULL REFERENCES meetings (id) ON DELETE CASCADE,
+    teacher_id INTEGER NOT NULL REFERENCES teachers (id),
+    PRIMARY KEY (meeting_id, teacher_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS failures (
+    id INTEGER PRIMARY KEY,
+    language TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    department TEXT NOT NULL,
+    shard TEXT,
+    page_number INTEGER NOT NULL,
+    index_in_page INTEGER NOT NULL,
+    exception_message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS meeting_teachers_teacher ON meeting_teachers (teacher_id);
+CREATE INDEX IF NOT EXISTS course_groups_faculty_school ON course_groups (faculty, school);
+CREATE INDEX IF NOT EXISTS course_groups_school ON course_groups (school);
+CREATE INDEX IF NOT EXISTS meetings_day ON meetings (day, starting_time);
+CREATE INDEX IF NOT EXISTS meetings_building_room ON meetings (building, room);
+CREATE INDEX IF NOT EXISTS failures_scan_target ON failures (language, year);
+"""
+_TABLES = ("meeting_teachers", "teachers", "meetings", "course_groups", "courses", "failures")
+
+
+class SqliteStore:
+    """
+    Keeps the results of scans in normalized SQLite tables, so a single course or teacher can be looked up without
+    loading the results of a whole scan.
+    The courses of every language and year are kept side by side, and a course group is identified by its language,
+    year, course code and group name. Writing a course group again replaces its meetings, and the course groups a
+    newer scan of all the departments did not find are deleted.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # Transactions are managed explicitly, so a batch of courses is written in a single transaction.
+        self._connection = sqlite3.connect(path, isolation_level=None)
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        # Teachers are never deleted, so their ids are remembered instead of being looked up for every meeting.
+        self._teacher_ids: typing.Dict[syllabus_scanner_non_persistent_models.Teacher, int] = {}
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SQLITE_STORE_VERSION):
+            _logger.info("Creating the SQLite store %s again, it is of version %s.", self.path, version)
+            with self._transaction():
+                for table in _TABLES:
+                    self._connection.execute(F"DROP TABLE IF EXISTS {table}")
+        self._connection.executescript(_SCHEMA)
+        self._connection.execute(F"PRAGMA user_version = {SQLITE_STORE_VERSION}")
+
+    @contextlib.contextmanager
+    def _transaction(self) -> typing.Iterator[None]:
+        self._connection.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+        self._connection.execute("COMMIT")
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> "SqliteStore":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _get_teacher_id(self, teacher: syllabus_scanner_non_persistent_models.Teacher) -> int:
+        teacher_id = self._teacher_ids.get(teacher)
+        if teacher_id is not None:
+            return teacher_id
+        self._connection.execute(
+            "INSERT INTO teachers (honorific, full_name) VALUES (?, ?) ON CONFLICT DO NOTHING",
+            (teacher.honorific, teacher.full_name),
+        )
+        teacher_id = self._teacher_ids[teacher] = self._connection.execute(
+            "SELECT id FROM teachers WHERE full_name = ? AND honorific = ?",
+            (teacher.full_name, teacher.honorific),
+        ).fetchone()[0]
+        return teacher_id
+
+    def _upsert_course_group(
+            self,
+            course_id: int,
+            course_group: syllabus_scanner_non_persistent_models.CourseGroupInfo,
+    ) -> int:
+        self._connection.execute(
+            "INSERT INTO course_groups (course_id, course_group_name, course_name, semester, faculty, school) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (course_id, course_group_name) DO UPDATE SET "
+            "course_name = excluded.course_name, semester = excluded.semester, "
+            "faculty = excluded.faculty, school = excluded.school",
+            (
+                course_id,
+                course_group.course_group_name,
+                course_group.course_name,
+                course_group.semester.serialize(),
+                course_group.faculty,
+                course_group.school,
+            ),
+        )
+        course_group_id = self._connection.execute(
+            "SELECT id FROM course_groups WHERE course_id = ? AND course_group_name = ?",
+            (course_id, course_group.course_group_name),
+        ).fetchone()[0]
+
+        # The meetings of a course group have no key of their own, so they are all replaced.
+        self._connection.execute("DELETE FROM meetings WHERE course_group_id = ?", (course_group_id,))
+        for meeting_index, meeting in enumerate(course_group.meetings):
+            meeting_id = self._connection.execute(
+                "INSERT INTO meetings (course_group_id, meeting_index, meeting_type, building, room, semester, day, "
+                "starting_time, ending_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    course_group_id,
+                    meeting_index,
+                    meeting.meeting_type.serialize(),
+                    meeting.building,
+                    meeting.room,
+                    meeting.semester.serialize(),
+                    meeting.day.serialize() if meeting.day is not None else None,
+                    meeting.starting_time,
+                    meeting.ending_time,
+                ),
+            ).lastrowid
+            teacher_ids = [self._get_teacher_id(teacher=teacher) for teacher in meeting.teachers]
+            self._connection.executemany(
+                "INSERT INTO meeting_teachers (meeting_id, teacher_id) VALUES (?, ?)",
+                ((meeting_id, teacher_id) for teacher_id in teacher_ids),
+            )
+        return course_group_id
+
+    def upsert_courses(
+            self,
+            language: syllabus_scanner_non_persistent_models.Language,
+            courses: typing.Iterable[syllabus_scanner_non_persistent_models.CourseInfo],
+    ) -> typing.List[int]:
+        """
+        Writes the courses in a single transaction, replacing the course groups that are already stored.
+        Course groups of the stored courses that are not written again are kept.
+        :param language: The language the courses were scanned in.
+        :param courses: The courses to write.
+        :returns: The ids of the written course groups.
+        """
+        course_group_ids: typing.List[int] = []
+        with self._transaction():
+            for course in courses:
+                self._connection.execute(
+                    "INSERT INTO courses (language, year, course_code) VALUES (?, ?, ?) ON CONFLICT DO NOTHING",
+                    (language.name, course.year, course.course_code),
+                )
+                course_id = self._connection.execute(
+                    "SELECT id FROM courses WHERE language = ? AND year = ? AND course_code = ?",
+                    (language.name, course.year, course.course_code),
+                ).fetchone()[0]
+                for course_group in course.course_groups:
+                    course_group_ids.append(self._upsert_course_group(course_id=course_id, course_group=course_group))
+        return course_group_ids
+
+    def delete_other_course_groups(
+            self,
+            language: syllabus_scanner_non_persistent_models.Language,
+            year: int,
+            course_group_ids: typing.Iterable[int],
+    ) -> int:
+        """
+        Deletes the course groups of a language and year other than the given ones, along with their meetings and the
+        courses left without any groups, so the store holds only the course groups a newer scan found.
+        :param language: The language of the scan.
+        :param year: The year of the scan.
+        :param course_group_ids: The ids of the course groups to keep.
+        :returns: The number of deleted course groups.
+        """
+        with self._transaction():
+            # The ids to keep may be too many for the parameters of a single statement, so they go in a table.
+            self._connection.execute("CREATE TEMP TABLE IF NOT EXISTS kept_course_groups (id INTEGER PRIMARY KEY)")
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO kept_course_groups (id) VALUES (?)",
+                ((course_group_id,) for course_group_id in course_group_ids),
+            )
+            num_deleted_course_groups = self._connection.execute(
+                "DELETE FROM course_groups "
+                "WHERE course_id IN (SELECT id FROM courses WHERE language = ? AND year = ?) "
+                "AND id NOT IN (SELECT id FROM kept_course_groups)",
+                (language.name, year),
+            ).rowcount
+            self._connection.execute(
+                "DELETE FROM courses WHERE language = ? AND year = ? "
+                "AND id NOT IN (SELECT course_id FROM course_groups)",
+                (language.name, year),
+            )
+            self._connection.execute("DELETE FROM kept_course_groups")
+        return num_deleted_course_groups
+
+    def replace_failures(
+            self,
+            language: syllabus_scanner_non_persistent_models.Language,
+            year: int,
+            failures: typing.Iterable[syllabus_scanner_non_persistent_models.CourseGroupParsingFailure],
+    ) -> None:
+        """
+        Replaces the failures of a language and year with the failures of a newer scan.
+        :param language: The language of the scan.
+        :param year: The year of the scan.
+        :param failures: The failures of the scan.
+        """
+        with self._transaction():
+            self._connection.execute("DELETE FROM failures WHERE language = ? AND year = ?", (language.name, year))
+            self._connection.executemany(
+                "INSERT INTO failures (language, year, department, shard, page_number, index_in_page, "
+                "exception_message) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        language.name,
+                        year,
+                        failure.department.serialize(),
+                        failure.shard,
+                        failure.page_number,
+                        failure.index_in_page,
+                        failure.exception_message,
+                    )
+                    for failure in failures
+                ),
+            )
+
+    def _get_course_groups(
+            self,
+            course_group_ids: typing.Sequence[int],
+    ) -> typing.List[typing.Tuple[int, syllabus_scanner_non_persistent_models.CourseGroupInfo]]:
+        if not course_group_ids:
+            return []
+        placeholders = ", ".join("?" * len(course_group_ids))
+        teachers: typing.Dict[int, typing.Set[syllabus_scanner_non_persistent_models.Teacher]] = {}
+        for meeting_id, honorific, full_name in self._connection.execute(
+                "SELECT meeting_teachers.meeting_id, teachers.honorific, teachers.full_name FROM meeting_teachers "
+                "JOIN teachers ON teachers.id = meeting_teachers.teacher_id "
+                "JOIN meetings ON meetings.id = meeting_teachers.meeting_id "
+                F"WHERE meetings.course_group_id IN ({placeholders})",
+                course_group_ids,
+        ):
+            teachers.setdefault(meeting_id, set()).add(
+                syllabus_scanner_non_persistent_models.Teacher(honorific=honorific, full_name=full_name),
+            )
+
+        meetings: typing.Dict[int, typing.List[syllabus_scanner_non_persistent_models.CourseGroupMeetingInfo]] = {}
+        for (
+                meeting_id,
+                course_group_id,
+                meeting_type,
+                building,
+                room,
+                semester,
+                day,
+                starting_time,
+                ending_time,
+        ) in self._connection.execute(
+            "SELECT id, course_group_id, meeting_type, building, room, semester, day, starting_time, ending_time "
+            F"FROM meetings WHERE course_group_id IN ({placeholders}) ORDER BY course_group_id, meeting_index",
+            course_group_ids,
+        ):
+            meetings.setdefault(course_group_id, []).append(
+                syllabus_scanner_non_persistent_models.CourseGroupMeetingInfo(
+                    meeting_type=syllabus_scanner_non_persistent_models.MeetingType[meeting_type],
+                    teachers=teachers.get(meeting_id, set()),
+                    building=building,
+                    room=room,
+                    semester=syllabus_scanner_non_persistent_models.Semester[semester],
+                    day=syllabus_scanner_non_persistent_models.Day[day] if day is not None else None,
+                    starting_time=starting_time,
+                    ending_time=ending_time,
+                ),
+            )
+
+        return [
+            (
+                course_id,
+                syllabus_scanner_non_persistent_models.CourseGroupInfo(
+                    course_code=course_code,
+                    course_name=course_name,
+                    course_group_name=course_group_name,
+                    faculty=faculty,
+                    school=school,
+                    meetings=tuple(meetings.get(course_group_id, ())),
+                ),
+            )
+            for course_group_id, course_id, course_code, course_group_name, course_name, faculty, school
+            in self._connection.execute(
+                "SELECT course_groups.id, courses.id, courses.course_code, course_groups.course_group_name, "
+                "course_groups.course_name, course_groups.faculty, course_groups.school FROM course_groups "
+                "JOIN courses ON courses.id = course_groups.course_id "
+                F"WHERE course_groups.id IN ({placeholders}) ORDER BY course_groups.id",
+                course_group_ids,
+            )
+        ]
+
+    def find_courses(
+            self,
+            language: syllabus_scanner_non_persistent_models.Language,
+            year: int,
+            course_code: typing.Optional[str] = None,
+            teacher_full_name: typing.Optional[str] = None,
+            faculty: typing.Optional[str] = None,
+            school: typing.Optional[str] = None,
+            day: typing.Optional[syllabus_scanner_non_persistent_models.Day] = None,
+            building: typing.Optional[str] = None,
+            room: typing.Optional[str] = None,
+    ) -> typing.Tuple[syllabus_scanner_non_persistent_models.CourseInfo, ...]:
+        """
+        Finds the course groups that match all the given filters, through the indexes of the store.
+        :param language: The language the courses were scanned in.
+        :param year: The year of the courses.
+        :param course_code: The code of the course.
+        :param teacher_full_name: The full name of a teacher of one of the meetings of the group.
+        :param faculty: The faculty of the group.
+        :param school: The school of the group.
+        :param day: The day of one of the meetings of the group.
+        :param building: The building of one of the meetings of the group.
+        :param room: The room of one of the meetings of the group, in the building if one is given.
+        :returns: The matching course groups, with all their meetings, grouped by their courses.
+        """
+        conditions = ["courses.language = ?", "courses.year = ?"]
+        parameters: typing.List[typing.Any] = [language.name, year]
+        for column, value in (
+                ("courses.course_code", course_code),
+                ("course_groups.faculty", faculty),
+                ("course_groups.school", school),
+        ):
+            if value is not None:
+                conditions.append(F"{column} = ?")
+                parameters.append(value)
+
+        meeting_conditions: typing.List[str] = []
+        for column, value in (
+                ("meetings.day", day.serialize() if day is not None else None),
+                ("meetings.building", building),
+                ("meetings.room", room),
+        ):
+            if value is not None:
+                meeting_conditions.append(F"{column} = ?")
+                parameters.append(value)
+        if teacher_full_name is not None:
+            meeting_conditions.append(
+                "meetings.id IN (SELECT meeting_teachers.meeting_id FROM meeting_teachers "
+                "JOIN teachers ON teachers.id = meeting_teachers.teacher_id WHERE teachers.full_name = ?)",
+            )
+            parameters.append(teacher_full_name)
+        if meeting_conditions:
+            # A single meeting has to match all the meeting filters.
+            conditions.append(
+                "course_groups.id IN (SELECT meetings.course_group_id FROM meetings "
+                F"WHERE {' AND '.join(meeting_conditions)})",
+            )
+
+        course_group_ids = [
+            row[0]
+            for row in self._connection.execute(
+                "SELECT course_groups.id FROM course_groups JOIN courses ON courses.id = course_groups.course_id "
+                F"WHERE {' AND '.join(conditions)}",
+                parameters,
+            )
+        ]
+
+        courses: typing.Dict[int, syllabus_scanner_non_persistent_models.CourseInfo] = {}
+        for course_id, course_group in self._get_course_groups(course_group_ids=course_group_ids):
+            if course_id not in courses:
+                courses[course_id] = syllabus_scanner_non_persistent_models.CourseInfo(
+                    course_code=course_group.course_code,
+                    year=year,
+                    course_groups=[],
+                )
+            courses[course_id].course_groups.append(course_group)
+        return tuple(courses.values())
+
+    def get_course(
+            self,
+            language: syllabus_scanner_non_persistent_models.Language,
+            year: int,
+            course_code: str,
+    ) -> typing.Optional[syllabus_scanner_non_persistent_models.CourseInfo]:
+        courses = self.find_courses(language=language, year=year, course_code=course_code)
+        return courses[0] if courses else None
+
+
+class SqliteResultsWriter(syllabus_scanner_results_writer.ResultsWriter):
+    """
+    Writes the courses of a scan to a SQLite store in batches, each in a transaction of its own.
+    The failures of the scan replace the failures stored for its language and year once the writer is closed.
+    When the scan covers all the departments, the course groups of its language and year it did not write are deleted
+    once the writer is closed as well. Course groups are not stored with their departments, so a scan of some of the
+    departments only adds and updates course groups.
+    """
+
+    def __init__(
+            self,
+            store: SqliteStore,
+            language: syllabus_scanner_non_persistent_models.Language,
+            year: int,
+            batch_size: int = DEFAULT_BATCH_SIZE,
+            delete_missing_course_groups: bool = False,
+    ):
+        super().__init__()
+        self._store = store
+        self._language = language
+        self._year = year
+        self._batch_size = batch_size
+        self._delete_missing_course_groups = delete_missing_course_groups
+        # The ids of the written course groups, which are kept when the others are deleted.
+        self._course_group_ids = array.array("q")
+        self.num_deleted_course_groups = 0
+        self._courses: typing.List[syllabus_scanner_non_persistent_models.CourseInfo] = []
+        self._failures: typing.List[syllabus_scanner_non_persistent_models.CourseGroupParsingFailure] = []
+
+    def write_course(self, course: syllabus_scanner_non_persistent_models.CourseInfo) -> None:
+        self._courses.append(course)
+        self.num_courses += 1
+        if len(self._courses) >= self._batch_size:
+            self.flush()
+
+    def write_failure(self, failure: syllabus_scanner_non_persistent_models.CourseGroupParsingFailure) -> None:
+        self._failures.append(failure)
+        self.num_failures += 1
+
+    def flush(self) -> None:
+        self._course_group_ids.extend(self._store.upsert_courses(language=self._language, courses=self._courses))
+        self._courses.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self._store.replace_failures(language=self._language, year=self._year, failures=self._failures)
+        self._failures.clear()
+        if self._delete_missing_course_groups:
+            self.num_deleted_course_groups = self._store.delete_other_course_groups(
+                language=self._language,
+                year=self._year,
+                course_group_ids=self._course_group_ids,
+            )
+
+    def __enter__(self) -> "SqliteResultsWriter":
+        return self
+
+    def __exit__(self, exc_type, *_) -> None:
+        # An interrupted scan keeps the batches it already wrote, but not its partial failures, and deletes nothing.
+        if exc_type is None:
+            self.close()
@@ -0,0 +1,143 @@
+import faulthandler
+import os
+import tempfile
+import typing
+import unittest
+
+from benchmarks import stand_in_site
+from syllabus_scanner import checkpoint as syllabus_scanner_checkpoint
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+from syllabus_scanner import results_writer as syllabus_scanner_results_writer
+from syllabus_scanner import scan_metrics as syllabus_scanner_scan_metrics
+from syllabus_scanner import scanner
+
+# A scan of the small stand-in site takes about a second, so a scan still running after this long is stuck.
+SCAN_TIMEOUT_SECONDS = 60
+LANGUAGE = syllabus_scanner_non_persistent_models.Language.hebrew
+YEAR = 2021
+DEPARTMENT = syllabus_scanner_non_persistent_models.Department.arts
+NUM_PAGES = 6
+
+
+class _ScanInterrupted(Exception):
+    pass
+
+
+class _InterruptingResultsWriter(syllabus_scanner_results_writer.ResultsWriter):
+    """
+    Interrupts the scan once it wrote some of the courses, like a scan killed midway.
+    """
+
+    def __init__(self, max_courses: int):
+        super().__init__()
+        self._max_courses = max_courses
+
+    def write_course(self, course: syllabus_scanner_non_persistent_models.CourseInfo) -> None:
+        self.num_courses += 1
+        if self.num_courses > self._max_courses:
+            raise _ScanInterrupted()
+
+    def write_failure(self, failure: syllabus_scanner_non_persistent_models.CourseGroupParsingFailure) -> None:
+        self.num_failures += 1
+
+
+def _serialize_sorted(results: syllabus_scanner_non_persistent_models.ScanResults) -> typing.Tuple[list, list]:
+    # The pages of a scan are parsed concurrently, so its courses and failures come in no particular order.
+    return (
+        sorted(
+            (
+                course.course_code,
+                sorted(course_group.serialize_text() for course_group in course.course_groups),
+            )
+            for course in results.courses
+        ),
+        sorted(failure.serialize_text() for failure in results.failures),
+    )
+
+
+class ScanCheckpointTest(unittest.TestCase):
+    def setUp(self):
+        # A stuck scan would hang the whole test run, so it is killed with the traceback of every thread instead.
+        faulthandler.dump_traceback_later(timeout=SCAN_TIMEOUT_SECONDS, exit=True)
+        self.addCleanup(faulthandler.cancel_dump_traceback_later)
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.directory = temporary_directory.name
+
+    def _create_checkpoint(self, resume: bool) -> syllabus_scanner_checkpoint.ScanCheckpoint:
+        return syllabus_scanner_checkpoint.ScanCheckpoint(
+            directory=self.directory,
+            language=LANGUAGE,
+            year=YEAR,
+            resume=resume,
+        )
+
+    def test_resume_restores_interrupted_scan(self):
+        settings = stand_in_site.SiteSettings(num_pages=NUM_PAGES, num_course_groups=5, failure_rate=0.1)
+        with stand_in_site.run_site_process(settings=settings) as url:
+            scan_arguments = {
+                "language": LANGUAGE,
+                "year": YEAR,
+                "departments": (DEPARTMENT,),
+                "parse_workers": 1,
+                "url": url,
+            }
+            expected_results = scanner.scan(**scan_arguments)
+
+            interrupted_checkpoint = self._create_checkpoint(resume=False)
+            with self.assertRaises(_ScanInterrupted):
+                scanner.scan(
+                    **scan_arguments,
+                    results_writer=_InterruptingResultsWriter(max_courses=12),
+                    checkpoint=interrupted_checkpoint,
+                )
+            interrupted_checkpoint.close()
+
+            resumed_checkpoint = self._create_checkpoint(resume=True)
+            metrics = syllabus_scanner_scan_metrics.ScanMetrics(language=LANGUAGE, year=YEAR)
+            resumed_results = scanner.scan(**scan_arguments, checkpoint=resumed_checkpoint, metrics=metrics)
+
+        department_metrics = metrics.departments[DEPARTMENT.name]
+        self.assertGreater(department_metrics.num_restored_pages, 0)
+        self.assertLess(department_metrics.num_restored_pages, NUM_PAGES)
+        # Only the pages that were not restored are loaded again.
+        self.assertEqual(department_metrics.num_requests, NUM_PAGES - department_metrics.num_restored_pages)
+        self.assertEqual(_serialize_sorted(resumed_results), _serialize_sorted(expected_results))
+
+        resumed_checkpoint.clear()
+        self.assertFalse(os.path.exists(resumed_checkpoint.directory))
+
+    def test_new_scan_keeps_checkpoints_of_other_scans(self):
+        page_navigation = syllabus_scanner_non_persistent_models.PageNavigation(
+            has_body=True,
+            has_next=True,
+            method="POST",
+            view_state="view-state",
+            event_validation="event-validation",
+        )
+        interrupted_checkpoint = self._create_checkpoint(resume=False)
+        interrupted_checkpoint.store_navigation(
+            department=DEPARTMENT,
+            shard=None,
+            page_number=1,
+            page_navigation=page_navigation,
+        )
+        interrupted_checkpoint.close()
+        interrupted_path = interrupted_checkpoint.get_path(department=DEPARTMENT, shard=None)
+
+        other_department = syllabus_scanner_non_persistent_models.Department.engineering
+        other_checkpoint = self._create_checkpoint(resume=False)
+        other_checkpoint.store_navigation(
+            department=other_department,
+            shard=None,
+            page_number=1,
+            page_navigation=page_navigation,
+        )
+        self.assertTrue(os.path.exists(interrupted_path))
+        other_checkpoint.clear()
+        self.assertTrue(os.path.exists(interrupted_path))
+        self.assertFalse(os.path.exists(other_checkpoint.get_path(department=other_department, shard=None)))
+
+
+if __name__ == "__main__":
+    unittest.main()
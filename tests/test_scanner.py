@@ -0,0 +1,42 @@
+import faulthandler
+import unittest
+
+from benchmarks import stand_in_site
+from syllabus_scanner import non_persistent_models as syllabus_scanner_non_persistent_models
+from syllabus_scanner import results_writer as syllabus_scanner_results_writer
+from syllabus_scanner import scanner
+
+# A scan of the small stand-in site takes about a second, so a scan still running after this long is stuck.
+SCAN_TIMEOUT_SECONDS = 60
+
+
+class _FailingResultsWriter(syllabus_scanner_results_writer.ResultsWriter):
+    def write_course(self, course: syllabus_scanner_non_persistent_models.CourseInfo) -> None:
+        raise OSError("No space left on device")
+
+    def write_failure(self, failure: syllabus_scanner_non_persistent_models.CourseGroupParsingFailure) -> None:
+        raise OSError("No space left on device")
+
+
+class ScanTest(unittest.TestCase):
+    def setUp(self):
+        # A stuck scan would hang the whole test run, so it is killed with the traceback of every thread instead.
+        faulthandler.dump_traceback_later(timeout=SCAN_TIMEOUT_SECONDS, exit=True)
+        self.addCleanup(faulthandler.cancel_dump_traceback_later)
+
+    def test_scan_raises_when_results_writer_fails(self):
+        settings = stand_in_site.SiteSettings(num_pages=3, num_course_groups=5)
+        with stand_in_site.run_site_process(settings=settings) as url:
+            with self.assertRaisesRegex(OSError, "No space left on device"):
+                scanner.scan(
+                    language=syllabus_scanner_non_persistent_models.Language.hebrew,
+                    year=2021,
+                    departments=(syllabus_scanner_non_persistent_models.Department.arts,),
+                    parse_workers=1,
+                    results_writer=_FailingResultsWriter(),
+                    url=url,
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()